@@ -0,0 +1,191 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from app.hedging import LatencyTracker
+
+# Öncelik sınıfları (küçük değer önce): etkileşimli istekler toplu ve arka plan işlerinin önüne geçer
+PRIORITY_CLASSES = {'interactive': 0, 'batch': 1, 'background': 2}
+# Sınıfın kullanabileceği bekleme kuyruğu payı (arka plan işleri hiç beklemez)
+QUEUE_SHARES = {'interactive': 1.0, 'batch': 0.5, 'background': 0.0}
+# Kapasite dolunca reddetmek yerine uygulanabilecek hafif modlar
+DEGRADE_MODES = ('no_gemini', 'cache_only')
+
+
+class AdmissionRejected(Exception):
+    """İstek kabul edilmedi (endpoint `status_code` ve Retry-After ile yanıtlar)"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Analiz endpoint'leri için kabul denetimi ve yük atma.
+
+    Aynı anda en fazla `max_in_flight` analiz grafı çalışır. Kapasite
+    doluyken gelen istek, sınıfının kuyruk payı (QUEUE_SHARES × `max_queue`)
+    dolmadıysa `queue_timeout` saniyeye kadar bekler; boşalan yer önce
+    yüksek öncelikli sınıfa, sınıf içinde geliş sırasına verilir.
+    Beklemeye alınamayan veya süresi dolan istek:
+      - `degrade_mode` açıksa ve sınıf arka plan değilse hafif modda
+        (Gemini'siz ya da yalnızca önbellekten) hemen çalıştırılır
+        (en fazla `max_degraded` tane),
+      - değilse reddedilir: sunucu tümüyle doluysa 503, yalnızca düşük
+        öncelikli sınıfın payı dolduysa 429. Retry-After, kuyruktaki iş
+        sayısı ve son analiz sürelerinin medyanından tahmin edilir.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 16, queue_timeout: float = 2.0, degrade_mode: Optional[str] = None, max_degraded: int = None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.degrade_mode = degrade_mode if degrade_mode in DEGRADE_MODES else None
+        self.max_degraded = max_degraded if max_degraded is not None else self.max_in_flight * 2
+        self.tracker = LatencyTracker(128)
+
+        self.in_flight = 0
+        self.degraded_in_flight = 0
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+        self.admitted = {name: 0 for name in PRIORITY_CLASSES}
+        self.degraded = {name: 0 for name in PRIORITY_CLASSES}
+        self.rejected = {name: 0 for name in PRIORITY_CLASSES}
+        self.peak_queue = 0
+
+    @staticmethod
+    def priority_class(value: Optional[str]) -> str:
+        """Bilinmeyen veya boş değer etkileşimli sayılır"""
+        value = (value or '').strip().lower()
+        return value if value in PRIORITY_CLASSES else 'interactive'
+
+    def queue_depth(self, priority: str = None) -> int:
+        if priority is None:
+            return len(self._waiters)
+        rank = PRIORITY_CLASSES[priority]
+        return sum(1 for waiter in self._waiters if waiter[0] == rank)
+
+    def retry_after(self) -> int:
+        """Kuyruk erimesi için tahmini süre (sn)"""
+        typical = self.tracker.percentile(50) or 5.0
+        return max(1, math.ceil((len(self._waiters) + 1) * typical / self.max_in_flight))
+
+    def _grant_waiters(self) -> None:
+        while self._waiters and self.in_flight < self.max_in_flight:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def _wait_in_queue(self, priority: str) -> bool:
+        """Sınıfın kuyruk payı dolmadıysa sırayla bekle; yer verilirse True"""
+        if self.queue_depth(priority) >= int(self.max_queue * QUEUE_SHARES[priority]) or len(self._waiters) >= self.max_queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (PRIORITY_CLASSES[priority], next(self._sequence), waiter)
+        heapq.heappush(self._waiters, entry)
+        self.peak_queue = max(self.peak_queue, len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Yer tam zaman aşımında verildi: kullan ya da (iptalde) geri bırak
+                if isinstance(e, asyncio.TimeoutError):
+                    return True
+                self.in_flight -= 1
+                self._grant_waiters()
+            else:
+                waiter.cancel()
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    async def admit(self, priority: str) -> Optional[str]:
+        """
+        Yer ayır. Normal kabulde None, hafif modda mod adını döndürür;
+        kabul edilmezse AdmissionRejected yükseltir.
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            return None
+        if await self._wait_in_queue(priority):
+            self.admitted[priority] += 1
+            return None
+
+        if self.degrade_mode and priority != 'background' and self.degraded_in_flight < self.max_degraded:
+            self.degraded_in_flight += 1
+            self.degraded[priority] += 1
+            print(f"🪫 Kapasite dolu, istek hafif modda çalışıyor: {self.degrade_mode} ({priority})")
+            return self.degrade_mode
+
+        self.rejected[priority] += 1
+        saturated = len(self._waiters) >= self.max_queue or priority == 'interactive'
+        status_code = 503 if saturated else 429
+        print(f"🚫 İstek reddedildi ({priority}, {status_code}): {self.in_flight} analiz çalışıyor, {len(self._waiters)} bekliyor")
+        raise AdmissionRejected("Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin", status_code, self.retry_after())
+
+    def release(self, degrade: Optional[str], duration: Optional[float] = None) -> None:
+        if degrade:
+            self.degraded_in_flight -= 1
+            return
+        self.in_flight -= 1
+        if duration is not None:
+            self.tracker.record(duration)
+        self._grant_waiters()
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[Optional[str]]:
+        """`async with admission.slot(priority) as degrade:` — blok süresince yer tutulur"""
+        degrade = await self.admit(priority)
+        started = time.perf_counter()
+        duration = None
+        try:
+            yield degrade
+            duration = time.perf_counter() - started
+        finally:
+            self.release(degrade, duration)
+
+    def metrics(self) -> Dict:
+        return {
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'degraded_in_flight': self.degraded_in_flight,
+            'degrade_mode': self.degrade_mode,
+            'queue_depth': {name: self.queue_depth(name) for name in PRIORITY_CLASSES},
+            'peak_queue': self.peak_queue,
+            'admitted': self.admitted,
+            'degraded': self.degraded,
+            'rejected': self.rejected,
+            'p50_seconds': self.tracker.percentile(50)
+        }
+
+
+_default_controller = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Süreç içinde paylaşılan kabul denetleyicisi.
+
+    ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT ve
+    ADMISSION_DEGRADE_MODE ('no_gemini', 'cache_only' veya boş = reddet).
+    """
+    global _default_controller
+    if _default_controller is None:
+        _default_controller = AdmissionController(
+            max_in_flight=int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 8)),
+            max_queue=int(os.getenv('ADMISSION_MAX_QUEUE', 16)),
+            queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 2.0)),
+            degrade_mode=os.getenv('ADMISSION_DEGRADE_MODE', '').strip().lower() or None
+        )
+    return _default_controller
@@ -2,7 +2,7 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.chart import BarChart, LineChart, PieChart, Reference
@@ -13,58 +13,54 @@ import seaborn as sns
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from app.feature_store import get_feature_store
+from app.keyword_scorer import get_keyword_scorer
+from app.deadline import Deadline, has_budget
 import warnings
 warnings.filterwarnings('ignore')
 
 class AdvancedExcelGenerator:
+    # 6 aylık trend faktörleri
+    TREND_FACTORS_HIGH = [1.0, 0.95, 0.90, 0.85, 0.80, 0.75]
+    TREND_FACTORS_MEDIUM = [1.0, 0.90, 0.80, 0.70, 0.60, 0.50]
+    TREND_FACTORS_LOW = [1.0, 0.85, 0.70, 0.55, 0.40, 0.25]
+    SEASONAL_FACTORS = [1.0, 1.1, 1.2, 1.0, 0.9, 0.8]  # Yaz aylarında artış
+    # Grafik sayfaları isteğe bağlıdır; en az bu kadar süre kalmışsa eklenir
+    CHART_MIN_BUDGET = 1.0
+    # Sayfalar hangi sırayla oluşturulursa oluşturulsun kayıtta bu sıraya dizilir
+    SHEET_ORDER = [
+        "Gelişmiş Özet", "Fiyat Grafikleri", "Kar Grafikleri", "Satış Tahmini",
+        "Satış Geçmişi", "Detaylı Analiz", "Amazon Yorum Analizi", "Sonuç"
+    ]
+    
     def __init__(self):
         self.output_dir = "reports"
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
         
-        # ML model için örnek veri
-        self.sales_data = self._generate_sample_sales_data()
+        # ML model için önceden hesaplanmış, diskten memory-map edilen eğitim verisi
+        self.feature_store = get_feature_store()
+        # Popülerlik sezgisi için ortak anahtar kelime puanlayıcısı
+        self.keyword_scorer = get_keyword_scorer()
+        # Kategori bazında eğitilmiş model önbelleği: {kategori: (model, güven skoru)}
+        self._models = {}
     
-    def _generate_sample_sales_data(self) -> pd.DataFrame:
-        """ML model için örnek satış verisi oluştur"""
-        np.random.seed(42)
-        
-        # Kitap kategorileri ve popülerlik skorları
-        categories = {
-            'Roman': {'base_sales': 150, 'price_sensitivity': -2.5},
-            'Bilim Kurgu': {'base_sales': 80, 'price_sensitivity': -1.8},
-            'Tarih': {'base_sales': 60, 'price_sensitivity': -1.2},
-            'Felsefe': {'base_sales': 40, 'price_sensitivity': -0.8},
-            'Bilim': {'base_sales': 70, 'price_sensitivity': -1.5},
-            'Çocuk': {'base_sales': 200, 'price_sensitivity': -3.0},
-            'Eğitim': {'base_sales': 120, 'price_sensitivity': -2.0},
-            'Klasik': {'base_sales': 90, 'price_sensitivity': -1.6}
-        }
-        
-        data = []
-        for category, params in categories.items():
-            for _ in range(50):  # Her kategori için 50 örnek
-                price = np.random.uniform(20, 200)
-                popularity = np.random.uniform(0.1, 1.0)
-                
-                # Satış tahmini formülü
-                base_sales = params['base_sales']
-                price_effect = params['price_sensitivity'] * (price - 100) / 100
-                popularity_effect = popularity * 50
-                
-                monthly_sales = max(0, int(base_sales + price_effect + popularity_effect + np.random.normal(0, 10)))
-                
-                data.append({
-                    'category': category,
-                    'price': price,
-                    'popularity': popularity,
-                    'monthly_sales': monthly_sales
-                })
-        
-        return pd.DataFrame(data)
+    def _get_category_model(self, category: str) -> Tuple[RandomForestRegressor, float]:
+        """Kategori modelini önbellekten al, yoksa özellik deposundan eğit"""
+        if category not in self._models:
+            X_train, X_test, y_train, y_test = self.feature_store.get_training_data(category)
+            
+            # Model eğitimi
+            model = RandomForestRegressor(n_estimators=100, random_state=42)
+            model.fit(X_train, y_train)
+            
+            # Güven aralığı (basit yaklaşım)
+            confidence = model.score(X_test, y_test)
+            self._models[category] = (model, confidence)
+        
+        return self._models[category]
     
-    def predict_sales(self, book_title: str, price: float, category: str = None, trendyol_data: Dict = None, amazon_sales_data: Dict = None) -> Dict:
+    def predict_sales(self, book_title: str, price: float, category: str = None, trendyol_data: Dict = None, amazon_sales_data: Dict = None, popularity_score: float = None) -> Dict:
         """ML model ile satış tahmini yap (Gerçek veri varsa kullan)"""
         try:
             # Amazon satış verisi varsa onu kullan (ÖNCELİK 1)
@@ -124,35 +120,18 @@ class AdvancedExcelGenerator:
             if not category:
                 category = 'Roman'  # Varsayılan kategori
             
-            # Kategori verilerini filtrele
-            category_data = self.sales_data[self.sales_data['category'] == category]
-            
-            if len(category_data) < 10:
-                # Yeterli veri yoksa tüm veriyi kullan
-                category_data = self.sales_data
-            
-            # Özellikler
-            X = category_data[['price', 'popularity']]
-            y = category_data['monthly_sales']
-            
-            # Veriyi böl
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            # Model eğitimi
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
+            # Kategori modeli (özellik deposundan bir kez eğitilir)
+            model, confidence = self._get_category_model(category)
             
             # Tahmin için özellikler
-            # Popülerlik skorunu kitap adından tahmin et
-            popularity_score = self._estimate_popularity(book_title)
+            # Popülerlik skoru verilmediyse (ör. Google Trends) kitap adından tahmin et
+            if popularity_score is None:
+                popularity_score = self._estimate_popularity(book_title)
             
             # Tahmin yap
-            prediction = model.predict([[price, popularity_score]])[0]
+            prediction = model.predict(np.array([[price, popularity_score]]))[0]
             prediction = max(0, int(prediction))
             
-            # Güven aralığı (basit yaklaşım)
-            confidence = model.score(X_test, y_test)
-            
             # Aylık gelir tahmini
             monthly_revenue = prediction * price
             
@@ -182,6 +161,60 @@ class AdvancedExcelGenerator:
                 'source': 'error_fallback'
             }
     
+    def predict_sales_batch(self, titles: List[str], prices: List[float], categories: List[str] = None, popularity_scores: List[Optional[float]] = None) -> List[Dict]:
+        """
+        Çok sayıda kitap için toplu ML satış tahmini (katalog ölçeğinde)
+        
+        Popülerlik özellikleri vektörel hesaplanır (`popularity_scores` içinde
+        değeri olan kitaplarda Google Trends skoru kullanılır), her kategori
+        modeli kendi satırları için tek bir `model.predict` çağrısı yapar ve
+        6 aylık trendler tek bir NumPy broadcast işlemiyle üretilir.
+        """
+        titles = np.asarray(titles, dtype=str)
+        prices = np.asarray(prices, dtype=np.float64)
+        if categories is None:
+            categories = ['Roman'] * len(titles)
+        categories = np.asarray([c or 'Roman' for c in categories], dtype=object)
+        
+        if not (len(titles) == len(prices) == len(categories)):
+            raise ValueError("titles, prices ve categories aynı uzunlukta olmalı")
+        
+        popularity = self._estimate_popularity_batch(titles)
+        if popularity_scores is not None:
+            known = np.asarray([score is not None for score in popularity_scores])
+            popularity[known] = [score for score in popularity_scores if score is not None]
+        features = np.column_stack([prices, popularity])
+        
+        predictions = np.zeros(len(titles), dtype=np.int64)
+        confidences = np.zeros(len(titles), dtype=np.float64)
+        
+        # Her kategori için tek model çağrısı
+        for category in np.unique(categories):
+            mask = categories == category
+            model, confidence = self._get_category_model(category)
+            predictions[mask] = np.maximum(0, model.predict(features[mask]).astype(np.int64))
+            confidences[mask] = confidence
+        
+        sources = np.full(len(titles), 'sample_data', dtype=object)
+        trends = self._calculate_monthly_trend_batch(predictions, confidences, popularity, sources)
+        monthly_revenue = predictions * prices
+        
+        return [
+            {
+                'title': str(titles[i]),
+                'predicted_sales': int(predictions[i]),
+                'confidence': float(confidences[i]),
+                'monthly_revenue': float(monthly_revenue[i]),
+                'popularity_score': float(popularity[i]),
+                'category': categories[i],
+                'trend': 'stable',
+                'daily_average': int(predictions[i] // 30),
+                'monthly_trend': trends[i].tolist(),
+                'source': 'sample_data'
+            }
+            for i in range(len(titles))
+        ]
+    
     def _calculate_monthly_trend(self, base_sales: int, sales_prediction: Dict) -> List[float]:
         """ML ile 6 aylık trend hesapla"""
         try:
@@ -195,22 +228,22 @@ class AdvancedExcelGenerator:
                 # Amazon verisi varsa daha gerçekçi trend
                 if confidence > 0.8:
                     # Yüksek güven = yavaş düşüş
-                    factors = [1.0, 0.95, 0.90, 0.85, 0.80, 0.75]
+                    factors = self.TREND_FACTORS_HIGH
                 elif confidence > 0.6:
                     # Orta güven = orta düşüş
-                    factors = [1.0, 0.90, 0.80, 0.70, 0.60, 0.50]
+                    factors = self.TREND_FACTORS_MEDIUM
                 else:
                     # Düşük güven = hızlı düşüş
-                    factors = [1.0, 0.85, 0.70, 0.55, 0.40, 0.25]
+                    factors = self.TREND_FACTORS_LOW
             else:
                 # Sample data için standart trend
-                factors = [1.0, 0.90, 0.80, 0.70, 0.60, 0.50]
+                factors = self.TREND_FACTORS_MEDIUM
             
             # Popülerlik skoruna göre ayarla
             popularity_adjustment = (popularity - 0.5) * 0.2  # ±10% ayarlama
             
             # Mevsimsellik faktörü (kitap satışları için)
-            seasonal_factors = [1.0, 1.1, 1.2, 1.0, 0.9, 0.8]  # Yaz aylarında artış
+            seasonal_factors = self.SEASONAL_FACTORS
             
             # Final hesaplama
             monthly_predictions = []
@@ -228,35 +261,35 @@ class AdvancedExcelGenerator:
             # Fallback: basit düşüş
             return [base_sales * (1.0 - i * 0.1) for i in range(6)]
     
-    def _estimate_popularity(self, book_title: str) -> float:
-        """Kitap adından popülerlik skoru tahmin et"""
-        title_lower = book_title.lower()
-        
-        # Popülerlik göstergeleri
-        popular_keywords = ['bestseller', 'çok satan', 'popüler', 'klasik', 'önerilen']
-        niche_keywords = ['akademik', 'tez', 'araştırma', 'özel', 'teknik']
-        
-        popularity_score = 0.5  # Varsayılan
-        
-        # Anahtar kelime analizi
-        for keyword in popular_keywords:
-            if keyword in title_lower:
-                popularity_score += 0.1
-        
-        for keyword in niche_keywords:
-            if keyword in title_lower:
-                popularity_score -= 0.1
-        
-        # Başlık uzunluğu etkisi
-        if len(book_title) < 20:
-            popularity_score += 0.05
-        elif len(book_title) > 50:
-            popularity_score -= 0.05
+    def _calculate_monthly_trend_batch(self, base_sales: np.ndarray, confidences: np.ndarray, popularity: np.ndarray, sources: np.ndarray) -> np.ndarray:
+        """`_calculate_monthly_trend` ile aynı formül, (n, 6) matris olarak"""
+        base_sales = np.asarray(base_sales, dtype=np.float64)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        is_amazon = np.asarray(sources) == 'amazon_api'
+        
+        # Kitap başına faktör satırı seç: (n, 6)
+        factors = np.where(
+            (is_amazon & (confidences > 0.8))[:, None], self.TREND_FACTORS_HIGH,
+            np.where(
+                (is_amazon & (confidences <= 0.6))[:, None], self.TREND_FACTORS_LOW,
+                self.TREND_FACTORS_MEDIUM
+            )
+        )
         
-        return max(0.1, min(1.0, popularity_score))
+        popularity_adjustment = (np.asarray(popularity, dtype=np.float64) - 0.5) * 0.2
+        adjusted = factors + popularity_adjustment[:, None]
+        return base_sales[:, None] * adjusted * np.asarray(self.SEASONAL_FACTORS)
+    
+    def _estimate_popularity(self, book_title: str) -> float:
+        """Kitap adından popülerlik skoru tahmin et (ortak anahtar kelime tablosu ile)"""
+        return self.keyword_scorer.popularity_score(book_title)
     
-    def create_advanced_book_analysis_report(self, search_results: Dict, best_offer: Dict, gemini_analysis: Dict, trendyol_data: Dict = None, comments_data: Dict = None) -> str:
-        """Gelişmiş kitap analizi Excel raporu oluştur"""
+    def _estimate_popularity_batch(self, titles: np.ndarray) -> np.ndarray:
+        """Başlık dizisi için popülerlik skorları (tek geçişli toplu puanlama)"""
+        return self.keyword_scorer.popularity_scores(titles)
+    
+    def predict_for_report(self, best_offer: Dict, trendyol_data: Dict = None, comments_data: Dict = None, trends_data: Dict = None) -> Dict:
+        """Rapor için ML satış tahmini (Amazon satış verisi ve Trends popülerliği ile)"""
         
         # Amazon satış verilerini çıkar
         amazon_sales_data = None
@@ -264,27 +297,49 @@ class AdvancedExcelGenerator:
             amazon_sales_data = comments_data.get('sales_data')
             print(f"🔍 Amazon satış verileri kullanılacak: {amazon_sales_data}")
         
-        # ML tahmini yap (Amazon verisi varsa kullan)
-        sales_prediction = self.predict_sales(
+        # Google Trends popülerlik skoru (gerçek ilgi verisi varsa)
+        trends_popularity = None
+        if trends_data and trends_data.get('source', '').startswith('google_trends'):
+            trends_popularity = trends_data.get('trend_data', {}).get('popularity_score')
+        
+        return self.predict_sales(
             best_offer.get('title', ''),
             best_offer.get('price', 0),
             trendyol_data=trendyol_data,
-            amazon_sales_data=amazon_sales_data
+            amazon_sales_data=amazon_sales_data,
+            popularity_score=trends_popularity
         )
-        
-        # Dosya adı oluştur
+    
+    def report_path(self, best_offer: Dict) -> str:
+        """Zaman damgalı rapor dosya yolu"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         book_title = best_offer.get('title', 'kitap').replace(' ', '_')[:30]
         filename = f"gelismis_kitap_analizi_{book_title}_{timestamp}.xlsx"
-        filepath = os.path.join(self.output_dir, filename)
+        return os.path.join(self.output_dir, filename)
+    
+    def create_advanced_book_analysis_report(self, search_results: Dict, best_offer: Dict, gemini_analysis: Dict, trendyol_data: Dict = None, comments_data: Dict = None, trends_data: Dict = None, deadline: Deadline = None, sales_prediction: Dict = None) -> str:
+        """
+        Gelişmiş kitap analizi Excel raporu oluştur (bütçe azsa grafik sayfaları atlanır)
+        
+        `sales_prediction` verilmezse ML tahmini burada yapılır.
+        """
+        
+        # ML tahmini yap (Amazon ve Trends verisi varsa kullan)
+        if sales_prediction is None:
+            sales_prediction = self.predict_for_report(best_offer, trendyol_data, comments_data, trends_data)
+        
+        filepath = self.report_path(best_offer)
         
         # Excel workbook oluştur
         wb = Workbook()
         
         # Sayfaları oluştur
         self.create_enhanced_summary_sheet(wb, best_offer, gemini_analysis, sales_prediction)
-        self.create_price_charts_sheet(wb, search_results, best_offer)
-        self.create_profit_charts_sheet(wb, best_offer, gemini_analysis)
+        if has_budget(deadline, self.CHART_MIN_BUDGET):
+            self.create_price_charts_sheet(wb, search_results, best_offer)
+            self.create_profit_charts_sheet(wb, best_offer, gemini_analysis)
+        else:
+            print("⏰ Süre bütçesi azaldı, grafik sayfaları atlanıyor")
         self.create_sales_prediction_sheet(wb, sales_prediction, best_offer)
         
         # Trendyol verisi varsa satış geçmişi sayfası ekle
@@ -300,8 +355,16 @@ class AdvancedExcelGenerator:
         self.create_results_sheet(wb, search_results, best_offer, gemini_analysis)
         
         # Excel dosyasını kaydet
+        return self.save_report(wb, filepath)
+    
+    def save_report(self, wb: Workbook, filepath: str) -> str:
+        """Sayfaları SHEET_ORDER sırasına dizip çalışma kitabını kaydet"""
+        titles = [title for title in self.SHEET_ORDER if title in wb.sheetnames]
+        for index, title in enumerate(titles):
+            ws = wb[title]
+            wb.move_sheet(ws, offset=index - wb.index(ws))
+        wb.active = 0
         wb.save(filepath)
-        
         return filepath
     
     def create_enhanced_summary_sheet(self, wb: Workbook, best_offer: Dict, gemini_analysis: Dict, sales_prediction: Dict):
@@ -1,39 +1,56 @@
-import os
-import httpx
 from typing import Dict, List
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key=" + GEMINI_API_KEY
+from app.gemini_client import GeminiError, GeminiTimeoutError, get_gemini_client
+from app.deadline import Deadline, timeout_for
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 2048,
+}
+
+SAFETY_SETTINGS = [
+    {"category": category, "threshold": "BLOCK_NONE"}
+    for category in (
+        "HARM_CATEGORY_HARASSMENT",
+        "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "HARM_CATEGORY_DANGEROUS_CONTENT"
+    )
+]
 
 class AdvancedGeminiAgent:
     def __init__(self):
-        self.api_key = GEMINI_API_KEY
-        self.api_url = GEMINI_API_URL
+        self.gemini_client = get_gemini_client()
     
-    async def analyze_book_and_generate_content(self, search_results: Dict, best_offer: Dict) -> Dict:
+    async def analyze_book_and_generate_content(self, search_results: Dict, best_offer: Dict, deadline: Deadline = None) -> Dict:
         """
         Kitap analizi yap ve gelişmiş içerik üret
+        
+        `deadline` verilirse her çağrı kalan bütçeyle sınırlanır; bütçe
+        tükendikten sonraki bölümler şablon içerikle doldurulur.
         """
         try:
+            fallback = self.get_fallback_content(best_offer)
+            if deadline is not None and deadline.expired:
+                return fallback
+            
             # Tüm sonuçları analiz et
             analysis_prompt = self.create_analysis_prompt(search_results, best_offer)
             
             # Gemini'den analiz al
-            analysis_result = await self.call_gemini_api(analysis_prompt)
+            analysis_result = await self.call_gemini_api(analysis_prompt, deadline=deadline)
             
             # SEO açıklaması üret
             seo_prompt = self.create_seo_prompt(best_offer, analysis_result)
-            seo_result = await self.call_gemini_api(seo_prompt)
+            seo_result = await self.call_gemini_api(seo_prompt, deadline=deadline) if not (deadline and deadline.expired) else fallback['seo_content']
             
             # Satış önerisi üret
             sales_prompt = self.create_sales_prompt(best_offer, analysis_result)
-            sales_result = await self.call_gemini_api(sales_prompt)
+            sales_result = await self.call_gemini_api(sales_prompt, deadline=deadline) if not (deadline and deadline.expired) else fallback['sales_recommendation']
             
             # Özet oluştur
-            summary_result = await self.create_summary(best_offer, analysis_result)
+            summary_result = await self.create_summary(best_offer, analysis_result, deadline) if not (deadline and deadline.expired) else fallback['best_offer_summary']
             
             return {
                 'analysis': analysis_result,
@@ -130,7 +147,7 @@ Türkçe olarak 3-4 cümlelik öneri yaz.
         
         return prompt
     
-    async def create_summary(self, best_offer: Dict, analysis: str) -> str:
+    async def create_summary(self, best_offer: Dict, analysis: str, deadline: Deadline = None) -> str:
         """Özet oluştur"""
         
         prompt = f"""
@@ -148,67 +165,24 @@ Bu kitap hakkında 2-3 cümlelik özet yaz:
 Türkçe olarak yaz.
 """
         
-        return await self.call_gemini_api(prompt)
+        return await self.call_gemini_api(prompt, deadline=deadline)
     
-    async def call_gemini_api(self, prompt: str) -> str:
+    async def call_gemini_api(self, prompt: str, timeout: float = None, deadline: Deadline = None) -> str:
         """Gemini API'yi çağır"""
         try:
-            headers = {"Content-Type": "application/json"}
-            data = {
-                "contents": [
-                    {"parts": [{"text": prompt}]}
-                ],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topK": 40,
-                    "topP": 0.95,
-                    "maxOutputTokens": 2048,
-                },
-                "safetySettings": [
-                    {
-                        "category": "HARM_CATEGORY_HARASSMENT",
-                        "threshold": "BLOCK_NONE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_HATE_SPEECH", 
-                        "threshold": "BLOCK_NONE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        "threshold": "BLOCK_NONE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                        "threshold": "BLOCK_NONE"
-                    }
-                ]
-            }
-            
-            print(f"🔍 Gemini API çağrılıyor: {self.api_url}")
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url, 
-                    headers=headers, 
-                    json=data, 
-                    timeout=30.0
-                )
-                
-                print(f"📡 Gemini API Response Status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'candidates' in result and len(result['candidates']) > 0:
-                        return result['candidates'][0]['content']['parts'][0]['text']
-                    else:
-                        print(f"❌ Gemini API boş sonuç: {result}")
-                        return "API boş sonuç döndü"
-                else:
-                    print(f"❌ Gemini API hatası: {response.status_code}")
-                    print(f"❌ Response: {response.text}")
-                    return f"API hatası: {response.status_code}"
-                    
-        except Exception as e:
+            if deadline is not None:
+                timeout = timeout_for(deadline, timeout or self.gemini_client.timeout)
+            print(f"🔍 Gemini API çağrılıyor: {self.gemini_client.model}")
+            return await self.gemini_client.generate(
+                prompt,
+                timeout=timeout,
+                generation_config=GENERATION_CONFIG,
+                safety_settings=SAFETY_SETTINGS
+            )
+        except GeminiTimeoutError as e:
+            print(f"⏰ {str(e)}")
+            return f"API çağrısı zaman aşımına uğradı: {str(e)}"
+        except GeminiError as e:
             print(f"❌ Gemini API çağrı hatası: {str(e)}")
             return f"API çağrısı başarısız: {str(e)}"
     
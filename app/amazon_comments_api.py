@@ -1,7 +1,31 @@
 import os
+import re
+import math
+import asyncio
 import httpx
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
+from app.review_stream import ReviewStreamProcessor, DEFAULT_SAMPLE_SIZE
+from app.hedging import get_hedge_policy
+from app.concurrency import get_limiter
+from app.deadline import Deadline, has_budget, timeout_for
+from app.isbn import asin_from_texts, isbn_to_asin
+from app.cache import SharedCache, NO_ASIN, NO_REVIEWS, UPSTREAM_4XX, get_negative_cache, is_cacheable_failure
+
+# Ek yorum sayfası / teklif çağrısı için gereken en az kalan süre (sonraki aşamalara pay)
+OPTIONAL_CALL_MIN_BUDGET = 8.0
+
+REVIEWS_PAGE_SIZE = 10  # product-reviews sayfa başına ~10 yorum döndürür
+
+# Katmanlı akışlar: (star_rating, sort_by); fazla sayfalar bu sırayla dağıtılır
+REVIEW_STREAMS = [
+    ('ALL', 'MOST_RECENT'),
+    ('5_STARS', 'TOP_REVIEWS'),
+    ('1_STARS', 'TOP_REVIEWS'),
+    ('4_STARS', 'TOP_REVIEWS'),
+    ('2_STARS', 'TOP_REVIEWS'),
+    ('3_STARS', 'TOP_REVIEWS')
+]
 
 class AmazonCommentsAPI:
     """Amazon ürün yorumlarını çeken API"""
@@ -13,85 +37,293 @@ class AmazonCommentsAPI:
             'x-rapidapi-host': 'real-time-amazon-data.p.rapidapi.com',
             'x-rapidapi-key': self.api_key
         }
+        self.details_hedge = get_hedge_policy('amazon_product_details')
+        # Tüm RapidAPI çağrıları ortak uyarlanabilir eşzamanlılık sınırından geçer
+        self.limiter = get_limiter('rapidapi')
+        # Başlık -> ASIN (arama API'si yalnızca ISBN bulunamazsa çağrılır; işçiler arası paylaşılır)
+        self.asin_cache = SharedCache('asin', ttl_seconds=float(os.getenv('ASIN_CACHE_TTL', 7 * 24 * 3600)))
+        # Sonuçsuz aramalar (ASIN yok, yorum yok, 4xx) kısa süreli ayrı önbellekte
+        self.negative_cache = get_negative_cache()
+        # ISBN'den türetilen ASIN doğrulanırken çekilen detaylar, detay aşamasında tekrar çekilmesin
+        self.details_cache = SharedCache('product_details', ttl_seconds=600)
+    
+    async def fetch_reviews(self, asin: str, limit: int = 100, sample_size: int = DEFAULT_SAMPLE_SIZE, deadline: Deadline = None) -> ReviewStreamProcessor:
+        """Yalnızca yorum sayfalarını katmanlı akışlarla çek (detay ve teklifler hariç)"""
+        # Sayfalar geldikçe akış işlemcisine verilir, ham sayfalar tutulmaz
+        processor = ReviewStreamProcessor(limit=limit, sample_size=sample_size)
+        
+        reason = await self.negative_cache.aget('reviews', asin)
+        if reason:
+            print(f"⏭️ Yorum araması atlandı ({reason}): {asin}")
+            return processor
+        
+        print(f"🔍 Amazon yorumları alınıyor... ASIN: {asin}, Limit: {limit}")
+        streams = self.plan_review_streams(limit)
+        
+        async with httpx.AsyncClient(timeout=timeout_for(deadline, 30.0)) as client:
+            seen = set()
+            await asyncio.gather(*(
+                self._fetch_review_stream(client, asin, stream, processor, seen, deadline) for stream in streams
+            ))
+        
+        print(f"📊 Toplam {processor.count} yorum alındı")
+        if not processor.count:
+            await self._record_empty_reviews(asin, [stream.get('outcome') for stream in streams])
+        return processor
+    
+    async def _record_empty_reviews(self, asin: str, outcomes: List) -> None:
+        """Tüm akışlar boş sayfa veya kalıcı 4xx ile bittiyse negatif kayıt (ağ hataları kaydedilmez)"""
+        if all(outcome == 'empty' for outcome in outcomes):
+            await self.negative_cache.arecord('reviews', asin, NO_REVIEWS)
+        elif all(outcome == 'empty' or (isinstance(outcome, int) and is_cacheable_failure(outcome)) for outcome in outcomes):
+            await self.negative_cache.arecord('reviews', asin, UPSTREAM_4XX)
+    
+    def build_comments_data(self, processor: ReviewStreamProcessor, product_details: Dict, offers_data: Dict) -> Dict:
+        """Yorum toplamları, ürün detayları ve tekliflerden yorum verisini oluştur"""
+        if not processor.count:
+            print("⚠️ Hiç yorum bulunamadı")
+            return self._get_sample_comments_data()
+        
+        # Satış verilerini birleştir
+        sales_data = self._extract_sales_data_from_product_details(product_details)
+        if offers_data:
+            sales_data.update(offers_data)
+        
+        # Toplamlar akış sırasında hesaplandı, sonucu formatla
+        stratified = len(self.plan_review_streams(processor.limit)) > 1
+        shares = self._population_shares(product_details) if stratified else None
+        processed_data = processor.result(product_details, population_shares=shares)
+        processed_data['sales_data'] = sales_data
+        if stratified:
+            self._apply_population_rating(processed_data, product_details, shares)
+        return processed_data
     
-    async def get_product_comments(self, asin: str, limit: int = 100) -> Dict:
+    @staticmethod
+    def plan_review_streams(limit: int) -> List[Dict]:
         """
-        Amazon'dan ürün yorumlarını ve detaylarını al (Çoklu sayfa desteği)
+        Yorum limitini sayfa bütçesine çevirip akışlara dağıt.
         
-        Args:
-            asin: Amazon ürün ASIN kodu
-            limit: Kaç yorum alınacağı (varsayılan: 100)
-            
-        Returns:
-            Dict: Yorum verileri ve ürün detayları
+        Her akışa en az bir sayfa verilir, kalan sayfalar REVIEW_STREAMS
+        sırasıyla dağıtılır. Bütçe tüm akışlara yetmiyorsa eski davranışa
+        (tek 'ALL' akışı) dönülür; toplam sayfa sayısı hiçbir zaman eski
+        tek akışlı planı aşmaz.
         """
-        try:
-            print(f"🔍 Amazon yorumları alınıyor... ASIN: {asin}, Limit: {limit}")
+        pages = max(1, math.ceil((limit or REVIEWS_PAGE_SIZE) / REVIEWS_PAGE_SIZE))
+        if pages < len(REVIEW_STREAMS):
+            return [{'star_rating': 'ALL', 'sort_by': 'TOP_REVIEWS', 'max_pages': pages, 'quota': limit}]
+        
+        stream_pages = [1] * len(REVIEW_STREAMS)
+        for i in range(pages - len(REVIEW_STREAMS)):
+            stream_pages[i % len(REVIEW_STREAMS)] += 1
+        
+        return [
+            {'star_rating': star_rating, 'sort_by': sort_by, 'max_pages': n, 'quota': n * REVIEWS_PAGE_SIZE}
+            for (star_rating, sort_by), n in zip(REVIEW_STREAMS, stream_pages)
+        ]
+    
+    @staticmethod
+    def _review_key(review: Dict) -> str:
+        """Tekrar tespiti için yorum anahtarı (bağlantı yoksa yazar/başlık/tarih)"""
+        return review.get('review_link') or review.get('review_id') or (
+            f"{review.get('review_author', '')}|{review.get('review_title', '')}|{review.get('review_date', '')}"
+        )
+    
+    async def _fetch_review_stream(self, client: httpx.AsyncClient, asin: str, stream: Dict, processor: ReviewStreamProcessor, seen: set, deadline: Deadline = None) -> int:
+        """
+        Tek bir (yıldız, sıralama) akışını kotası dolana kadar sayfala.
+        İlk sayfanın sonucu `stream['outcome']` alanına yazılır ('ok', 'empty',
+        'error' veya HTTP durum kodu).
+        """
+        label = f"{stream['star_rating']}/{stream['sort_by']}"
+        url = f"{self.base_url}/product-reviews"
+        taken = 0
+        
+        for page in range(1, stream['max_pages'] + 1):
+            if taken >= stream['quota'] or processor.is_full:
+                break
+            if page > 1 and not has_budget(deadline, OPTIONAL_CALL_MIN_BUDGET):
+                print(f"⏰ {label}: süre bütçesi azaldı, ek sayfalar atlanıyor")
+                break
             
-            all_reviews = []
-            page = 1
-            max_pages = 10  # Maksimum 10 sayfa (her sayfada ~10 yorum)
+            params = {
+                'asin': asin,
+                'country': 'US',
+                'page': page,
+                'sort_by': stream['sort_by'],
+                'star_rating': stream['star_rating'],
+                'verified_purchases_only': 'false',
+                'images_or_videos_only': 'false',
+                'current_format_only': 'false'
+            }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                while len(all_reviews) < limit and page <= max_pages:
-                    url = f"{self.base_url}/product-reviews"
-                    params = {
-                        'asin': asin,
-                        'country': 'US',
-                        'page': page,
-                        'sort_by': 'TOP_REVIEWS',
-                        'star_rating': 'ALL',
-                        'verified_purchases_only': 'false',
-                        'images_or_videos_only': 'false',
-                        'current_format_only': 'false'
-                    }
-                    
-                    print(f"📄 Sayfa {page} alınıyor...")
-                    response = await client.get(url, headers=self.headers, params=params)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        page_reviews = data.get('data', {}).get('reviews', [])
-                        
-                        if page_reviews:
-                            all_reviews.extend(page_reviews)
-                            print(f"✅ Sayfa {page}: {len(page_reviews)} yorum alındı")
-                            page += 1
-                        else:
-                            print(f"⚠️ Sayfa {page}: Yorum yok, durduruluyor")
-                            break
-                    else:
-                        print(f"❌ Sayfa {page} API Hatası: {response.status_code}")
-                        break
-                
-                print(f"📊 Toplam {len(all_reviews)} yorum alındı")
-                
-                if all_reviews:
-                    # Ürün detaylarını ve satış verilerini al
-                    product_details = await self._get_product_details(asin)
-                    
-                    # Product Offers API'sinden satıcı bilgilerini al
-                    offers_data = await self._get_product_offers(asin)
-                    
-                    # Satış verilerini birleştir
-                    sales_data = self._extract_sales_data_from_product_details(product_details)
-                    if offers_data:
-                        sales_data.update(offers_data)
-                    
-                    # Veriyi işle ve formatla
-                    processed_data = self._process_comments_data({'data': {'reviews': all_reviews}}, limit, product_details)
-                    processed_data['sales_data'] = sales_data
-                    return processed_data
-                else:
-                    print("⚠️ Hiç yorum bulunamadı")
-                    return self._get_sample_comments_data()
-                    
-        except Exception as e:
-            print(f"❌ Amazon yorumları alınırken hata: {str(e)}")
-            return self._get_sample_comments_data()
+            try:
+                response = await self.limiter.call(
+                    lambda: client.get(url, headers=self.headers, params=params, timeout=timeout_for(deadline, 30.0))
+                )
+            except httpx.HTTPError as e:
+                print(f"❌ {label} sayfa {page} isteği başarısız: {str(e)}")
+                stream.setdefault('outcome', 'error')
+                break
+            
+            if response.status_code != 200:
+                print(f"❌ {label} sayfa {page} API Hatası: {response.status_code}")
+                stream.setdefault('outcome', response.status_code)
+                break
+            
+            data = response.json().get('data', {})
+            page_reviews = data.get('reviews', [])
+            if not page_reviews:
+                print(f"⚠️ {label} sayfa {page}: Yorum yok, akış durduruluyor")
+                stream.setdefault('outcome', 'empty')
+                break
+            stream.setdefault('outcome', 'ok')
+            
+            # Başka akışlardan gelmiş yorumları atla
+            fresh = []
+            for review in page_reviews:
+                key = self._review_key(review)
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(review)
+            
+            processor.set_product_info(data)
+            taken += processor.feed(fresh[:stream['quota'] - taken])
+            print(f"✅ {label} sayfa {page}: {len(page_reviews)} yorum ({len(fresh)} yeni)")
+            
+            if len(page_reviews) < REVIEWS_PAGE_SIZE:
+                break  # Son sayfa
+        
+        return taken
+    
+    @staticmethod
+    def _population_shares(product_details: Dict) -> Optional[List[float]]:
+        """Ürün detayındaki yıldız dağılımı -> 1-5 yıldız payları (yoksa None)"""
+        distribution = (product_details or {}).get('rating_distribution') or {}
+        shares = [0.0] * 5
+        for star, share in distribution.items():
+            try:
+                index = int(str(star)[0]) - 1
+                if 0 <= index < 5:
+                    shares[index] = float(str(share).rstrip('%'))
+            except ValueError:
+                continue
+        return shares if sum(shares) > 0 else None
+    
+    @staticmethod
+    def _apply_population_rating(processed_data: Dict, product_details: Dict, shares: Optional[List[float]]) -> None:
+        """
+        Katmanlı örnekte yıldızlar eşit temsil edilir; ortalamayı ürünün
+        gerçek yıldız dağılımıyla yeniden ağırlıklandır (histogram, duygu ve
+        yıllık ortalamalar `processor.result` içinde ağırlıklandırılır).
+        """
+        processed_data['sampling'] = 'stratified'
+        processed_data['sample_average_rating'] = processed_data.get('average_rating', 0)
+        if shares:
+            processed_data['average_rating'] = round(sum((star + 1) * w for star, w in enumerate(shares)) / sum(shares), 2)
+        elif (product_details or {}).get('product_star_rating'):
+            try:
+                processed_data['average_rating'] = round(float(product_details['product_star_rating']), 2)
+            except (TypeError, ValueError):
+                pass
+    
+    async def search_book_asin(self, book_title: str, deadline: Deadline = None, isbn_sources: List[str] = None) -> Optional[str]:
+        """
+        Kitap adından ASIN bul
+        
+        Önce başlıkta ve `isbn_sources` (SerpAPI teklif ISBN'leri, kullanıcı
+        sorgusu) içinde ISBN aranır; basılı kitapta ISBN-10 doğrudan ASIN'dir.
+        Bu ASIN'in ürün sayfası yoksa (404/boş detay) ya da ISBN bulunamazsa
+        önbellekli arama API'sine düşülür.
+        """
+        asin = asin_from_texts([book_title, *(isbn_sources or [])])
+        if asin and await self.is_listed(asin, deadline):
+            print(f"✅ ASIN ISBN'den çözüldü: {asin}")
+            return asin
+        
+        key = ' '.join(book_title.replace('İ', 'i').lower().split())
+        cached = await self.asin_cache.aget(key)
+        if cached:
+            print(f"✅ ASIN önbellekten: {cached}")
+            return cached
+        
+        reason = await self.negative_cache.aget('asin', key)
+        if reason:
+            print(f"⏭️ ASIN araması atlandı ({reason}): {book_title}")
+            return None
+        
+        asin, reason = await self._search_asin(book_title, deadline)
+        if asin:
+            await self.asin_cache.aset(key, asin)
+        elif reason:
+            await self.negative_cache.arecord('asin', key, reason)
+        return asin
+    
+    async def is_listed(self, asin: str, deadline: Deadline = None) -> bool:
+        """ISBN'den türetilen ASIN'in Amazon'da ürün sayfası var mı"""
+        if await self._get_product_details(asin, deadline):
+            return True
+        print(f"⚠️ ISBN'den türetilen ASIN için ürün bulunamadı, başlıkla aranacak: {asin}")
+        return False
+    
+    def titles_agree(self, query: str, title: str, threshold: float = 0.6) -> bool:
+        """Sorgu kelimelerinin yeterli kısmı başlıkta geçiyor mu (aynı kitap sayılır)"""
+        query_tokens = self._title_tokens(query)
+        if not query_tokens:
+            return False
+        return len(query_tokens & self._title_tokens(title)) / len(query_tokens) >= threshold
     
-    async def search_book_asin(self, book_title: str) -> Optional[str]:
-        """Kitap adından ASIN bul"""
+    async def resolve_speculative_asin(self, speculative: "asyncio.Future", query: str, book_title: str, deadline: Deadline = None, isbn_sources: List[str] = None) -> Optional[str]:
+        """
+        SerpAPI aramasıyla paralel başlatılan (ham sorguyla) ASIN aramasını
+        en iyi teklif başlığıyla uzlaştır.
+        
+        Teklif ISBN'i varsa (ve ürün sayfası varsa) o geçerlidir; spekülatif
+        sonuç farklıysa iptal edilir. ISBN yoksa ve sorgu ile başlık aynı
+        kitabı gösteriyorsa spekülatif sonuç beklenir; uyuşmazlıkta iptal
+        edilip başlıkla yeniden aranır.
+        """
+        isbn_asin = asin_from_texts(isbn_sources or [])
+        if isbn_asin and await self.is_listed(isbn_asin, deadline):
+            if not speculative.done():
+                speculative.cancel()
+            print(f"✅ ASIN teklif ISBN'inden: {isbn_asin}")
+            return isbn_asin
+        
+        if self.titles_agree(query, book_title):
+            try:
+                asin = await speculative
+            except Exception as e:
+                print(f"⚠️ Spekülatif ASIN araması başarısız: {str(e)}")
+                asin = None
+            if asin:
+                print(f"⚡ Spekülatif ASIN kullanıldı: {asin}")
+                return asin
+        else:
+            speculative.cancel()
+            print(f"🔁 Sorgu ve teklif başlığı uyuşmuyor, başlıkla yeniden aranıyor: {book_title}")
+        
+        return await self.search_book_asin(book_title, deadline)
+    
+    @staticmethod
+    def _title_tokens(text: str) -> set:
+        return set(re.findall(r"\w+", str(text).replace('İ', 'i').lower())) - {'book', 'kitap', 'the', 'a', 'paperback', 'hardcover'}
+    
+    def _pick_product(self, book_title: str, products: List[Dict]) -> Optional[Dict]:
+        """Başlık benzerliği en yüksek ürünü seç (eşitlikte kitap ASIN'i, sonra API sırası)"""
+        query = self._title_tokens(book_title)
+        best, best_score = None, -1.0
+        for rank, product in enumerate(products):
+            if not product.get('asin'):
+                continue
+            tokens = self._title_tokens(product.get('product_title', ''))
+            overlap = len(query & tokens) / len(query | tokens) if query | tokens else 0.0
+            score = overlap + (0.05 if isbn_to_asin(product['asin']) else 0.0) - rank * 0.001
+            if score > best_score:
+                best, best_score = product, score
+        return best
+    
+    async def _search_asin(self, book_title: str, deadline: Deadline = None) -> Tuple[Optional[str], Optional[str]]:
+        """RapidAPI arama çağrısıyla ASIN bul; (asin, negatif önbellek nedeni) döndürür"""
         try:
             print(f"🔍 Amazon'da kitap aranıyor: {book_title}")
             
@@ -102,33 +334,38 @@ class AmazonCommentsAPI:
                 'page': 1
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=self.headers, params=params)
+            async with httpx.AsyncClient(timeout=timeout_for(deadline, 30.0)) as client:
+                response = await self.limiter.call(lambda: client.get(url, headers=self.headers, params=params))
                 
                 if response.status_code == 200:
                     data = response.json()
                     products = data.get('data', {}).get('products', [])
                     
-                    if products:
-                        # İlk ürünün ASIN'ini al
-                        first_product = products[0]
-                        asin = first_product.get('asin')
-                        title = first_product.get('product_title', '')
+                    product = self._pick_product(book_title, products)
+                    if product:
+                        asin = product.get('asin')
+                        title = product.get('product_title', '')
                         print(f"✅ Kitap bulundu: {title} (ASIN: {asin})")
-                        return asin
+                        return asin, None
                     else:
                         print("❌ Kitap bulunamadı")
-                        return None
+                        return None, NO_ASIN
                 else:
                     print(f"❌ Arama API hatası: {response.status_code}")
-                    return None
+                    return None, UPSTREAM_4XX if is_cacheable_failure(response.status_code) else None
                     
         except Exception as e:
             print(f"❌ Kitap arama hatası: {str(e)}")
-            return None
+            return None, None
     
-    async def _get_product_details(self, asin: str) -> Dict:
+    async def _get_product_details(self, asin: str, deadline: Deadline = None) -> Dict:
         """Amazon'dan ürün detaylarını al"""
+        if await self.negative_cache.aget('details', asin):
+            print(f"⏭️ Ürün detayları atlandı ({UPSTREAM_4XX}): {asin}")
+            return {}
+        cached = await self.details_cache.aget(asin)
+        if cached:
+            return cached
         try:
             print(f"🔍 Ürün detayları alınıyor... ASIN: {asin}")
             
@@ -138,8 +375,11 @@ class AmazonCommentsAPI:
                 'country': 'US'
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=self.headers, params=params)
+            async with httpx.AsyncClient(timeout=timeout_for(deadline, 30.0)) as client:
+                response = await self.details_hedge.run(
+                    lambda: self.limiter.call(lambda: client.get(url, headers=self.headers, params=params)),
+                    accept=lambda r: r.status_code < 500
+                )
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -152,9 +392,13 @@ class AmazonCommentsAPI:
                     # Debug: Tüm API yanıtını göster
                     print(f"🔍 Product Details API yanıtı: {data}")
                     
+                    if data.get('data'):
+                        await self.details_cache.aset(asin, data['data'])
                     return data.get('data', {})
                 else:
                     print(f"❌ Ürün detayları API hatası: {response.status_code}")
+                    if is_cacheable_failure(response.status_code):
+                        await self.negative_cache.arecord('details', asin, UPSTREAM_4XX)
                     return {}
                     
         except Exception as e:
@@ -265,8 +509,11 @@ class AmazonCommentsAPI:
             print(f"❌ Satış verileri çıkarılırken hata: {str(e)}")
             return {}
     
-    async def _get_product_offers(self, asin: str) -> Dict:
+    async def _get_product_offers(self, asin: str, deadline: Deadline = None) -> Dict:
         """Amazon'dan ürün tekliflerini al"""
+        if await self.negative_cache.aget('offers', asin):
+            print(f"⏭️ Ürün teklifleri atlandı ({UPSTREAM_4XX}): {asin}")
+            return {}
         try:
             print(f"🔍 Ürün teklifleri alınıyor... ASIN: {asin}")
             
@@ -278,8 +525,8 @@ class AmazonCommentsAPI:
                 'page': 1
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=self.headers, params=params)
+            async with httpx.AsyncClient(timeout=timeout_for(deadline, 30.0)) as client:
+                response = await self.limiter.call(lambda: client.get(url, headers=self.headers, params=params))
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -292,6 +539,8 @@ class AmazonCommentsAPI:
                     return offers_data
                 else:
                     print(f"❌ Ürün teklifleri API hatası: {response.status_code}")
+                    if is_cacheable_failure(response.status_code):
+                        await self.negative_cache.arecord('offers', asin, UPSTREAM_4XX)
                     return {}
                     
         except Exception as e:
@@ -333,110 +582,6 @@ class AmazonCommentsAPI:
             print(f"❌ Teklif verileri çıkarılırken hata: {str(e)}")
             return {}
     
-    def _process_comments_data(self, raw_data: Dict, limit: int, product_details: Dict = None) -> Dict:
-        """Ham yorum verilerini işle ve formatla"""
-        try:
-            data = raw_data.get('data', {})
-            reviews = data.get('reviews', [])
-            
-            # Limit uygula
-            if limit and len(reviews) > limit:
-                reviews = reviews[:limit]
-            
-            processed_comments = []
-            total_rating = 0
-            rating_count = 0
-            
-            for review in reviews:
-                try:
-                    # Tarih formatını düzelt
-                    date_str = review.get('review_date', '')
-                    if date_str:
-                        # "Reviewed in the United States on September 18, 2024" formatını parse et
-                        try:
-                            # Tarih kısmını çıkar
-                            if "on " in date_str:
-                                date_part = date_str.split("on ")[-1]
-                                parsed_date = datetime.strptime(date_part, '%B %d, %Y')
-                                formatted_date = parsed_date.strftime('%Y-%m-%d')
-                            else:
-                                formatted_date = datetime.now().strftime('%Y-%m-%d')
-                        except:
-                            formatted_date = datetime.now().strftime('%Y-%m-%d')
-                    else:
-                        formatted_date = datetime.now().strftime('%Y-%m-%d')
-                    
-                    # Yıldız değerini sayıya çevir
-                    rating = review.get('review_star_rating', '0')
-                    if isinstance(rating, str):
-                        try:
-                            rating = float(rating.replace(',', '.'))
-                        except:
-                            rating = 0
-                    
-                    processed_comment = {
-                        'date': formatted_date,
-                        'rating': rating,
-                        'comment': review.get('review_comment', ''),
-                        'user': review.get('review_author', 'Anonim'),
-                        'title': review.get('review_title', ''),
-                        'year': datetime.strptime(formatted_date, '%Y-%m-%d').year if formatted_date else datetime.now().year,
-                        'verified': review.get('is_verified_purchase', False),
-                        'helpful_votes': str(review.get('helpful_vote_statement', '')) if review.get('helpful_vote_statement') else '0 kişi faydalı buldu',
-                        'review_link': review.get('review_link', '')
-                    }
-                    
-                    processed_comments.append(processed_comment)
-                    
-                    if rating > 0:
-                        total_rating += rating
-                        rating_count += 1
-                        
-                except Exception as e:
-                    print(f"⚠️ Yorum işlenirken hata: {str(e)}")
-                    continue
-            
-            # Ortalama yıldız hesapla
-            average_rating = total_rating / rating_count if rating_count > 0 else 0
-            
-            # Yıllara göre ortalama yıldız hesapla
-            yearly_ratings = {}
-            for comment in processed_comments:
-                year = comment['year']
-                if year not in yearly_ratings:
-                    yearly_ratings[year] = {'total': 0, 'count': 0}
-                yearly_ratings[year]['total'] += comment['rating']
-                yearly_ratings[year]['count'] += 1
-            
-            # Yıllık ortalamaları hesapla
-            for year in yearly_ratings:
-                if yearly_ratings[year]['count'] > 0:
-                    yearly_ratings[year]['average'] = round(yearly_ratings[year]['total'] / yearly_ratings[year]['count'], 2)
-                else:
-                    yearly_ratings[year]['average'] = 0.0
-            
-            print(f"🔍 Yıllık veriler: {yearly_ratings}")
-            
-            return {
-                'total_comments': len(processed_comments),
-                'average_rating': round(average_rating, 2),
-                'source': 'amazon_api',
-                'timestamp': datetime.now().isoformat(),
-                'comments': processed_comments,
-                'yearly_ratings': yearly_ratings,
-                'product_info': {
-                    'asin': data.get('asin', ''),
-                    'total_reviews': data.get('total_reviews', 0),
-                    'country': data.get('country', 'US'),
-                    'domain': data.get('domain', 'www.amazon.com')
-                },
-                'product_details': product_details
-            }
-            
-        except Exception as e:
-            print(f"❌ Veri işleme hatası: {str(e)}")
-            return self._get_sample_comments_data()
-    
     def _get_sample_comments_data(self) -> Dict:
         """Örnek yorum verileri (fallback için)"""
         print("📝 Örnek yorum verileri kullanılıyor...")
@@ -0,0 +1,417 @@
+import os
+import asyncio
+from typing import Dict, List, Optional
+from app.pipeline import PipelineGraph, PipelineResult, Stage
+from app.analysis_store import get_analysis_store
+from app.amazon_comments_api import OPTIONAL_CALL_MIN_BUDGET
+from app.deadline import has_budget
+from app.isbn import asin_from_texts
+from app.review_analytics import ReviewAnalytics
+
+# Her istekte endpoint'in verdiği başlangıç girdileri
+# (`degrade`: yük altında kabul denetiminin seçtiği hafif mod, bkz. app.admission)
+INITIAL_INPUTS = ('book_name', 'deadline', 'review_mode', 'latency_budget', 'degrade')
+
+# Yalnızca teklif bilgisine dayanan Gemini bölümleri (SerpAPI biter bitmez başlar)
+BASE_SECTIONS = ('analysis', 'seo_content', 'sales_recommendation', 'best_offer_summary', 'profit_analysis')
+# Yorum verisine dayanan bölümler (yorum yoksa None)
+REVIEW_SECTIONS = ('sentiment_analysis', 'user_based_description', 'trend_analysis')
+GEMINI_SECTIONS = BASE_SECTIONS + REVIEW_SECTIONS
+
+# Spekülatif ASIN aramasından önce SerpAPI sonucunun beklendiği süre (saniye)
+SPECULATIVE_ASIN_DELAY = float(os.getenv('SPECULATIVE_ASIN_DELAY', 1.0))
+
+# Hafif analiz profilleri: hangi parçaların hesaplanacağı (Excel raporu tüm bölümleri gerektirir)
+PROFILES = {
+    'prices': {'reviews': False, 'gemini': False, 'report': False},
+    'prices+reviews': {'reviews': True, 'gemini': False, 'report': False},
+    'full': {'reviews': True, 'gemini': True, 'report': True}
+}
+
+# Dropshipping fiyat hesabı varsayımları (Excel kâr sayfalarıyla aynı)
+COMMISSION_RATE = 0.21
+SHIPPING_COST = 70
+PROFIT_MARGIN = 100
+
+
+class BookNotFound(Exception):
+    """Aramada hiç teklif bulunamadı (endpoint 404 döndürür)"""
+
+
+class CacheOnlyMiss(Exception):
+    """Yalnızca önbellek modunda arama sonucu önbellekte yok (endpoint 503 döndürür)"""
+
+
+class UnknownProfile(ValueError):
+    """Tanımsız analiz profili (endpoint 400 döndürür)"""
+
+
+def analysis_targets(graph: PipelineGraph, profile: str = None, include_reviews: bool = None, include_gemini: bool = None, include_report: bool = None) -> Optional[List[str]]:
+    """
+    Profil ve istek seçeneklerinden grafın hedef aşamaları (None = tüm graf).
+
+    Yalnızca hedeflerin bağımlı olduğu aşamalar çalışır; ör. 'prices'
+    profilinde ASIN, yorum, Gemini ve Excel aşamaları hiç başlamaz.
+    """
+    if (profile or 'full') not in PROFILES:
+        raise UnknownProfile(f"Bilinmeyen profil: {profile} (geçerli: {', '.join(PROFILES)})")
+    parts = dict(PROFILES[profile or 'full'])
+    for name, value in (('reviews', include_reviews), ('gemini', include_gemini), ('report', include_report)):
+        if value is not None:
+            parts[name] = value
+    if parts['report'] and parts['reviews'] and parts['gemini']:
+        return None
+
+    targets = ['search_results', 'best_offer', 'pricing']
+    if parts['report']:
+        targets.append('excel_report')
+    if parts['reviews']:
+        targets.append('comments_data')
+    if parts['gemini']:
+        targets += ['gemini_analysis'] if parts['reviews'] else list(BASE_SECTIONS)
+    return [name for name in targets if name in graph.stages]
+
+
+def calculate_pricing(search_results: Dict, best_offer: Dict) -> Dict:
+    """En iyi teklif için önerilen satış fiyatı, kâr ve rakip fiyatları (Gemini'siz)"""
+    prices = [
+        offer.get('price', 0)
+        for platform, offers in search_results.items() if platform != 'best_offer' and isinstance(offers, list)
+        for offer in offers if offer.get('price', 0) > 0
+    ]
+    best_price = best_offer.get('price', 0)
+    total_cost = best_price + SHIPPING_COST
+    commission = (best_price + PROFIT_MARGIN) * COMMISSION_RATE
+    selling_price = total_cost + commission + PROFIT_MARGIN
+    return {
+        'buy_price': best_price,
+        'shipping_cost': SHIPPING_COST,
+        'commission': round(commission, 2),
+        'profit_margin': PROFIT_MARGIN,
+        'suggested_selling_price': round(selling_price, 2),
+        'profit_percentage': round(PROFIT_MARGIN / selling_price * 100, 1) if selling_price > 0 else 0,
+        'min_price': min(prices) if prices else 0,
+        'max_price': max(prices) if prices else 0,
+        'avg_price': round(sum(prices) / len(prices), 2) if prices else 0,
+        'can_compete': bool(prices) and selling_price < max(prices)
+    }
+
+
+def isbn_sources(book_name: str, search_results: Dict) -> List[str]:
+    """ASIN çözümü için ISBN aranacak metinler: teklif ISBN'leri ve kullanıcı sorgusu"""
+    offers = search_results.get('search_results', {}).get('serpapi', []) or []
+    best_offer = search_results.get('best_offer') or {}
+    isbns = [best_offer.get('isbn')] + [offer.get('isbn') for offer in offers]
+    return [isbn for isbn in isbns if isbn] + [book_name]
+
+
+def _lookup_stages(serp_agent, amazon_comments_api, review_limit: int) -> List[Stage]:
+    """Arama, ASIN çözümü ve Amazon yorum aşamaları (iki endpoint için ortak)"""
+
+    def best_offer(search_results):
+        offer = search_results.get('best_offer')
+        if not offer:
+            raise BookNotFound("Kitap bulunamadı")
+        print(f"✅ En iyi teklif bulundu: {offer['title']} - {offer['price']} TL")
+        return offer
+
+    async def search_results(book_name, deadline, degrade):
+        # Önbellekteki sonuç aşama önbelleğinden gelir; buraya ulaşıldıysa önbellekte yoktur
+        if degrade == 'cache_only':
+            raise CacheOnlyMiss("Arama sonucu önbellekte yok")
+        return await serp_agent.search_book(book_name, deadline)
+
+    async def speculative_asin(book_name, deadline, degrade, search_results):
+        if degrade == 'cache_only':
+            return None
+        # SerpAPI kısa sürede biterse sonucuna bakılır: teklif ISBN'i varsa ya da
+        # teklif başlığı sorguyla uyuşmuyorsa spekülatif sonuç kullanılmayacaktır
+        done, _ = await asyncio.wait({search_results}, timeout=SPECULATIVE_ASIN_DELAY)
+        if done:
+            if search_results.cancelled() or search_results.exception() is not None:
+                return None
+            offer = search_results.result().get('best_offer') or {}
+            book_title = offer.get('title', '').split(' - ')[0]
+            if asin_from_texts(isbn_sources('', search_results.result())) or not amazon_comments_api.titles_agree(book_name, book_title):
+                print("⏭️ Spekülatif ASIN araması atlandı")
+                return None
+        return await amazon_comments_api.search_book_asin(book_name, deadline)
+
+    async def asin(book_name, best_offer, search_results, deadline, degrade, speculative_asin):
+        if degrade == 'cache_only':
+            return None
+        # Teklif ISBN'i, yoksa spekülatif aramanın sonucu (başlıklar uyuşuyorsa)
+        book_title = best_offer.get('title', '').split(' - ')[0]
+        print("💬 Amazon'da kitap aranıyor...")
+        book_asin = await amazon_comments_api.resolve_speculative_asin(
+            speculative_asin, book_name, book_title, deadline,
+            isbn_sources=isbn_sources(book_name, search_results)
+        )
+        print(f"✅ Kitap ASIN bulundu: {book_asin}" if book_asin else "❌ Kitap ASIN bulunamadı")
+        return book_asin
+
+    async def reviews(asin, deadline):
+        return await amazon_comments_api.fetch_reviews(asin, limit=review_limit, deadline=deadline) if asin else None
+
+    async def details(asin, deadline):
+        return await amazon_comments_api._get_product_details(asin, deadline) if asin else {}
+
+    async def offers(asin, deadline):
+        if not asin:
+            return {}
+        if not has_budget(deadline, OPTIONAL_CALL_MIN_BUDGET):
+            print("⏰ Süre bütçesi azaldı, ürün teklifleri atlanıyor")
+            return {}
+        return await amazon_comments_api._get_product_offers(asin, deadline)
+
+    def comments_data(reviews, details, offers):
+        if reviews is None:
+            return None
+        data = amazon_comments_api.build_comments_data(reviews, details, offers)
+        if data.get('source') == 'sample_data':
+            print("❌ Bu kitap için yorum bulunamadı")
+        else:
+            print(f"✅ Başarılı! {data.get('total_comments', 0)} yorum bulundu")
+        return data
+
+    # İstemci ayrılsa da başlamış arama/ASIN/detay çağrıları tamamlanıp önbelleğe
+    # yazılır (kota harcanmıştır); yorum sayfaları ve Gemini bölümleri iptal edilir
+    return [
+        Stage('search_results', search_results,
+              inputs=['book_name', 'deadline', 'degrade'], shield=True,
+              memo_key=lambda book_name, **_: book_name.strip().lower(),
+              # Şablon (fallback) sonuçlar önbelleğe yazılmaz
+              memo_if=lambda value: bool(value.get('best_offer')) and value['best_offer'].get('source') != 'fallback'),
+        # Ham sorguyla ASIN araması, SerpAPI SPECULATIVE_ASIN_DELAY içinde ISBN'li
+        # bir teklif döndürmezse aramaya paralel (spekülatif) başlar
+        Stage('speculative_asin', speculative_asin, inputs=['book_name', 'deadline', 'degrade'], lazy_inputs=['search_results']),
+        Stage('best_offer', best_offer, inputs=['search_results']),
+        Stage('pricing', lambda search_results, best_offer: calculate_pricing(search_results['search_results'], best_offer),
+              inputs=['search_results', 'best_offer']),
+        Stage('book_title', lambda best_offer: best_offer.get('title', '').split(' - ')[0], inputs=['best_offer']),
+        Stage('asin', asin, inputs=['book_name', 'best_offer', 'search_results', 'deadline', 'degrade'], lazy_inputs=['speculative_asin']),
+        # Yorumlar, ürün detayları ve teklifler ASIN'den sonra eşzamanlı çekilir
+        Stage('reviews', reviews, inputs=['asin', 'deadline']),
+        Stage('details', details, inputs=['asin', 'deadline'], shield=True,
+              memo_key=lambda asin, deadline: asin, memo_if=bool),
+        Stage('offers', offers, inputs=['asin', 'deadline'], shield=True,
+              memo_key=lambda asin, deadline: asin, memo_if=bool),
+        Stage('comments_data', comments_data, inputs=['reviews', 'details', 'offers'])
+    ]
+
+
+def _gemini_stages(gemini_agent) -> List[Stage]:
+    """Her Gemini bölümü ayrı aşamadır; süre bütçesini aşanlar şablonla yanıtlanıp arka planda tamamlanır"""
+
+    def section_timeout(latency_budget, deadline, **_):
+        return gemini_agent.section_wait_timeout(latency_budget, deadline)
+
+    def has_comments(comments_data) -> bool:
+        return bool(comments_data and comments_data.get('comments'))
+
+    def section_fallback(name):
+        def fallback(best_offer, comments_data=None, **_):
+            if name in REVIEW_SECTIONS and not has_comments(comments_data):
+                return None
+            return gemini_agent.get_fallback_content(best_offer).get(name, '')
+        return fallback
+
+    base_prompts = {
+        'analysis': lambda search_results, best_offer: gemini_agent.create_analysis_prompt(search_results['search_results'], best_offer),
+        'seo_content': lambda search_results, best_offer: gemini_agent.create_seo_prompt(best_offer),
+        'sales_recommendation': lambda search_results, best_offer: gemini_agent.create_sales_prompt(best_offer),
+        'best_offer_summary': lambda search_results, best_offer: gemini_agent.create_summary_prompt(best_offer),
+        'profit_analysis': lambda search_results, best_offer: gemini_agent.create_profit_analysis_prompt(search_results['search_results'], best_offer)
+    }
+
+    def base_section(name):
+        async def run(search_results, best_offer, latency_budget, deadline, degrade):
+            if degrade:
+                return section_fallback(name)(best_offer)
+            prompt = base_prompts[name](search_results, best_offer)
+            return await gemini_agent.generate_section(name, prompt, section_fallback(name)(best_offer))
+        return run
+
+    def review_insights(comments_data):
+        if not has_comments(comments_data):
+            return None
+        print("🧠 Yorum analizleri yapılıyor...")
+        return gemini_agent.review_analytics.analyze(comments_data)
+
+    async def sentiment_analysis(comments_data, review_insights, review_mode, best_offer, latency_budget, deadline, degrade):
+        if not has_comments(comments_data):
+            return None
+        if degrade or (review_mode or gemini_agent.review_mode) == 'fast':
+            return ReviewAnalytics.format_report(review_insights)
+        prompt = gemini_agent.create_sentiment_analysis_prompt(comments_data, review_insights)
+        return await gemini_agent.generate_section('sentiment_analysis', prompt, section_fallback('sentiment_analysis')(best_offer, comments_data))
+
+    async def user_based_description(comments_data, best_offer, latency_budget, deadline, degrade):
+        if not has_comments(comments_data):
+            return None
+        if degrade:
+            return section_fallback('user_based_description')(best_offer, comments_data)
+        prompt = gemini_agent.create_user_based_description_prompt(comments_data, best_offer)
+        return await gemini_agent.generate_section('user_based_description', prompt, section_fallback('user_based_description')(best_offer, comments_data))
+
+    async def trend_analysis(comments_data, best_offer, latency_budget, deadline, degrade):
+        if not has_comments(comments_data):
+            return None
+        if degrade:
+            return section_fallback('trend_analysis')(best_offer, comments_data)
+        prompt = gemini_agent.create_trend_analysis_prompt(comments_data)
+        return await gemini_agent.generate_section('trend_analysis', prompt, section_fallback('trend_analysis')(best_offer, comments_data))
+
+    def gemini_analysis(**sections):
+        return {name: sections[name] for name in GEMINI_SECTIONS + ('review_insights',)}
+
+    stages = [
+        Stage(name, base_section(name), inputs=['search_results', 'best_offer', 'latency_budget', 'deadline', 'degrade'],
+              timeout=section_timeout, fallback=section_fallback(name), keep_late=True)
+        for name in BASE_SECTIONS
+    ]
+    stages += [
+        Stage('review_insights', review_insights, inputs=['comments_data'], run_in_thread=True),
+        Stage('sentiment_analysis', sentiment_analysis,
+              inputs=['comments_data', 'review_insights', 'review_mode', 'best_offer', 'latency_budget', 'deadline', 'degrade'],
+              timeout=section_timeout, fallback=section_fallback('sentiment_analysis'), keep_late=True),
+        Stage('user_based_description', user_based_description,
+              inputs=['comments_data', 'best_offer', 'latency_budget', 'deadline', 'degrade'],
+              timeout=section_timeout, fallback=section_fallback('user_based_description'), keep_late=True),
+        Stage('trend_analysis', trend_analysis,
+              inputs=['comments_data', 'best_offer', 'latency_budget', 'deadline', 'degrade'],
+              timeout=section_timeout, fallback=section_fallback('trend_analysis'), keep_late=True),
+        Stage('gemini_analysis', gemini_analysis, inputs=list(GEMINI_SECTIONS) + ['review_insights'])
+    ]
+    return stages
+
+
+def build_search_graph(serp_agent, amazon_comments_api, gemini_agent, excel_generator, review_limit: int = 10) -> PipelineGraph:
+    """Temel analiz (/search-book): arama, yorumlar, Gemini bölümleri ve 4 sayfalık Excel raporu"""
+
+    def excel_report(search_results, best_offer, gemini_analysis):
+        print("📊 Excel raporu oluşturuluyor...")
+        return excel_generator.create_book_analysis_report(search_results['search_results'], best_offer, gemini_analysis)
+
+    stages = _lookup_stages(serp_agent, amazon_comments_api, review_limit) + _gemini_stages(gemini_agent) + [
+        Stage('excel_report', excel_report, inputs=['search_results', 'best_offer', 'gemini_analysis'], run_in_thread=True)
+    ]
+    return PipelineGraph('search_book', stages, INITIAL_INPUTS)
+
+
+def build_advanced_graph(serp_agent, amazon_comments_api, gemini_agent, advanced_excel_generator, google_trends_scraper, review_limit: int = 100) -> PipelineGraph:
+    """
+    Gelişmiş analiz (/search-book-advanced): temel grafa Trends, ML tahmini ve
+    grafikli Excel raporu eklenir. Rapor (openpyxl grafikleri dahil) olay
+    döngüsünü bekletmesin diye tek bir iş parçacığında yazılır; çalışma
+    kitabına tek iş parçacığı dokunduğu için openpyxl güvenliği korunur.
+    """
+    generator = advanced_excel_generator
+
+    def sales_prediction(best_offer, comments_data, trends_data):
+        return generator.predict_for_report(best_offer, None, comments_data, trends_data)
+
+    def excel_report(search_results, best_offer, gemini_analysis, comments_data, sales_prediction, deadline):
+        print("📊 Gelişmiş Excel raporu oluşturuluyor...")
+        return generator.create_advanced_book_analysis_report(
+            search_results['search_results'], best_offer, gemini_analysis,
+            comments_data=comments_data, deadline=deadline, sales_prediction=sales_prediction
+        )
+
+    stages = _lookup_stages(serp_agent, amazon_comments_api, review_limit) + _gemini_stages(gemini_agent) + [
+        Stage('trends_data', lambda book_title, deadline, degrade: google_trends_scraper.get_book_trends_data(book_title, deadline, allow_live=degrade != 'cache_only'),
+              inputs=['book_title', 'deadline', 'degrade']),
+        Stage('sales_prediction', sales_prediction, inputs=['best_offer', 'comments_data', 'trends_data'], run_in_thread=True),
+        Stage('excel_report', excel_report,
+              inputs=['search_results', 'best_offer', 'gemini_analysis', 'comments_data', 'sales_prediction', 'deadline'],
+              run_in_thread=True)
+    ]
+    return PipelineGraph('search_book_advanced', stages, INITIAL_INPUTS)
+
+
+# Graf adına göre yanıt mesajı ({title} en iyi teklif başlığıdır)
+RESPONSE_MESSAGES = {
+    'search_book': "✅ {title} için detaylı analiz ve Excel raporu tamamlandı!",
+    'search_book_advanced': "✅ {title} için gelişmiş analiz, ML tahminleri ve grafikli Excel raporu tamamlandı!"
+}
+# Excel raporu üretilmeyen (hafif profil) yanıtlar için
+PARTIAL_MESSAGE = "✅ {title} için {parts} analizi tamamlandı!"
+
+
+async def build_analysis_response(graph: PipelineGraph, result: PipelineResult, analysis_id: str, degrade: str = None, compact: bool = False) -> Dict:
+    """Graf çıktısından endpoint/iş yanıtı; yalnızca hesaplanan parçalar eklenir"""
+    best_offer = result['best_offer']
+    response = {
+        "success": True,
+        "search_results": result['search_results'],
+        "best_offer": best_offer,
+        "pricing": result['pricing']
+    }
+    parts = ['fiyat']
+    if 'comments_data' in result.values:
+        response["comments_data"] = result['comments_data']
+        parts.append('yorum')
+    gemini_analysis = await finalize_gemini_analysis(result, analysis_id)
+    if gemini_analysis is not None:
+        response["gemini_analysis"] = gemini_analysis
+        response["analysis_id"] = analysis_id
+        parts.append('Gemini')
+    if 'excel_report' in result.values:
+        response["excel_report"] = result['excel_report']
+    if 'trends_data' in result.values:
+        response["trends_data"] = result['trends_data']
+    if degrade:
+        # Yük altında hafif modda üretildi (Gemini bölümleri şablondur)
+        response["degraded"] = degrade
+    response["timings"] = result.timings_report()
+    if 'excel_report' in result.values:
+        response["message"] = RESPONSE_MESSAGES[graph.name].format(title=best_offer['title'])
+    else:
+        response["message"] = PARTIAL_MESSAGE.format(title=best_offer['title'], parts=', '.join(parts))
+    return compact_analysis_response(response) if compact else response
+
+
+def compact_analysis_response(response: Dict) -> Dict:
+    """
+    Tekrarlanan ve ham upstream alanlarını çıkar: arama sonuçlarındaki iki
+    best_offer kopyası, yorum verisindeki ham product_details, boş Gemini
+    bölümleri ve aşama başlangıç/durum bilgileri. Analiz deposundaki nesneler
+    değiştirilmez, kopyalanır.
+    """
+    compact = dict(response)
+    offers = response['search_results'].get('search_results', {})
+    compact['search_results'] = {platform: items for platform, items in offers.items() if platform != 'best_offer'}
+    if response.get('comments_data'):
+        compact['comments_data'] = {key: value for key, value in response['comments_data'].items() if key != 'product_details'}
+    if response.get('gemini_analysis'):
+        compact['gemini_analysis'] = {
+            key: value for key, value in response['gemini_analysis'].items()
+            if value is not None and key != 'analysis_id' and not (key == 'pending_sections' and not value)
+        }
+    timings = response['timings']
+    compact['timings'] = {
+        'total_seconds': timings['total_seconds'],
+        'stages': {name: timing.get('duration', 0.0) for name, timing in timings['stages'].items()}
+    }
+    return compact
+
+
+async def finalize_gemini_analysis(result: PipelineResult, analysis_id: str) -> Optional[Dict]:
+    """
+    Şablonla yanıtlanan bölümleri işaretle ve geç tamamlanmaları analiz deposuna
+    bağla. Profil yorum bölümlerini dışladıysa yalnızca çalışan bölümler döner;
+    hiç Gemini bölümü çalışmadıysa None.
+    """
+    if 'gemini_analysis' in result.values:
+        gemini_analysis = result['gemini_analysis']
+    elif any(name in result.values for name in GEMINI_SECTIONS):
+        gemini_analysis = {name: result[name] for name in GEMINI_SECTIONS if name in result.values}
+    else:
+        return None
+    late = {name: task for name, task in result.late.items() if name in GEMINI_SECTIONS}
+    if late:
+        print(f"⏰ Süre bütçesi içinde dönmeyen bölümler şablonla yanıtlandı: {', '.join(sorted(late))}")
+    gemini_analysis['analysis_id'] = analysis_id
+    gemini_analysis['pending_sections'] = sorted(late)
+    await get_analysis_store().create(analysis_id, gemini_analysis, late)
+    return gemini_analysis
@@ -0,0 +1,83 @@
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+from app.cache import SharedCache
+
+
+class AnalysisStore:
+    """
+    Süre sınırı nedeniyle geç kalan Gemini bölümlerinin saklandığı kayıt.
+
+    Endpoint süre dolduğunda şablon içerikle yanıt verir; bekleyen bölüm
+    görevleri buraya bağlanır ve tamamlandıkça analysis_id altındaki kaydı
+    gerçek sonuçla günceller. Kayıtlar paylaşılan önbellekte (SharedCache)
+    tutulur, böylece GET /analysis/{id} hangi işçiye düşerse düşsün aynı
+    kaydı görür. Görevler onları başlatan süreçte kalır; güçlü referans
+    tutulur (çöp toplayıcı iptal etmesin) ve aynı kayda yazmalar süreç içi
+    kilitle sıralanır.
+    """
+
+    def __init__(self, ttl_seconds: float = None, cache: SharedCache = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('ANALYSIS_STORE_TTL', 3600))
+        self._entries = cache or SharedCache('analysis', ttl_seconds=self.ttl_seconds)
+        self._tasks: Dict[str, Dict[str, asyncio.Task]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def create(self, analysis_id: str, sections: Dict, pending: Dict[str, asyncio.Task]) -> Dict:
+        """Anlık sonucu kaydet ve bekleyen bölüm görevlerini kayda bağla"""
+        now = time.time()
+        entry = {
+            'analysis_id': analysis_id,
+            'status': 'partial' if pending else 'complete',
+            'sections': dict(sections),
+            'pending_sections': sorted(pending),
+            'late_sections': [],
+            'created_at': now,
+            'updated_at': now
+        }
+        await self._entries.aset(analysis_id, entry)
+
+        if pending:
+            self._tasks[analysis_id] = dict(pending)
+            self._locks[analysis_id] = asyncio.Lock()
+            for name, task in pending.items():
+                task.add_done_callback(lambda t, name=name: asyncio.ensure_future(self._fill(analysis_id, name, t)))
+        return entry
+
+    async def _fill(self, analysis_id: str, name: str, task: asyncio.Task) -> None:
+        lock = self._locks.get(analysis_id)
+        if lock is None:
+            return
+        async with lock:
+            entry = await self._entries.aget(analysis_id)
+            if entry is not None:
+                if not task.cancelled() and task.exception() is None:
+                    entry['sections'][name] = task.result()
+                    entry['late_sections'].append(name)
+                    print(f"📥 Geç gelen bölüm kaydedildi: {analysis_id}/{name}")
+                entry['pending_sections'] = [s for s in entry['pending_sections'] if s != name]
+                if not entry['pending_sections']:
+                    entry['status'] = 'complete'
+                entry['updated_at'] = time.time()
+                await self._entries.aset(analysis_id, entry)
+
+        tasks = self._tasks.get(analysis_id, {})
+        tasks.pop(name, None)
+        if not tasks:
+            self._tasks.pop(analysis_id, None)
+            self._locks.pop(analysis_id, None)
+
+    async def get(self, analysis_id: str) -> Optional[Dict]:
+        return await self._entries.aget(analysis_id)
+
+
+_default_store = None
+
+
+def get_analysis_store() -> AnalysisStore:
+    """Süreç içinde paylaşılan analiz kaydı (kayıtlar SHARED_STATE_BACKEND'de)"""
+    global _default_store
+    if _default_store is None:
+        _default_store = AnalysisStore()
+    return _default_store
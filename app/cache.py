@@ -0,0 +1,110 @@
+import os
+import json
+from typing import Any, Hashable, Optional
+from app.shared_state import StateBackend, get_state_backend
+
+
+class SharedCache:
+    """
+    Paylaşılan durum arka ucunda (bkz. app.shared_state) ad alanlı TTL önbellek.
+
+    Değerler JSON olarak saklandığından tüm işçiler (ve SQLite/Redis ile
+    tüm süreçler) aynı kayıtları görür. Her okuma yeni bir kopya döndürür.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float = 3600, backend: StateBackend = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend or get_state_backend()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ':'.join([self.namespace, *(str(part) for part in parts)])
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._decode(self.backend.get(self._key(key)), default)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.backend.set(self._key(key), json.dumps(value, ensure_ascii=False), ttl)
+
+    def delete(self, key: Hashable) -> None:
+        self.backend.delete(self._key(key))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.backend.get(self._key(key)) is not None
+
+    def _decode(self, raw: Optional[str], default: Any) -> Any:
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    async def aget(self, key: Hashable, default: Any = None) -> Any:
+        """`get`in olay döngüsünü bekletmeyen sürümü (async kodda bunu kullanın)"""
+        return self._decode(await self.backend.acall('get', self._key(key)), default)
+
+    async def aset(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        await self.backend.acall('set', self._key(key), json.dumps(value, ensure_ascii=False), ttl)
+
+    def stats(self) -> dict:
+        return {'backend': self.backend.name, 'hits': self.hits, 'misses': self.misses}
+
+
+# Negatif önbellek neden kodları
+NO_ASIN = 'no_asin'
+NO_REVIEWS = 'no_reviews'
+NO_SHOPPING_RESULTS = 'no_shopping_results'
+UPSTREAM_4XX = 'upstream_4xx'
+
+
+def is_cacheable_failure(status_code: int) -> bool:
+    """Tekrar denense de değişmeyecek istemci hataları (zaman aşımı ve kota hariç)"""
+    return 400 <= status_code < 500 and status_code not in (408, 429)
+
+
+class NegativeCache:
+    """
+    Sonuçsuz aramalar için kısa ömürlü önbellek.
+
+    Kayıtlar pozitif önbelleklerden ayrı tutulur ve yalnızca neden kodu
+    saklar; şablon/örnek veri hiçbir zaman önbelleğe yazılmaz. Kayıt
+    süresince aynı arama upstream'e gitmeden "sonuç yok" döner.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, backend: StateBackend = None):
+        self._entries = SharedCache('negative', ttl_seconds=ttl_seconds, backend=backend)
+        self.recorded: dict = {}
+
+    def record(self, namespace: str, key: Hashable, reason: str, ttl_seconds: Optional[float] = None) -> None:
+        self._entries.set((namespace, key), reason, ttl_seconds)
+        self.recorded[reason] = self.recorded.get(reason, 0) + 1
+
+    def get(self, namespace: str, key: Hashable) -> Optional[str]:
+        """Kayıtlıysa neden kodu, değilse None"""
+        return self._entries.get((namespace, key))
+
+    async def arecord(self, namespace: str, key: Hashable, reason: str, ttl_seconds: Optional[float] = None) -> None:
+        await self._entries.aset((namespace, key), reason, ttl_seconds)
+        self.recorded[reason] = self.recorded.get(reason, 0) + 1
+
+    async def aget(self, namespace: str, key: Hashable) -> Optional[str]:
+        return await self._entries.aget((namespace, key))
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), 'recorded': dict(self.recorded)}
+
+
+_default_negative_cache: Optional[NegativeCache] = None
+
+
+def get_negative_cache() -> NegativeCache:
+    """Süreç genelinde paylaşılan negatif önbellek (NEGATIVE_CACHE_TTL saniye)"""
+    global _default_negative_cache
+    if _default_negative_cache is None:
+        _default_negative_cache = NegativeCache(ttl_seconds=float(os.getenv('NEGATIVE_CACHE_TTL', 300)))
+    return _default_negative_cache
@@ -0,0 +1,291 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from app.hedging import LatencyTracker
+from app.shared_state import StateBackend, get_state_backend
+
+T = TypeVar('T')
+
+# Upstream'in kapasitesinin dolduğunu bildiren durum kodları
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+def is_overload_response(response: Any) -> bool:
+    return getattr(response, 'status_code', None) in OVERLOAD_STATUS_CODES
+
+
+def is_error_response(response: Any) -> bool:
+    """Aşırı yük dışındaki 5xx yanıtlar (sağlıksız sayılır, sınırı büyütmez)"""
+    status_code = getattr(response, 'status_code', None)
+    return status_code is not None and status_code >= 500 and status_code not in OVERLOAD_STATUS_CODES
+
+
+class AdaptiveLimiter:
+    """
+    Upstream başına uyarlanabilir eşzamanlılık sınırı (AIMD).
+
+    Her sağlıklı yanıtta sınır 1/sınır kadar artar (yaklaşık her tam
+    pencerede +1); hata (istisna veya 5xx) sınırı hiç artırmaz. 429/503,
+    gecikme sıçraması (son gecikmelerin medyanının `spike_factor` katı)
+    veya son `error_window` çağrıdaki hata oranının `error_threshold`
+    üstüne çıkmasında sınır `decrease_factor` ile çarpılır.
+    Aynı anda gelen hata yığını sınırı bir kerede çökertmesin diye
+    azaltmalar arasında en az `cooldown` saniye bırakılır. Sınır dolunca
+    yeni çağrılar FIFO sırasıyla bekler.
+
+    Paylaşılan bir durum arka ucu (SQLite/Redis) verilirse sınır tüm
+    işçiler için tektir: artış/azalışlar arka uçta tutulur ve her işçi
+    sınırın, son `heartbeat` aralıklarında etkin olan işçi sayısına
+    bölünmüş payını kullanır. Çöken işçinin payı kalıcı olarak kaybolmaz,
+    işçi sayısı birkaç aralık içinde kendiliğinden düşer. Arka uç okuma ve
+    yazmaları iş parçacığında yapılır (olay döngüsü beklemez); artışlar
+    biriktirilip tek yazmada gönderilir.
+    """
+
+    # Paylaşılan sınır kaydının ömrü; dolarsa ilk eşitleyen işçi kendi değeriyle yeniden yazar
+    SHARED_LIMIT_TTL = 3600
+
+    def __init__(self, name: str, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 32, decrease_factor: float = 0.5, spike_factor: float = 3.0, min_samples: int = 20, cooldown: float = 1.0, window: int = 256, error_window: int = 20, error_threshold: float = 0.5, backend: StateBackend = None, sync_interval: float = 0.5, heartbeat: float = 5.0):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.decrease_factor = decrease_factor
+        self.spike_factor = spike_factor
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.tracker = LatencyTracker(window)
+        self.error_threshold = error_threshold
+        self._outcomes: deque = deque(maxlen=error_window)
+
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._last_decrease = 0.0
+        self.requests = 0
+        self.overloads = 0
+        self.latency_spikes = 0
+        self.errors = 0
+        self.decreases = 0
+        self.peak_in_flight = 0
+
+        self.state = backend if backend is not None and backend.shared else None
+        self.sync_interval = sync_interval
+        self.heartbeat = heartbeat
+        self.workers = 1
+        self._key = f"limiter:{name}"
+        self._synced_at = 0.0
+        self._epoch = None
+        self._pending_step = 0.0
+        self._step_lock = threading.Lock()
+        self._flushing = None
+        self._decreasing = None
+
+    def capacity(self) -> int:
+        """Bu işçinin aynı anda gönderebileceği istek sayısı"""
+        return max(1, int(self.limit / self.workers))
+
+    def _has_room(self) -> bool:
+        return self.in_flight < self.capacity()
+
+    async def _sync(self) -> None:
+        """Paylaşılan sınırı ve etkin işçi sayısını en fazla `sync_interval` aralıkla oku"""
+        now = time.monotonic()
+        if self.state is None or now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        await asyncio.to_thread(self._read_shared)
+
+    def _read_shared(self) -> None:
+        epoch = int(time.time() // self.heartbeat)
+        if epoch != self._epoch:
+            self._epoch = epoch
+            self.state.incr(f"{self._key}:workers:{epoch}", 1, self.heartbeat * 3)
+        counts = [self.state.get(f"{self._key}:workers:{e}") for e in (epoch - 1, epoch)]
+        self.workers = max([1] + [int(float(c)) for c in counts if c is not None])
+
+        shared = self.state.get(f"{self._key}:limit")
+        if shared is None:
+            self.state.add(f"{self._key}:limit", str(self.limit), self.SHARED_LIMIT_TTL)
+        else:
+            self.limit = min(self.max_limit, max(self.min_limit, float(shared)))
+
+    @staticmethod
+    def _in_thread(func: Callable[[], None]) -> Optional[asyncio.Future]:
+        """Arka uç yazmasını iş parçacığında başlat (olay döngüsü yoksa hemen çalıştır)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            func()
+            return None
+        return loop.create_task(asyncio.to_thread(func))
+
+    def _decrease(self) -> None:
+        if self.state is None:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self.decreases += 1
+        elif self._decreasing is None or self._decreasing.done():
+            self._decreasing = self._in_thread(self._shared_decrease)
+
+    def _shared_decrease(self) -> None:
+        # Bekleme süresi tüm işçiler için ortaktır
+        if not self.state.add(f"{self._key}:cooldown", '1', self.cooldown):
+            return
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.state.set(f"{self._key}:limit", str(self.limit), self.SHARED_LIMIT_TTL)
+        self.decreases += 1
+
+    def _increase(self) -> None:
+        step = 1.0 / self.limit
+        if self.state is None:
+            self.limit = min(self.max_limit, self.limit + step)
+            return
+        with self._step_lock:
+            self._pending_step += step
+        if self._flushing is None or self._flushing.done():
+            self._flushing = self._in_thread(self._flush_increase)
+
+    def _flush_increase(self) -> None:
+        # Yazma sürerken gelen artışlar bir sonraki turda tek INCR ile gönderilir
+        while True:
+            with self._step_lock:
+                step, self._pending_step = self._pending_step, 0.0
+            if step <= 0:
+                return
+            value = self.state.incr(f"{self._key}:limit", step, self.SHARED_LIMIT_TTL)
+            if value < self.min_limit or value > self.max_limit:
+                # Kayıt yoktu (sayaç sıfırdan başladı) veya üst sınır aşıldı
+                value = min(self.max_limit, max(self.min_limit, self.limit + step if value < self.min_limit else value))
+                self.state.set(f"{self._key}:limit", str(value), self.SHARED_LIMIT_TTL)
+            self.limit = value
+
+    def _grant_waiters(self) -> None:
+        while self._waiters and self._has_room():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        """Bir eşzamanlılık hakkı al (sınır doluysa sırayla bekle)"""
+        await self._sync()
+        if self._has_room() and not self._waiters:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Hak verilmişti ama bekleyen iptal edildi: hakkı geri bırak
+                    self.in_flight -= 1
+                    self._grant_waiters()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, failed: bool = False) -> None:
+        """
+        Hakkı bırak ve sonucu sınıra yansıt. `latency` None ise (akışlar,
+        iptaller) yalnızca aşırı yük ve hata sinyalleri değerlendirilir.
+        """
+        self.in_flight -= 1
+        self.requests += 1
+
+        spike = False
+        if latency is not None:
+            if self.tracker.count >= self.min_samples:
+                spike = latency > self.spike_factor * self.tracker.percentile(50)
+            # Hızlı bağlantı hataları medyanı aşağı çekmesin
+            if not failed:
+                self.tracker.record(latency)
+
+        error_burst = False
+        if latency is not None or overloaded or failed:
+            self._outcomes.append(overloaded or failed)
+            self.errors += failed
+            error_burst = failed and len(self._outcomes) >= self._outcomes.maxlen // 2 and self.error_rate() > self.error_threshold
+
+        if overloaded or spike or error_burst:
+            self.overloads += overloaded
+            self.latency_spikes += spike
+            self._decrease()
+        elif not failed and latency is not None and self.in_flight + 1 >= self.capacity():
+            # Yalnızca sınıra dayanmışken artır (boşta büyüyüp anlamsızlaşmasın)
+            self._increase()
+
+        self._grant_waiters()
+
+    async def call(self, factory: Callable[[], Awaitable[T]], is_overloaded: Callable[[T], bool] = is_overload_response, is_failed: Callable[[T], bool] = is_error_response) -> T:
+        """`factory()` çağrısını sınır altında çalıştır; süre ve yanıt sınırı günceller"""
+        await self.acquire()
+        started = time.perf_counter()
+        latency, overloaded, failed = None, False, False
+        try:
+            result = await factory()
+            latency, overloaded, failed = time.perf_counter() - started, is_overloaded(result), is_failed(result)
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Zaman aşımı gibi hatalar uzun süreyle gecikme sıçraması olarak da yansır
+            latency, failed = time.perf_counter() - started, True
+            raise
+        finally:
+            self.release(latency, overloaded, failed)
+
+    def metrics(self) -> Dict:
+        return {
+            'limit': round(self.limit, 2),
+            'capacity': self.capacity(),
+            'workers': self.workers,
+            'shared': self.state is not None,
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            'peak_in_flight': self.peak_in_flight,
+            'requests': self.requests,
+            'overloads': self.overloads,
+            'latency_spikes': self.latency_spikes,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate(), 3),
+            'decreases': self.decreases,
+            'p50_seconds': self.tracker.percentile(50)
+        }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """
+    Sağlayıcı adına göre paylaşılan sınırlayıcı ('serpapi', 'rapidapi', 'gemini').
+
+    CONCURRENCY_INITIAL_LIMIT, CONCURRENCY_MIN_LIMIT ve CONCURRENCY_MAX_LIMIT
+    varsayılanları değiştirir; SHARED_STATE_BACKEND sqlite/redis ise sınır
+    işçiler arasında paylaşılır.
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = AdaptiveLimiter(
+            name,
+            initial_limit=float(os.getenv('CONCURRENCY_INITIAL_LIMIT', 4)),
+            min_limit=float(os.getenv('CONCURRENCY_MIN_LIMIT', 1)),
+            max_limit=float(os.getenv('CONCURRENCY_MAX_LIMIT', 32)),
+            backend=get_state_backend()
+        )
+    return limiter
+
+
+def concurrency_metrics() -> Dict[str, Dict]:
+    return {name: limiter.metrics() for name, limiter in _limiters.items()}
@@ -0,0 +1,60 @@
+import os
+import time
+from typing import Optional
+
+# İstek başına varsayılan uçtan uca süre bütçesi (saniye)
+DEFAULT_REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 45))
+
+# Zaman aşımı hiçbir zaman bunun altına inmez (bağlantı kurulabilsin)
+MIN_TIMEOUT = 0.5
+
+
+class Deadline:
+    """
+    İstek kapsamlı uçtan uca süre sınırı.
+
+    Endpoint'te oluşturulur ve aşamalara `deadline` parametresiyle geçirilir.
+    Her aşama kendi zaman aşımını `timeout` ile kalan bütçeden hesaplar ve
+    isteğe bağlı işleri (ek yorum sayfaları, teklifler, grafikler)
+    `has_budget` ile bütçe azaldığında atlar.
+    """
+
+    __slots__ = ('budget', 'started_at', 'expires_at')
+
+    def __init__(self, budget: float = None):
+        self.budget = budget if budget is not None else DEFAULT_REQUEST_DEADLINE
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def has_budget(self, seconds: float) -> bool:
+        """En az `seconds` saniye kaldı mı (isteğe bağlı işler için)"""
+        return self.remaining() >= seconds
+
+    def timeout(self, default: float, reserve: float = 0.0) -> float:
+        """
+        Aşamanın zaman aşımı: varsayılan değer ile (kalan - sonraki aşamalara
+        ayrılan pay) arasından küçüğü.
+        """
+        return max(MIN_TIMEOUT, min(default, self.remaining() - reserve))
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.2f}s of {self.budget:.2f}s)"
+
+
+def timeout_for(deadline: Optional[Deadline], default: float, reserve: float = 0.0) -> float:
+    """Deadline yoksa varsayılan zaman aşımını, varsa kalan bütçeye göre kısaltılmışını döndür"""
+    return deadline.timeout(default, reserve) if deadline is not None else default
+
+
+def has_budget(deadline: Optional[Deadline], seconds: float) -> bool:
+    return deadline is None or deadline.has_budget(seconds)
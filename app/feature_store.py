@@ -0,0 +1,199 @@
+import os
+import json
+import hashlib
+import numpy as np
+from typing import Dict, Tuple
+
+# Kitap kategorileri ve satış parametreleri (örnek eğitim verisi için)
+CATEGORY_PARAMS = {
+    'Roman': {'base_sales': 150, 'price_sensitivity': -2.5},
+    'Bilim Kurgu': {'base_sales': 80, 'price_sensitivity': -1.8},
+    'Tarih': {'base_sales': 60, 'price_sensitivity': -1.2},
+    'Felsefe': {'base_sales': 40, 'price_sensitivity': -0.8},
+    'Bilim': {'base_sales': 70, 'price_sensitivity': -1.5},
+    'Çocuk': {'base_sales': 200, 'price_sensitivity': -3.0},
+    'Eğitim': {'base_sales': 120, 'price_sensitivity': -2.0},
+    'Klasik': {'base_sales': 90, 'price_sensitivity': -1.6}
+}
+
+FEATURE_COLUMNS = ['price', 'popularity']
+
+
+class SalesFeatureStore:
+    """
+    ML eğitim matrislerini kategori bazında diskte tutan özellik deposu.
+
+    Veri bir kez üretilir, `.npy` dosyalarına yazılır ve salt-okunur
+    memory-map olarak açılır. Böylece aynı makinedeki tüm uvicorn worker'ları
+    işletim sisteminin sayfa önbelleğindeki tek kopyayı paylaşır.
+
+    Dosya düzeni: her kategori `features`/`targets` dizilerinde bitişik bir
+    bloktur; bloğun ilk `n_train` satırı eğitim, kalanı test verisidir.
+    """
+
+    VERSION = 1
+
+    def __init__(self, store_dir: str = None, samples_per_category: int = 50, test_size: float = 0.2, seed: int = 42):
+        self.store_dir = store_dir or os.getenv('FEATURE_STORE_DIR', os.path.join('data', 'feature_store'))
+        self.samples_per_category = samples_per_category
+        self.test_size = test_size
+        self.seed = seed
+
+        self._features = None
+        self._targets = None
+        self._index = None
+        self._all_split = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Depo içeriğini belirleyen parametrelerin özeti (değişirse yeniden üretilir)"""
+        payload = json.dumps({
+            'version': self.VERSION,
+            'categories': CATEGORY_PARAMS,
+            'samples_per_category': self.samples_per_category,
+            'test_size': self.test_size,
+            'seed': self.seed
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def categories(self) -> list:
+        self._ensure_loaded()
+        return list(self._index['categories'].keys())
+
+    def _paths(self) -> Dict[str, str]:
+        return {
+            'features': os.path.join(self.store_dir, 'features.npy'),
+            'targets': os.path.join(self.store_dir, 'targets.npy'),
+            'manifest': os.path.join(self.store_dir, 'manifest.json')
+        }
+
+    def _build_arrays(self) -> Tuple[np.ndarray, np.ndarray, Dict]:
+        """Tüm kategoriler için eğitim verisini vektörel olarak üret"""
+        rng = np.random.default_rng(self.seed)
+        n = self.samples_per_category
+        n_test = int(np.ceil(n * self.test_size))
+        n_train = n - n_test
+
+        features = np.empty((n * len(CATEGORY_PARAMS), len(FEATURE_COLUMNS)), dtype=np.float64)
+        targets = np.empty(n * len(CATEGORY_PARAMS), dtype=np.float64)
+        index = {}
+
+        for i, (category, params) in enumerate(CATEGORY_PARAMS.items()):
+            start = i * n
+            price = rng.uniform(20, 200, n)
+            popularity = rng.uniform(0.1, 1.0, n)
+            noise = rng.normal(0, 10, n)
+
+            # Satış tahmini formülü
+            price_effect = params['price_sensitivity'] * (price - 100) / 100
+            popularity_effect = popularity * 50
+            monthly_sales = np.maximum(0, np.trunc(params['base_sales'] + price_effect + popularity_effect + noise))
+
+            features[start:start + n, 0] = price
+            features[start:start + n, 1] = popularity
+            targets[start:start + n] = monthly_sales
+            index[category] = {'start': start, 'n_train': n_train, 'n_test': n_test}
+
+        return features, targets, index
+
+    def build(self) -> None:
+        """Depoyu üret ve atomik olarak diske yaz"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        features, targets, index = self._build_arrays()
+        paths = self._paths()
+        suffix = f".{os.getpid()}.tmp"
+
+        # Önce diziler, en son manifest yazılır: manifest varsa dosyalar tamdır.
+        # Aynı anda üreten worker'lar birebir aynı içeriği yazar, os.replace atomiktir.
+        for name, array in (('features', features), ('targets', targets)):
+            tmp_path = paths[name] + suffix
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp_path, paths[name])
+
+        manifest = {
+            'fingerprint': self.fingerprint,
+            'columns': FEATURE_COLUMNS,
+            'rows': int(targets.shape[0]),
+            'categories': index
+        }
+        tmp_path = paths['manifest'] + suffix
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, paths['manifest'])
+        print(f"🗄️ Özellik deposu oluşturuldu: {self.store_dir} ({manifest['rows']} satır)")
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self._paths()['manifest'], encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('fingerprint') == self.fingerprint:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _ensure_loaded(self) -> None:
+        if self._index is not None:
+            return
+
+        manifest = self._read_manifest()
+        if manifest is None:
+            try:
+                self.build()
+            except OSError as e:
+                print(f"⚠️ Özellik deposu diske yazılamadı: {str(e)}")
+            manifest = self._read_manifest()
+
+        if manifest is None:
+            # Dizin yazılamıyor ya da farklı parametreli bir worker depoyu
+            # değiştirdi: diziler bu süreçte bellekte tutulur (paylaşılmaz)
+            print(f"⚠️ Özellik deposu bellekte kullanılıyor: {self.store_dir}")
+            self._features, self._targets, index = self._build_arrays()
+            self._index = {'fingerprint': self.fingerprint, 'columns': FEATURE_COLUMNS, 'rows': int(self._targets.shape[0]), 'categories': index}
+            return
+
+        paths = self._paths()
+        self._features = np.load(paths['features'], mmap_mode='r')
+        self._targets = np.load(paths['targets'], mmap_mode='r')
+        self._index = manifest
+
+    def get_training_data(self, category: str = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Kategori için (X_train, X_test, y_train, y_test) döndür.
+
+        Bilinen kategoriler için diziler memory-map üzerindeki kopyasız
+        görünümlerdir. Bilinmeyen kategoride tüm kategorilerin verisi kullanılır.
+        """
+        self._ensure_loaded()
+        block = self._index['categories'].get(category)
+
+        if block is None:
+            return self._get_all_split()
+
+        start, n_train, n_test = block['start'], block['n_train'], block['n_test']
+        mid, end = start + n_train, start + n_train + n_test
+        return (
+            self._features[start:mid],
+            self._features[mid:end],
+            self._targets[start:mid],
+            self._targets[mid:end]
+        )
+
+    def _get_all_split(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if self._all_split is None:
+            parts = [self.get_training_data(category) for category in self._index['categories']]
+            self._all_split = tuple(np.concatenate([p[i] for p in parts]) for i in range(4))
+        return self._all_split
+
+
+_default_store = None
+
+
+def get_feature_store() -> SalesFeatureStore:
+    """Süreç içinde paylaşılan varsayılan özellik deposu"""
+    global _default_store
+    if _default_store is None:
+        _default_store = SalesFeatureStore()
+    return _default_store
@@ -1,14 +1,9 @@
-import os
-import httpx
-from dotenv import load_dotenv
+from typing import AsyncIterator
+from app.gemini_client import GeminiError, get_gemini_client
 
-load_dotenv()
 
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key=" + GEMINI_API_KEY
-
-async def generate_title_and_description(book_info: dict, language: str = 'tr'):
-    prompt = f"""
+def _title_description_prompt(book_info: dict, language: str) -> str:
+    return f"""
 Aşağıdaki kitap bilgilerine göre Trendyol'da satışa uygun, SEO dostu başlık ve açıklama üret:
 
 Kitap Adı: {book_info.get('title','')}
@@ -20,39 +15,55 @@ Açıklama: [Kitap hakkında 3-4 paragraf açıklama yaz. İlk paragraf kitabın
 
 Dil: {language}
 """
-    headers = {"Content-Type": "application/json"}
-    data = {
-        "contents": [
-            {"parts": [{"text": prompt}]}
-        ]
+
+
+def _fallback_title_and_description(book_info: dict) -> dict:
+    return {
+        'title': f"{book_info.get('title', '')} Kitap",
+        'description': f"{book_info.get('title', '')} - Bu kitap, edebiyat dünyasının önemli eserlerinden biridir. {book_info.get('author', 'Yazar')} tarafından kaleme alınan bu roman, okuyucuları derin bir okuma deneyimine davet ediyor. Kitap, günümüz edebiyatının en çok okunan eserleri arasında yer alıyor. Trendyol'da uygun fiyat ve hızlı kargo ile sizlerle buluşuyor."
+    }
+
+
+def parse_title_and_description(text: str, book_info: dict) -> dict:
+    """Model çıktısındaki "Başlık:" ve "Açıklama:" bölümlerini ayır"""
+    lines = text.split('\n')
+    title = f"{book_info.get('title', '')} Kitap"
+    description = text
+    for i, line in enumerate(lines):
+        if line.startswith('Başlık:'):
+            title = line.replace('Başlık:', '').strip()
+        elif line.startswith('Açıklama:'):
+            description = '\n'.join(lines[i+1:]).strip()
+            break
+    return {
+        'title': title,
+        'description': description
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(GEMINI_API_URL, headers=headers, json=data, timeout=20)
-        if resp.status_code != 200:
-            return {
-                'title': f"{book_info.get('title', '')} Kitap",
-                'description': f"{book_info.get('title', '')} - Bu kitap, edebiyat dünyasının önemli eserlerinden biridir. {book_info.get('author', 'Yazar')} tarafından kaleme alınan bu roman, okuyucuları derin bir okuma deneyimine davet ediyor. Kitap, günümüz edebiyatının en çok okunan eserleri arasında yer alıyor. Trendyol'da uygun fiyat ve hızlı kargo ile sizlerle buluşuyor."
-            }
-        try:
-            result = resp.json()
-            text = result['candidates'][0]['content']['parts'][0]['text']
-            # Başlık ve açıklamayı ayır
-            lines = text.split('\n')
-            title = f"{book_info.get('title', '')} Kitap"
-            description = text
-            # Eğer "Başlık:" ve "Açıklama:" varsa ayır
-            for i, line in enumerate(lines):
-                if line.startswith('Başlık:'):
-                    title = line.replace('Başlık:', '').strip()
-                elif line.startswith('Açıklama:'):
-                    description = '\n'.join(lines[i+1:]).strip()
-                    break
-            return {
-                'title': title,
-                'description': description
-            }
-        except Exception:
-            return {
-                'title': f"{book_info.get('title', '')} Kitap",
-                'description': f"{book_info.get('title', '')} - Bu kitap, edebiyat dünyasının önemli eserlerinden biridir. {book_info.get('author', 'Yazar')} tarafından kaleme alınan bu roman, okuyucuları derin bir okuma deneyimine davet ediyor. Kitap, günümüz edebiyatının en çok okunan eserleri arasında yer alıyor. Trendyol'da uygun fiyat ve hızlı kargo ile sizlerle buluşuyor."
-            } 
\ No newline at end of file
+
+
+async def generate_title_and_description(book_info: dict, language: str = 'tr', timeout: float = 20):
+    try:
+        text = await get_gemini_client().generate(_title_description_prompt(book_info, language), timeout=timeout)
+        return parse_title_and_description(text, book_info)
+    except Exception:
+        return _fallback_title_and_description(book_info)
+
+
+async def stream_title_and_description(book_info: dict, language: str = 'tr', timeout: float = 20) -> AsyncIterator[str]:
+    """
+    Başlık ve açıklamayı model ürettikçe parça parça döndür. Hata henüz
+    hiçbir parça gönderilmeden olursa şablon metin, akışın ortasında olursa
+    (yarım metne şablon eklenmesin diye) kısa bir hata işareti gönderilir.
+    """
+    emitted = False
+    try:
+        async for chunk in get_gemini_client().stream(_title_description_prompt(book_info, language), timeout=timeout):
+            emitted = True
+            yield chunk
+    except GeminiError as e:
+        print(f"❌ Gemini akış hatası: {str(e)}")
+        if emitted:
+            yield "\n\n[Akış kesildi: içerik tamamlanamadı]"
+            return
+        fallback = _fallback_title_and_description(book_info)
+        yield f"Başlık: {fallback['title']}\nAçıklama:\n{fallback['description']}"
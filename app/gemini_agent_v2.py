@@ -1,68 +1,43 @@
 import os
-import google.generativeai as genai
-from typing import Dict
+from typing import AsyncIterator, Dict, Optional
 from dotenv import load_dotenv
+from app.gemini_client import GeminiError, GeminiTimeoutError, get_gemini_client
+from app.deadline import Deadline
+from app.review_analytics import ReviewAnalytics, get_review_analytics
+from app.review_sampler import get_review_sampler
 
 load_dotenv()
 
+# Deadline kullanıldığında Gemini sonrası rapor üretimine bırakılan süre
+REPORT_TIME_RESERVE = 2.0
+
 class GeminiAgentV2:
     def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.gemini_client = get_gemini_client()
+        # İstek başına Gemini süre bütçesi (saniye, 0 = tüm bölümleri bekle)
+        self.latency_budget = float(os.getenv('GEMINI_LATENCY_BUDGET', 10))
+        self.review_analytics = get_review_analytics()
+        self.review_sampler = get_review_sampler()
+        # Yorum analizi modu: 'llm' (yerel istatistik + kısa istem) veya 'fast' (Gemini'siz)
+        self.review_mode = os.getenv('REVIEW_ANALYSIS_MODE', 'llm')
+    
+    def section_wait_timeout(self, latency_budget: float = None, deadline: Deadline = None) -> Optional[float]:
+        """Bölümler için bekleme süresi: süre bütçesi ile (kalan - rapor payı) arasından küçüğü; None = sınırsız"""
+        budget = latency_budget if latency_budget is not None else self.latency_budget
+        wait_timeout = budget if budget and budget > 0 else None
+        if deadline is not None:
+            left = max(0.0, deadline.remaining() - REPORT_TIME_RESERVE)
+            wait_timeout = left if wait_timeout is None else min(wait_timeout, left)
+        return wait_timeout
     
-    async def analyze_book_and_generate_content(self, search_results: Dict, best_offer: Dict, comments_data: Dict = None) -> Dict:
-        """
-        Kitap analizi yap ve gelişmiş içerik üret (Yorum analizi dahil)
-        """
+    async def generate_section(self, name: str, prompt: str, fallback: str = '', timeout: float = None) -> str:
+        """Tek bir analiz bölümünü üret; hata durumunda bölümün şablon içeriğini döndür"""
         try:
-            # Temel analizler
-            analysis_prompt = self.create_analysis_prompt(search_results, best_offer)
-            analysis_result = await self.call_gemini_api(analysis_prompt)
-            
-            seo_prompt = self.create_seo_prompt(best_offer)
-            seo_result = await self.call_gemini_api(seo_prompt)
-            
-            sales_prompt = self.create_sales_prompt(best_offer)
-            sales_result = await self.call_gemini_api(sales_prompt)
-            
-            summary_prompt = self.create_summary_prompt(best_offer)
-            summary_result = await self.call_gemini_api(summary_prompt)
-            
-            profit_analysis_prompt = self.create_profit_analysis_prompt(search_results, best_offer)
-            profit_analysis_result = await self.call_gemini_api(profit_analysis_prompt)
-            
-            # Yorum analizleri (eğer yorum verisi varsa)
-            sentiment_analysis = None
-            user_based_description = None
-            trend_analysis = None
-            
-            if comments_data and comments_data.get('comments'):
-                print("🧠 Yorum analizleri yapılıyor...")
-                
-                sentiment_prompt = self.create_sentiment_analysis_prompt(comments_data)
-                sentiment_analysis = await self.call_gemini_api(sentiment_prompt)
-                
-                user_description_prompt = self.create_user_based_description_prompt(comments_data, best_offer)
-                user_based_description = await self.call_gemini_api(user_description_prompt)
-                
-                trend_prompt = self.create_trend_analysis_prompt(comments_data)
-                trend_analysis = await self.call_gemini_api(trend_prompt)
-            
-            return {
-                'analysis': analysis_result,
-                'seo_content': seo_result,
-                'sales_recommendation': sales_result,
-                'best_offer_summary': summary_result,
-                'profit_analysis': profit_analysis_result,
-                'sentiment_analysis': sentiment_analysis,
-                'user_based_description': user_based_description,
-                'trend_analysis': trend_analysis
-            }
-            
-        except Exception as e:
-            print(f"❌ Gemini analiz hatası: {str(e)}")
-            return self.get_fallback_content(best_offer)
+            print(f"🔍 Gemini bölümü üretiliyor: {name}")
+            return await self.gemini_client.generate(prompt, timeout=timeout)
+        except GeminiError as e:
+            print(f"❌ Gemini bölümü başarısız ({name}): {str(e)}")
+            return fallback
     
     def create_analysis_prompt(self, search_results: Dict, best_offer: Dict) -> str:
         """Kitap analizi için prompt oluştur"""
@@ -278,52 +253,57 @@ Türkçe olarak detaylı analiz yaz.
         
         return prompt
     
-    def create_sentiment_analysis_prompt(self, comments_data: Dict) -> str:
-        """Sentiment analizi için prompt oluştur"""
+    def create_sentiment_analysis_prompt(self, comments_data: Dict, review_insights: Dict = None) -> str:
+        """Sentiment analizi için prompt oluştur (sayısal sonuçlar yerelde hesaplanır)"""
         
         comments = comments_data.get('comments', [])
         if not comments:
             return "Yorum verisi bulunamadı."
         
+        if review_insights is None:
+            review_insights = self.review_analytics.analyze(comments_data)
+        
+        if review_insights.get('population_weighted'):
+            scope = "çekilen yorum örneği üzerinden hesaplandı ve ürünün Amazon yıldız dağılımına göre ağırlıklandırıldı"
+        else:
+            scope = "çekilen yorumlar üzerinden hesaplandı"
+        
         prompt = f"""
-Sen bir sentiment analizi uzmanısın. Aşağıdaki kullanıcı yorumlarını analiz et:
+Sen bir sentiment analizi uzmanısın. Aşağıdaki yorum istatistikleri {scope}:
 
-TOPLAM YORUM SAYISI: {len(comments)}
-ORTALAMA YILDIZ: {comments_data.get('average_rating', 0)}
+{ReviewAnalytics.format_report(review_insights)}
 
-YORUMLAR:
+ÖRNEK YORUMLAR:
 """
         
-        for i, comment in enumerate(comments[:10], 1):  # İlk 10 yorumu al
-            prompt += f"""
-{i}. Kullanıcı: {comment.get('user', 'Anonim')}
-   Tarih: {comment.get('date', '')}
-   Yıldız: {comment.get('rating', 0)}/5
-   Başlık: {comment.get('title', '')}
-   Yorum: {comment.get('comment', '')}
-"""
+        # Yıldız ve yıla göre dengeli, tekrarsız, token bütçeli örnek
+        samples = self.review_sampler.sample(comments, token_budget=400, max_items=6)
+        for i, comment in enumerate(samples, 1):
+            prompt += f"{i}. ({comment.get('rating', 0)}/5, {comment.get('year', '')}) {comment.get('title', '')}: {comment.get('comment', '')}\n"
         
         prompt += """
-
-SENTIMENT ANALİZİ YAP:
-1. Her yorumu olumlu, olumsuz veya nötr olarak etiketle
-2. Genel sentiment oranını hesapla (% olumlu, % olumsuz, % nötr)
-3. Ana temaları belirle (kalite, fiyat, hız, memnuniyet vs.)
-4. Yıldız dağılımını analiz et
-5. Güçlü ve zayıf yönleri belirle
-
-SONUÇ FORMATI:
-- Genel Sentiment: %X olumlu, %Y olumsuz, %Z nötr
-- Ana Temalar: [liste]
+Bu sayıları değiştirmeden kısa bir değerlendirme yaz:
+- Genel Sentiment: [yukarıdaki oranlar]
+- Ana Temalar: [temaları yorumla]
 - Güçlü Yönler: [liste]
 - Zayıf Yönler: [liste]
 - Genel Değerlendirme: [2-3 cümle]
 
-Türkçe olarak detaylı analiz yaz.
+Türkçe yaz.
 """
         
         return prompt
     
+    @staticmethod
+    def total_reviews(comments_data: Dict) -> int:
+        """Ürünün Amazon'daki yorum sayısı (`comments` yalnızca örnektir); yoksa çekilen yorum sayısı"""
+        total = (comments_data.get('product_info') or {}).get('total_reviews') or 0
+        try:
+            total = int(str(total).replace(',', ''))
+        except ValueError:
+            total = 0
+        return total or comments_data.get('total_comments', 0)
+    
     def create_user_based_description_prompt(self, comments_data: Dict, best_offer: Dict) -> str:
         """Kullanıcı yorumlarından ürün açıklaması üretimi"""
         
@@ -331,20 +311,20 @@ Türkçe olarak detaylı analiz yaz.
         if not comments:
             return "Yorum verisi bulunamadı."
         
-        # Pozitif yorumları filtrele (4-5 yıldız)
-        positive_comments = [c for c in comments if c.get('rating', 0) >= 4]
+        # Pozitif yorumlardan (4-5 yıldız) dengeli ve tekrarsız örnek
+        positive_comments = self.review_sampler.sample(comments, token_budget=500, max_items=5, min_rating=4)
         
         prompt = f"""
 Sen bir pazarlama uzmanısın. Aşağıdaki kullanıcı yorumlarını kullanarak etkileyici bir ürün açıklaması yaz:
 
 KİTAP: {best_offer.get('title', '')}
-TOPLAM YORUM: {len(comments)}
+TOPLAM YORUM: {self.total_reviews(comments_data)}
 ORTALAMA YILDIZ: {comments_data.get('average_rating', 0)}
 
 POZİTİF YORUMLAR (4-5 yıldız):
 """
         
-        for i, comment in enumerate(positive_comments[:5], 1):
+        for i, comment in enumerate(positive_comments, 1):
             prompt += f"""
 {i}. "{comment.get('comment', '')}" - {comment.get('user', 'Müşteri')}
 """
@@ -375,7 +355,6 @@ Türkçe olarak profesyonel ve satış odaklı açıklama yaz.
         """Zaman serisi yorum analizi için prompt oluştur"""
         
         yearly_ratings = comments_data.get('yearly_ratings', {})
-        comments = comments_data.get('comments', [])
         
         if not yearly_ratings:
             return "Yıllık veri bulunamadı."
@@ -399,7 +378,7 @@ YILLIK ORTALAMA YILDIZLAR:
                 prompt += f"- {year}: {avg_rating} yıldız\n"
         
         prompt += f"""
-TOPLAM YORUM SAYISI: {len(comments)}
+TOPLAM YORUM SAYISI: {self.total_reviews(comments_data)}
 GENEL ORTALAMA: {comments_data.get('average_rating', 0):.2f}
 
 TREND ANALİZİ YAP:
@@ -422,41 +401,22 @@ Türkçe olarak detaylı trend analizi yaz.
         
         return prompt
     
-    async def call_gemini_api(self, prompt: str) -> str:
-        """Gemini API'yi çağır (retry ve fallback ile)"""
-        max_retries = 3
-        retry_delay = 2
-        
-        for attempt in range(max_retries):
-            try:
-                print(f"🔍 Gemini API çağrılıyor... (Deneme {attempt + 1}/{max_retries})")
-                
-                response = self.model.generate_content(prompt)
-                
-                if response and response.text:
-                    return response.text
-                else:
-                    print(f"❌ Gemini API boş sonuç")
-                    return "API boş sonuç döndü"
-                        
-            except Exception as e:
-                error_msg = str(e)
-                print(f"❌ Gemini API çağrı hatası (Deneme {attempt + 1}): {error_msg}")
-                
-                # Rate limit veya overload hatası ise bekle
-                if "429" in error_msg or "503" in error_msg or "overloaded" in error_msg.lower():
-                    if attempt < max_retries - 1:  # Son deneme değilse bekle
-                        print(f"⏳ {retry_delay} saniye bekleniyor...")
-                        import asyncio
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                
-                # Diğer hatalar için fallback döndür
-                return f"API çağrısı başarısız: {error_msg}"
-        
-        # Tüm denemeler başarısız
-        return "Gemini API tüm denemelerde başarısız oldu"
+    async def call_gemini_api(self, prompt: str, timeout: float = None) -> str:
+        """Gemini API'yi çağır (paylaşılan istemci: retry, süre sınırı ve fallback ile)"""
+        try:
+            print("🔍 Gemini API çağrılıyor...")
+            return await self.gemini_client.generate(prompt, timeout=timeout)
+        except GeminiTimeoutError as e:
+            print(f"⏰ {str(e)}")
+            return f"API çağrısı zaman aşımına uğradı: {str(e)}"
+        except GeminiError as e:
+            print(f"❌ Gemini API çağrı hatası: {str(e)}")
+            return f"API çağrısı başarısız: {str(e)}"
+    
+    async def stream_gemini_api(self, prompt: str, timeout: float = None) -> AsyncIterator[str]:
+        """Gemini yanıtını geldikçe parça parça döndür"""
+        async for chunk in self.gemini_client.stream(prompt, timeout=timeout):
+            yield chunk
     
     def get_fallback_content(self, best_offer: Dict) -> Dict:
         """Fallback içerik"""
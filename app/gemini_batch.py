@@ -0,0 +1,176 @@
+import os
+import json
+import asyncio
+from typing import Dict, List, Tuple
+from app.gemini_agent_v2 import GeminiAgentV2
+from app.gemini_client import GeminiClient, GeminiError, get_gemini_client
+from app.review_sampler import estimate_tokens
+
+# Paketlenebilir kısa görevler: görev -> (istem metodu, beklenen çıktı tokenı)
+PACKABLE_TASKS = {
+    'seo_content': ('create_seo_prompt', 450),
+    'best_offer_summary': ('create_summary_prompt', 150),
+    'sales_recommendation': ('create_sales_prompt', 200)
+}
+
+DEFAULT_TASKS = ('seo_content', 'best_offer_summary')
+
+# Modelin tek yanıtta güvenle üretebileceği çıktı sınırı
+MAX_OUTPUT_TOKENS = 8192
+
+PACK_INSTRUCTIONS = """Aşağıda birbirinden bağımsız {count} görev var. Her görevi kendi talimatına göre ayrı ayrı çöz.
+
+Yanıtı YALNIZCA tek bir JSON nesnesi olarak ver: anahtarlar görev kimlikleri ({keys}), değerler o görevin Türkçe metin yanıtı. JSON dışında hiçbir şey yazma.
+"""
+
+
+def parse_packed_response(text: str) -> Dict[str, str]:
+    """Model çıktısındaki JSON nesnesini oku (```json çitleri ve çevre metin tolere edilir)"""
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end <= start:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {str(key): value if isinstance(value, str) else json.dumps(value, ensure_ascii=False) for key, value in data.items()}
+
+
+class GeminiBatchPacker:
+    """
+    Çok kitaplı toplu çalışmalar için Gemini istek paketleyici.
+
+    N kitabın kısa görevleri (SEO, özet, satış önerisi) token bütçesine göre
+    paketlere bölünür; her paket anahtarlı JSON yanıt isteyen tek bir
+    çağrıdır. Yanıt kitap/görev bazında geri ayrılır; eksik veya bozuk
+    gelen öğeler daha küçük paketlerle yeniden denenir, yine başarısız
+    olanlar için şablon içerik kullanılır.
+    """
+
+    def __init__(self, agent: GeminiAgentV2 = None, client: GeminiClient = None, token_budget: int = None, max_items: int = 24, max_retries: int = 2, max_concurrency: int = 4):
+        self.agent = agent or GeminiAgentV2()
+        self.client = client or get_gemini_client()
+        self.token_budget = token_budget or int(os.getenv('GEMINI_PACK_TOKEN_BUDGET', 6000))
+        self.max_items = max_items
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+
+    def build_items(self, offers: List[Dict], tasks: Tuple[str, ...]) -> List[Dict]:
+        """Kitap x görev öğeleri; anahtar 'b<kitap>_<görev>' biçimindedir"""
+        items = []
+        for index, offer in enumerate(offers):
+            for task in tasks:
+                method, output_tokens = PACKABLE_TASKS[task]
+                prompt = getattr(self.agent, method)(offer).strip()
+                items.append({
+                    'key': f"b{index}_{task}",
+                    'book': index,
+                    'task': task,
+                    'prompt': prompt,
+                    'cost': estimate_tokens(prompt) + output_tokens,
+                    'output_tokens': output_tokens
+                })
+        return items
+
+    def pack(self, items: List[Dict], token_budget: int = None) -> List[List[Dict]]:
+        """Öğeleri sırayı koruyarak token bütçesine ve çıktı sınırına sığan paketlere böl"""
+        budget = token_budget or self.token_budget
+        packs, current, cost, output = [], [], 0, 0
+        for item in items:
+            fits = (
+                cost + item['cost'] <= budget
+                and output + item['output_tokens'] <= MAX_OUTPUT_TOKENS
+                and len(current) < self.max_items
+            )
+            if current and not fits:
+                packs.append(current)
+                current, cost, output = [], 0, 0
+            current.append(item)
+            cost += item['cost']
+            output += item['output_tokens']
+        if current:
+            packs.append(current)
+        return packs
+
+    @staticmethod
+    def build_packed_prompt(pack: List[Dict]) -> str:
+        keys = ', '.join(item['key'] for item in pack)
+        sections = [PACK_INSTRUCTIONS.format(count=len(pack), keys=keys)]
+        for item in pack:
+            sections.append(f"### {item['key']}\n{item['prompt']}")
+        return '\n\n'.join(sections)
+
+    async def _run_pack(self, pack: List[Dict], semaphore: asyncio.Semaphore) -> Dict[str, str]:
+        """Tek paket çağrısı; yalnızca geçerli (boş olmayan) anahtarları döndür"""
+        if len(pack) == 1:
+            # Tek öğe için JSON sarmalına gerek yok
+            prompt = pack[0]['prompt']
+            output_tokens = pack[0]['output_tokens'] * 2
+        else:
+            prompt = self.build_packed_prompt(pack)
+            output_tokens = sum(item['output_tokens'] for item in pack) * 3 // 2
+
+        async with semaphore:
+            try:
+                text = await self.client.generate(
+                    prompt, generation_config={'maxOutputTokens': min(MAX_OUTPUT_TOKENS, output_tokens)}
+                )
+            except GeminiError as e:
+                print(f"❌ Paket çağrısı başarısız ({len(pack)} öğe): {str(e)}")
+                return {}
+
+        if len(pack) == 1:
+            return {pack[0]['key']: text.strip()}
+        parsed = parse_packed_response(text)
+        expected = {item['key'] for item in pack}
+        return {key: value.strip() for key, value in parsed.items() if key in expected and value and value.strip()}
+
+    async def run(self, offers: List[Dict], tasks: Tuple[str, ...] = DEFAULT_TASKS) -> Dict:
+        """
+        Kitap listesi için görevleri paketleyerek üret.
+
+        Returns:
+            Dict: 'results' (kitap başına görev -> metin), 'calls' (Gemini
+            çağrı sayısı), 'fallback_items' (şablonla doldurulan öğe sayısı)
+        """
+        tasks = tuple(dict.fromkeys(tasks))
+        unknown = [task for task in tasks if task not in PACKABLE_TASKS]
+        if unknown:
+            raise ValueError(f"Paketlenemeyen görevler: {', '.join(unknown)}")
+
+        pending = self.build_items(offers, tasks)
+        outputs: Dict[str, str] = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        calls = 0
+
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            # Yeniden denemelerde bütçe yarıya iner: paketler küçülür, bozuk JSON riski azalır
+            packs = self.pack(pending, self.token_budget // (2 ** attempt))
+            if attempt:
+                print(f"🔁 {len(pending)} başarısız öğe {len(packs)} paketle yeniden deneniyor...")
+            else:
+                print(f"📦 {len(pending)} görev {len(packs)} Gemini çağrısına paketlendi")
+
+            results = await asyncio.gather(*(self._run_pack(pack, semaphore) for pack in packs))
+            calls += len(packs)
+            for result in results:
+                outputs.update(result)
+            pending = [item for item in pending if item['key'] not in outputs]
+
+        per_book = [{} for _ in offers]
+        fallback_keys = {item['key'] for item in pending}
+        for index, offer in enumerate(offers):
+            fallback = self.agent.get_fallback_content(offer) if any(f"b{index}_{task}" in fallback_keys for task in tasks) else {}
+            for task in tasks:
+                key = f"b{index}_{task}"
+                per_book[index][task] = outputs[key] if key in outputs else fallback.get(task, '')
+
+        return {
+            'results': per_book,
+            'calls': calls,
+            'fallback_items': len(fallback_keys)
+        }
@@ -0,0 +1,189 @@
+import os
+import json
+import asyncio
+import httpx
+from typing import AsyncIterator, Dict, List
+from dotenv import load_dotenv
+from app.concurrency import OVERLOAD_STATUS_CODES, get_limiter
+
+load_dotenv()
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1/models"
+DEFAULT_MODEL = 'gemini-1.5-flash'
+
+# Bu durum kodlarında istek üstel beklemeyle tekrarlanır
+RETRY_STATUS_CODES = (429, 500, 503)
+
+
+class GeminiError(Exception):
+    """Gemini çağrısı başarısız (HTTP hatası, boş yanıt veya süre aşımı)"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GeminiTimeoutError(GeminiError):
+    """Çağrı kendisine verilen süreyi aştı"""
+
+
+class GeminiClient:
+    """
+    Tüm ajanların paylaştığı asenkron Gemini REST istemcisi.
+
+    Tek bir `httpx.AsyncClient` (bağlantı havuzu) kullanılır ve her istek
+    'gemini' uyarlanabilir eşzamanlılık sınırından geçer. Her çağrının
+    tekrar denemeler dahil kesin bir süre sınırı vardır; süre dolunca istek
+    iptal edilir ve `GeminiTimeoutError` fırlatılır. `stream` metni
+    `streamGenerateContent` (SSE) ile parça parça döndürür.
+    """
+
+    def __init__(self, api_key: str = None, model: str = None, timeout: float = None, max_retries: int = 3, retry_delay: float = 2.0):
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY', '')
+        self.model = model or os.getenv('GEMINI_MODEL', DEFAULT_MODEL)
+        self.timeout = timeout if timeout is not None else float(os.getenv('GEMINI_TIMEOUT', 30))
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.limiter = get_limiter('gemini')
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={'Content-Type': 'application/json', 'x-goog-api-key': self.api_key}
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _url(self, method: str, model: str = None) -> str:
+        return f"{GEMINI_API_BASE}/{model or self.model}:{method}"
+
+    @staticmethod
+    def build_payload(prompt: str, generation_config: Dict = None, safety_settings: List[Dict] = None) -> Dict:
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        if safety_settings:
+            payload["safetySettings"] = safety_settings
+        return payload
+
+    @staticmethod
+    def extract_text(result: Dict) -> str:
+        """Yanıttaki ilk adayın metin parçalarını birleştir"""
+        candidates = result.get('candidates') or []
+        if not candidates:
+            return ''
+        parts = candidates[0].get('content', {}).get('parts', [])
+        return ''.join(part.get('text', '') for part in parts)
+
+    async def _generate_with_retries(self, payload: Dict, model: str = None) -> str:
+        delay = self.retry_delay
+        for attempt in range(self.max_retries):
+            response = await self.limiter.call(
+                lambda: self._get_client().post(self._url('generateContent', model), json=payload)
+            )
+
+            if response.status_code == 200:
+                text = self.extract_text(response.json())
+                if not text:
+                    raise GeminiError("Gemini API boş sonuç döndü", response.status_code)
+                return text
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries - 1:
+                print(f"⏳ Gemini {response.status_code}, {delay} saniye bekleniyor... (Deneme {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+
+            raise GeminiError(f"API hatası: {response.status_code} {response.text[:200]}", response.status_code)
+
+        raise GeminiError("Gemini API tüm denemelerde başarısız oldu")
+
+    async def generate(self, prompt: str, timeout: float = None, generation_config: Dict = None, safety_settings: List[Dict] = None, model: str = None) -> str:
+        """
+        Metin üret. `timeout` tekrar denemeler ve beklemeler dahil toplam
+        süredir; dolunca istek iptal edilir.
+        """
+        payload = self.build_payload(prompt, generation_config, safety_settings)
+        limit = timeout if timeout is not None else self.timeout
+        try:
+            return await asyncio.wait_for(self._generate_with_retries(payload, model), limit)
+        except asyncio.TimeoutError:
+            raise GeminiTimeoutError(f"Gemini çağrısı {limit:.1f} saniyede tamamlanamadı")
+        except httpx.HTTPError as e:
+            raise GeminiError(f"Gemini bağlantı hatası: {str(e)}")
+
+    async def stream(self, prompt: str, timeout: float = None, generation_config: Dict = None, safety_settings: List[Dict] = None, model: str = None) -> AsyncIterator[str]:
+        """
+        Metni `streamGenerateContent?alt=sse` ile parça parça üret.
+
+        Süre sınırı tüm akış içindir; her parça kalan süre kadar beklenir.
+        Tüketici döngüyü bırakırsa bağlantı kapatılır.
+        """
+        payload = self.build_payload(prompt, generation_config, safety_settings)
+        limit = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + limit
+
+        def remaining() -> float:
+            left = deadline - loop.time()
+            if left <= 0:
+                raise GeminiTimeoutError(f"Gemini akışı {limit:.1f} saniyede tamamlanamadı")
+            return left
+
+        # Akış boyunca bir eşzamanlılık hakkı tutulur; süresi gecikme sayılmaz
+        overloaded, failed = False, False
+        try:
+            await asyncio.wait_for(self.limiter.acquire(), remaining())
+        except asyncio.TimeoutError:
+            raise GeminiTimeoutError(f"Gemini akışı {limit:.1f} saniyede tamamlanamadı")
+        try:
+            request = self._get_client().stream('POST', self._url('streamGenerateContent', model), params={'alt': 'sse'}, json=payload)
+            response = await asyncio.wait_for(request.__aenter__(), remaining())
+            overloaded = response.status_code in OVERLOAD_STATUS_CODES
+            failed = response.status_code >= 500 and not overloaded
+            try:
+                if response.status_code != 200:
+                    body = await asyncio.wait_for(response.aread(), remaining())
+                    raise GeminiError(f"API hatası: {response.status_code} {body[:200].decode('utf-8', 'replace')}", response.status_code)
+
+                lines = response.aiter_lines()
+                while True:
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        break
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if not data:
+                        continue
+                    text = self.extract_text(json.loads(data))
+                    if text:
+                        yield text
+            finally:
+                await request.__aexit__(None, None, None)
+        except asyncio.TimeoutError:
+            raise GeminiTimeoutError(f"Gemini akışı {limit:.1f} saniyede tamamlanamadı")
+        except httpx.HTTPError as e:
+            failed = True
+            raise GeminiError(f"Gemini bağlantı hatası: {str(e)}")
+        finally:
+            self.limiter.release(overloaded=overloaded, failed=failed)
+
+
+_default_client = None
+
+
+def get_gemini_client() -> GeminiClient:
+    """Süreç içinde paylaşılan varsayılan Gemini istemcisi"""
+    global _default_client
+    if _default_client is None:
+        _default_client = GeminiClient()
+    return _default_client
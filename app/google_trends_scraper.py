@@ -1,45 +1,176 @@
+import os
+import json
+import asyncio
 import httpx
-import re
-from typing import Dict, List
-from datetime import datetime, timedelta
+import numpy as np
+from typing import Dict, List, Optional
+from datetime import datetime
+from app.keyword_scorer import get_keyword_scorer
+from app.trends_cache import TrendsCache, TrendSeries, parse_trends_json
+from app.deadline import Deadline, has_budget, timeout_for
+
+# Canlı Trends çekimi isteğe bağlıdır; en az bu kadar süre kalmışsa yapılır
+LIVE_FETCH_MIN_BUDGET = 10.0
+
+# Toplu aramada eksik serilerin canlı çekimi için toplam süre (saniye)
+TRENDS_BATCH_TIMEOUT = float(os.getenv('TRENDS_BATCH_TIMEOUT', 10))
 
 class GoogleTrendsScraper:
-    def __init__(self):
+    def __init__(self, cache: TrendsCache = None, live: bool = None):
         self.base_url = "https://trends.google.com"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'tr-TR,tr;q=0.9,en;q=0.8'
         }
+        self.keyword_scorer = get_keyword_scorer()
+        
+        # İlgi-zaman serisi önbelleği (canlı çekim veya dışa aktarılmış dosyalar)
+        self.cache = cache or TrendsCache()
+        self.live = live if live is not None else os.getenv('GOOGLE_TRENDS_LIVE', '0') == '1'
+        self.geo = os.getenv('GOOGLE_TRENDS_GEO', 'TR')
+        self.timeframe = os.getenv('GOOGLE_TRENDS_TIMEFRAME', 'today 12-m')
+        
+        import_dir = os.getenv('TRENDS_IMPORT_DIR')
+        if import_dir and os.path.isdir(import_dir):
+            imported = self.cache.ingest_directory(import_dir)
+            print(f"📈 Trends dışa aktarımları yüklendi: {len(imported)} anahtar kelime")
     
-    async def get_book_trends_data(self, book_title: str) -> Dict:
-        """Google Trends'den kitap verilerini getir"""
+    async def get_book_trends_data(self, book_title: str, deadline: Deadline = None, allow_live: bool = True) -> Dict:
+        """Google Trends'den kitap verilerini getir (bütçe azsa veya `allow_live` kapalıysa canlı çekim atlanır)"""
         try:
             print(f"📈 Google Trends'den veri alınıyor: {book_title}")
             
-            # Google Trends arama URL'i
-            search_query = book_title.replace(' ', '+')
-            trends_url = f"https://trends.google.com/trends/explore?q={search_query}&geo=TR"
-            
-            # Basit trend analizi yap
-            trend_data = await self._analyze_trends(book_title)
+            series = self.cache.get(book_title)
+            if series is None and self.live and allow_live and has_budget(deadline, LIVE_FETCH_MIN_BUDGET):
+                async with httpx.AsyncClient(timeout=timeout_for(deadline, 15.0), headers=self.headers) as client:
+                    series = await self.fetch_interest_over_time(book_title, client)
             
-            return {
-                'book_title': book_title,
-                'trends_url': trends_url,
-                'trend_data': trend_data,
-                'source': 'google_trends'
-            }
+            return await self._build_trends_result(book_title, series)
             
         except Exception as e:
             print(f"❌ Google Trends hatası: {str(e)}")
             return self._get_default_data(book_title)
     
-    async def _analyze_trends(self, book_title: str) -> Dict:
-        """Kitap için trend analizi yap"""
+    async def get_trends_batch(self, book_titles: List[str], max_concurrency: int = 4, deadline: Deadline = None) -> Dict[str, Dict]:
+        """
+        Çok sayıda kitap için toplu trend verisi
+        
+        Önbellekte olanlar doğrudan döner; eksikler canlı modda sınırlı
+        eşzamanlılıkla tek bir HTTP istemcisi üzerinden çekilir. Canlı çekim
+        `deadline` (verilmezse TRENDS_BATCH_TIMEOUT) dolunca kesilir; o ana
+        kadar gelmeyen başlıklar sezgisel veriyle döner.
+        """
+        cached = self.cache.get_many(book_titles)
+        missing = [title for title, series in cached.items() if series is None]
+        print(f"📈 Toplu trend verisi: {len(book_titles) - len(missing)} önbellekten, {len(missing)} eksik")
+        
+        if missing and self.live:
+            deadline = deadline or Deadline(TRENDS_BATCH_TIMEOUT)
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async with httpx.AsyncClient(timeout=timeout_for(deadline, 15.0), headers=self.headers) as client:
+                async def fetch(title: str):
+                    async with semaphore:
+                        cached[title] = await self.fetch_interest_over_time(title, client)
+                
+                tasks = [asyncio.ensure_future(fetch(title)) for title in missing]
+                _, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+                if pending:
+                    print(f"⏰ Toplu Trends süresi doldu, {len(pending)} başlık sezgisel veriyle dönüyor")
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = {}
+        for title in book_titles:
+            try:
+                results[title] = await self._build_trends_result(title, cached.get(title))
+            except Exception as e:
+                print(f"❌ Google Trends hatası ({title}): {str(e)}")
+                results[title] = self._get_default_data(title)
+        return results
+    
+    async def fetch_interest_over_time(self, keyword: str, client: httpx.AsyncClient) -> Optional[TrendSeries]:
+        """Google Trends'den canlı ilgi-zaman serisini çek ve önbelleğe yaz"""
+        try:
+            explore_request = {
+                'comparisonItem': [{'keyword': keyword, 'geo': self.geo, 'time': self.timeframe}],
+                'category': 0,
+                'property': ''
+            }
+            response = await client.get(
+                f"{self.base_url}/trends/api/explore",
+                params={'hl': 'tr', 'tz': '-180', 'req': json.dumps(explore_request)}
+            )
+            if response.status_code != 200:
+                print(f"❌ Trends explore hatası: {response.status_code}")
+                return None
+            
+            widgets = self._parse_trends_payload(response.text).get('widgets', [])
+            widget = next((w for w in widgets if w.get('id') == 'TIMESERIES'), None)
+            if not widget:
+                print("❌ Trends zaman serisi widget'ı bulunamadı")
+                return None
+            
+            response = await client.get(
+                f"{self.base_url}/trends/api/widgetdata/multiline",
+                params={'hl': 'tr', 'tz': '-180', 'req': json.dumps(widget['request']), 'token': widget['token']}
+            )
+            if response.status_code != 200:
+                print(f"❌ Trends multiline hatası: {response.status_code}")
+                return None
+            
+            series_map = parse_trends_json(self._parse_trends_payload(response.text), [keyword])
+            if not series_map or not len(series_map[keyword][0]):
+                return None
+            
+            # .npz yazımı olay döngüsünü bekletmesin
+            await asyncio.to_thread(self.cache.ingest, series_map, 'live')
+            return self.cache.get(keyword)
+            
+        except Exception as e:
+            print(f"❌ Trends canlı veri hatası ({keyword}): {str(e)}")
+            return None
+    
+    def _parse_trends_payload(self, text: str) -> Dict:
+        """Trends API yanıtındaki )]}' önekini atıp JSON'u çöz"""
+        return json.loads(text[text.index('{'):])
+    
+    async def _build_trends_result(self, book_title: str, series: Optional[TrendSeries]) -> Dict:
+        # Google Trends arama URL'i
+        search_query = book_title.replace(' ', '+')
+        trends_url = f"https://trends.google.com/trends/explore?q={search_query}&geo={self.geo}"
+        
+        trend_data = await self._analyze_trends(book_title, series)
+        
+        return {
+            'book_title': book_title,
+            'trends_url': trends_url,
+            'trend_data': trend_data,
+            'source': f"google_trends_{series.source}" if series is not None else 'heuristic'
+        }
+    
+    async def _analyze_trends(self, book_title: str, series: Optional[TrendSeries] = None) -> Dict:
+        """Kitap için trend analizi yap (seri varsa gerçek ilgi verisiyle)"""
         try:
             # Kitap adından popülerlik skoru hesapla
             popularity_score = self._calculate_popularity_from_title(book_title)
+            signals = series.signals() if series is not None else {}
+            
+            if signals:
+                # Son dönem ilgisi (0-100) ile başlık sezgisini harmanla
+                popularity_score = float(np.clip(0.5 * popularity_score + 0.5 * signals['recent_interest'] / 100, 0.1, 1.0))
+                if signals['slope'] > 1.0:
+                    trend_direction = 'increasing'
+                elif signals['slope'] < -1.0:
+                    trend_direction = 'decreasing'
+                else:
+                    trend_direction = 'stable'
+                confidence = 0.85
+            else:
+                trend_direction = 'increasing' if popularity_score > 0.6 else 'stable'
+                confidence = min(popularity_score + 0.2, 0.9)
             
             # Trend durumu belirle
             trend_status = self._determine_trend_status(popularity_score)
@@ -52,8 +183,9 @@ class GoogleTrendsScraper:
                 'trend_status': trend_status,
                 'search_volume': self._estimate_search_volume(popularity_score),
                 'monthly_sales_prediction': sales_prediction,
-                'confidence': min(popularity_score + 0.2, 0.9),
-                'trend_direction': 'increasing' if popularity_score > 0.6 else 'stable',
+                'confidence': confidence,
+                'trend_direction': trend_direction,
+                'interest_signals': signals,
                 'analysis_date': datetime.now().strftime('%Y-%m-%d')
             }
             
@@ -62,57 +194,8 @@ class GoogleTrendsScraper:
             return self._get_default_trend_data()
     
     def _calculate_popularity_from_title(self, book_title: str) -> float:
-        """Kitap adından popülerlik skoru hesapla"""
-        title_lower = book_title.lower()
-        score = 0.5  # Varsayılan skor
-        
-        # Popülerlik göstergeleri
-        popular_keywords = [
-            'bestseller', 'çok satan', 'popüler', 'klasik', 'önerilen',
-            'roman', 'hikaye', 'macera', 'fantastik', 'bilim kurgu',
-            'çocuk', 'genç', 'eğitim', 'tarih', 'felsefe'
-        ]
-        
-        # Yüksek popülerlik göstergeleri
-        high_popularity = [
-            'harry potter', 'lotr', 'yüzüklerin efendisi', 'hobbit',
-            'game of thrones', 'taht oyunları', 'suç ve ceza',
-            'anna karenina', 'savaş ve barış', 'don kişot'
-        ]
-        
-        # Düşük popülerlik göstergeleri
-        low_popularity = [
-            'akademik', 'tez', 'araştırma', 'özel', 'teknik',
-            'ders', 'sınav', 'test', 'çalışma', 'ödev'
-        ]
-        
-        # Yüksek popülerlik kontrolü
-        for keyword in high_popularity:
-            if keyword in title_lower:
-                score += 0.3
-                break
-        
-        # Genel popülerlik kontrolü
-        for keyword in popular_keywords:
-            if keyword in title_lower:
-                score += 0.1
-        
-        # Düşük popülerlik kontrolü
-        for keyword in low_popularity:
-            if keyword in title_lower:
-                score -= 0.1
-        
-        # Başlık uzunluğu etkisi
-        if len(book_title) < 20:
-            score += 0.05
-        elif len(book_title) > 50:
-            score -= 0.05
-        
-        # Yazar etkisi (varsa)
-        if any(author in title_lower for author in ['dostoyevski', 'tolstoy', 'gorki', 'çehov', 'puşkin']):
-            score += 0.2
-        
-        return max(0.1, min(1.0, score))
+        """Kitap adından popülerlik skoru hesapla (ortak anahtar kelime tablosu ile)"""
+        return self.keyword_scorer.popularity_score(book_title)
     
     def _determine_trend_status(self, popularity_score: float) -> str:
         """Trend durumunu belirle"""
@@ -140,16 +223,7 @@ class GoogleTrendsScraper:
             base_sales = int(50 * popularity_score)
             
             # Kitap türüne göre ayarlama
-            title_lower = book_title.lower()
-            
-            if any(genre in title_lower for genre in ['roman', 'hikaye', 'macera']):
-                base_sales *= 1.5
-            elif any(genre in title_lower for genre in ['eğitim', 'ders', 'sınav']):
-                base_sales *= 0.7
-            elif any(genre in title_lower for genre in ['çocuk', 'genç']):
-                base_sales *= 1.3
-            elif any(genre in title_lower for genre in ['klasik', 'felsefe']):
-                base_sales *= 0.8
+            base_sales *= self.keyword_scorer.genre_multiplier(book_title)
             
             # Popülerlik skoruna göre ek ayarlama
             if popularity_score > 0.8:
@@ -183,5 +257,6 @@ class GoogleTrendsScraper:
             'monthly_sales_prediction': 25,
             'confidence': 0.7,
             'trend_direction': 'stable',
+            'interest_signals': {},
             'analysis_date': datetime.now().strftime('%Y-%m-%d')
         } 
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import time
+import asyncio
+import numpy as np
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class LatencyTracker:
+    """Bir upstream için son N çağrının süreleri (halka tampon)"""
+
+    def __init__(self, window: int = 256):
+        self._samples = np.zeros(window, dtype=np.float64)
+        self._index = 0
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples[self._index] = seconds
+        self._index = (self._index + 1) % len(self._samples)
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        filled = min(self.count, len(self._samples))
+        if not filled:
+            return None
+        return float(np.percentile(self._samples[:filled], q))
+
+
+class HedgePolicy:
+    """
+    Kuyruk gecikmesi için yedek istek (hedging) politikası.
+
+    Birincil istek upstream'in gecikme yüzdeliği kadar sürede dönmezse aynı
+    istek bir kez daha gönderilir; önce başarıyla dönen kullanılır, diğeri
+    iptal edilir. Yedek istek oranı bir bütçeyle sınırlıdır: her istek
+    `max_hedge_rate` kadar kredi ekler, her yedek istek bir kredi harcar.
+    Kapalıyken de gecikmeler izlenir, böylece açıldığında gecikme hazırdır.
+    """
+
+    def __init__(self, name: str, enabled: bool = False, percentile: float = 95.0, default_delay: float = 1.0, min_delay: float = 0.05, max_hedge_rate: float = 0.1, min_samples: int = 20, window: int = 256):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.tracker = LatencyTracker(window)
+
+        self._budget = 1.0
+        self._max_budget = 10.0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.throttled = 0
+
+    def delay(self) -> float:
+        """Yedek isteğin gönderileceği bekleme süresi (gecikme yüzdeliği)"""
+        if self.tracker.count < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, self.tracker.percentile(self.percentile))
+
+    def _take_hedge_credit(self) -> bool:
+        if self._budget >= 1.0:
+            self._budget -= 1.0
+            return True
+        self.throttled += 1
+        return False
+
+    async def run(self, factory: Callable[[], Awaitable[T]], accept: Callable[[T], bool] = None) -> T:
+        """
+        `factory()` çağrısını gerekiyorsa yedekleyerek çalıştır.
+
+        `accept` verilirse sonucu kabul edilmeyen (ör. 5xx yanıt) istek,
+        diğeri hâlâ sürüyorsa kazanan sayılmaz.
+        """
+        self.requests += 1
+        self._budget = min(self._max_budget, self._budget + self.max_hedge_rate)
+        started = time.perf_counter()
+
+        primary = asyncio.ensure_future(factory())
+        attempts = [primary]
+        try:
+            if not self.enabled:
+                try:
+                    return await primary
+                finally:
+                    self.tracker.record(time.perf_counter() - started)
+
+            done, _ = await asyncio.wait({primary}, timeout=self.delay())
+            if done or not self._take_hedge_credit():
+                try:
+                    return await primary
+                finally:
+                    self.tracker.record(time.perf_counter() - started)
+
+            self.hedges += 1
+            hedge_started = time.perf_counter()
+            hedge = asyncio.ensure_future(factory())
+            attempts.append(hedge)
+            starts = {primary: started, hedge: hedge_started}
+            pending = {primary, hedge}
+            winner = None
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if winner is None and not task.cancelled() and task.exception() is None and (accept is None or accept(task.result())):
+                        winner = task
+                if winner is not None:
+                    break
+
+            if winner is None:
+                # İkisi de başarısız: birincilin sonucu/hatası geçerli
+                winner = primary
+            elif winner is hedge:
+                self.hedge_wins += 1
+            self.tracker.record(time.perf_counter() - starts[winner])
+            return winner.result()
+        finally:
+            # Kaybeden istek ve çağıran iptal edildiyse süren tüm denemeler durdurulur
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def metrics(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedge_rate': round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            'throttled': self.throttled,
+            'delay_seconds': round(self.delay(), 4),
+            'p50_seconds': self.tracker.percentile(50),
+            'p95_seconds': self.tracker.percentile(95),
+            'p99_seconds': self.tracker.percentile(99)
+        }
+
+
+_policies: Dict[str, HedgePolicy] = {}
+
+
+def get_hedge_policy(name: str) -> HedgePolicy:
+    """
+    Upstream adına göre paylaşılan politika.
+
+    HEDGE_UPSTREAMS (virgülle ayrılmış adlar veya 'all') ile açılır;
+    HEDGE_PERCENTILE ve HEDGE_MAX_RATE varsayılanları değiştirir.
+    """
+    policy = _policies.get(name)
+    if policy is None:
+        upstreams = {u.strip() for u in os.getenv('HEDGE_UPSTREAMS', '').split(',') if u.strip()}
+        policy = _policies[name] = HedgePolicy(
+            name,
+            enabled='all' in upstreams or name in upstreams,
+            percentile=float(os.getenv('HEDGE_PERCENTILE', 95)),
+            max_hedge_rate=float(os.getenv('HEDGE_MAX_RATE', 0.1))
+        )
+    return policy
+
+
+def hedging_metrics() -> Dict[str, Dict]:
+    return {name: policy.metrics() for name, policy in _policies.items()}
@@ -0,0 +1,77 @@
+import re
+from typing import Iterable, List, Optional
+
+# Ayraçlı/ayraçsız 10 veya 13 haneli aday ("ISBN 978-975-07-1938-7", "0-14-044913-2")
+ISBN_CANDIDATE = re.compile(r"(?<![\dXx])(?:97[89][\s-]?)?\d(?:[\s-]?\d){8}[\s-]?[\dXx](?![\dXx])")
+
+
+def _digits(text: str) -> str:
+    return re.sub(r"[\s-]", '', str(text)).upper()
+
+
+def is_valid_isbn10(isbn: str) -> bool:
+    if len(isbn) != 10 or not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] == 'X'):
+        return False
+    total = sum((10 - i) * int(c) for i, c in enumerate(isbn[:9]))
+    total += 10 if isbn[9] == 'X' else int(isbn[9])
+    return total % 11 == 0
+
+
+def is_valid_isbn13(isbn: str) -> bool:
+    if len(isbn) != 13 or not isbn.isdigit():
+        return False
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(isbn[:12]))
+    return (10 - total % 10) % 10 == int(isbn[12])
+
+
+def isbn13_to_isbn10(isbn13: str) -> Optional[str]:
+    """978 önekli ISBN-13'ü ISBN-10'a çevir (979 öneklilerin ISBN-10 karşılığı yoktur)"""
+    if not is_valid_isbn13(isbn13) or not isbn13.startswith('978'):
+        return None
+    core = isbn13[3:12]
+    check = (11 - sum((10 - i) * int(c) for i, c in enumerate(core)) % 11) % 11
+    return core + ('X' if check == 10 else str(check))
+
+
+def isbn10_to_isbn13(isbn10: str) -> Optional[str]:
+    if not is_valid_isbn10(isbn10):
+        return None
+    core = '978' + isbn10[:9]
+    check = (10 - sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(core)) % 10) % 10
+    return core + str(check)
+
+
+def normalize_isbn(text: str) -> Optional[str]:
+    """Geçerli ISBN'i ayraçsız döndür, geçersizse None"""
+    isbn = _digits(text)
+    if is_valid_isbn13(isbn) or is_valid_isbn10(isbn):
+        return isbn
+    return None
+
+
+def extract_isbns(text: str) -> List[str]:
+    """Metindeki sağlama toplamı geçerli ISBN'ler (sırayla, tekrarsız)"""
+    found = []
+    for match in ISBN_CANDIDATE.finditer(str(text or '')):
+        isbn = normalize_isbn(match.group(0))
+        if isbn and isbn not in found:
+            found.append(isbn)
+    return found
+
+
+def isbn_to_asin(isbn: str) -> Optional[str]:
+    """Basılı kitaplarda Amazon ASIN'i ISBN-10'dur"""
+    isbn = normalize_isbn(isbn) if isbn else None
+    if isbn is None:
+        return None
+    return isbn if len(isbn) == 10 else isbn13_to_isbn10(isbn)
+
+
+def asin_from_texts(texts: Iterable[str]) -> Optional[str]:
+    """Metinlerdeki ilk ASIN'e çevrilebilen ISBN'den ASIN üret"""
+    for text in texts:
+        for isbn in extract_isbns(text):
+            asin = isbn_to_asin(isbn)
+            if asin:
+                return asin
+    return None
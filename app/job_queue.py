@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import httpx
+from urllib.parse import unquote
+from typing import Any, Dict, Optional, Tuple
+
+# İş durumları
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_VISIBILITY_TIMEOUT = float(os.getenv('JOB_VISIBILITY_TIMEOUT', 120))
+
+
+def _json_default(value: Any) -> Any:
+    # numpy sayıları vb. için
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+class JobQueue:
+    """
+    Kalıcı iş kuyruğu arayüzü.
+
+    İşçi bir işi `claim` ile kiralar; kira `visibility_timeout` saniye
+    sürer ve iş sürdükçe `heartbeat` ile uzatılır. Kira dolarsa (işçi
+    çöktüyse) iş yeniden alınabilir hale gelir. `complete`/`fail`/
+    `heartbeat` yalnızca kirayı tutan işçi için geçerlidir (False dönerse
+    kira kaybedilmiştir ve sonuç yok sayılır).
+    """
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: int = 3) -> str:
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        raise NotImplementedError
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True, retry_delay: float = 0.0) -> bool:
+        """Tekrar hakkı kaldıysa ve `retry` ise işi `retry_delay` sonra yeniden kuyruğa al"""
+        raise NotImplementedError
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """İşi deneme sayılmadan kuyruğa geri bırak (ör. işçi kapanırken)"""
+        raise NotImplementedError
+
+    def attach_report(self, job_id: str, worker_id: str, filename: str, data: bytes) -> bool:
+        """İşin Excel raporunu kuyrukta sakla (API GET /jobs/{id}/report ile sunar)"""
+        raise NotImplementedError
+
+    def get_report(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        """(dosya adı, içerik) veya None"""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    SQLite (WAL) tabanlı kuyruk. Aynı makinedeki API ve işçi süreçleri dosyayı
+    doğrudan paylaşır; diğer makinelerdeki işçiler API üzerinden (HttpJobQueue)
+    bağlanır. İş alma `BEGIN IMMEDIATE` ile tek yazıcıya indirgenir.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('JOB_QUEUE_PATH', os.path.join('data', 'jobs.db'))
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, available_at REAL NOT NULL, "
+            "lease_owner TEXT, lease_expires_at REAL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS job_reports (job_id TEXT PRIMARY KEY, filename TEXT NOT NULL, data BLOB NOT NULL)")
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: int = 3) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, dumps(payload), QUEUED, max_attempts, now, now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Kirası dolmuş ve deneme hakkı bitmiş işler başarısız sayılır
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'Görünürlük süresi doldu (işçi yanıt vermedi)', "
+                    "lease_owner = NULL, updated_at = ? "
+                    "WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                    (FAILED, now, RUNNING, now)
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?) "
+                    "ORDER BY available_at LIMIT 1",
+                    (QUEUED, now, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (RUNNING, worker_id, now + visibility_timeout, now, row['id'])
+                )
+                claimed = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row(claimed)
+
+    def _update_leased(self, job_id: str, worker_id: str, assignments: str, params: tuple) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (*params, time.time(), job_id, RUNNING, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        return self._update_leased(job_id, worker_id, "lease_expires_at = ?", (time.time() + visibility_timeout,))
+
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        return self._update_leased(
+            job_id, worker_id, "status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires_at = NULL",
+            (DONE, dumps(result))
+        )
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True, retry_delay: float = 0.0) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END, "
+                "available_at = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (int(retry), QUEUED, FAILED, time.time() + retry_delay, error[:2000], time.time(), job_id, RUNNING, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        return self._update_leased(
+            job_id, worker_id, "status = ?, attempts = attempts - 1, available_at = ?, lease_owner = NULL, lease_expires_at = NULL",
+            (QUEUED, time.time())
+        )
+
+    def attach_report(self, job_id: str, worker_id: str, filename: str, data: bytes) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO job_reports (job_id, filename, data) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?)",
+                (job_id, filename, sqlite3.Binary(data), job_id, RUNNING, worker_id)
+            )
+        return cursor.rowcount > 0
+
+    def get_report(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            row = self._conn.execute("SELECT filename, data FROM job_reports WHERE job_id = ?", (job_id,)).fetchone()
+        return (row['filename'], bytes(row['data'])) if row else None
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update({status: count for status, count in rows})
+        return {'backend': 'sqlite', **counts}
+
+
+class HttpJobQueue(JobQueue):
+    """
+    Başka makinelerdeki işçiler için ağ arka ucu: kuyruğun sahibi olan API'nin
+    /jobs uçlarını çağırır (JOB_QUEUE_URL, isteğe bağlı JOB_QUEUE_TOKEN).
+    """
+
+    def __init__(self, base_url: str = None, token: str = None, timeout: float = 10.0):
+        self.base_url = (base_url or os.getenv('JOB_QUEUE_URL', '')).rstrip('/')
+        token = token if token is not None else os.getenv('JOB_QUEUE_TOKEN', '')
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            headers={'x-job-queue-token': token} if token else {}
+        )
+
+    def _post(self, path: str, body: Dict) -> Dict:
+        response = self._client.post(path, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: int = 3) -> str:
+        return self._post('/jobs', {'kind': kind, 'max_attempts': max_attempts, **payload})['job_id']
+
+    def claim(self, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Dict]:
+        return self._post('/jobs/claim', {'worker_id': worker_id, 'visibility_timeout': visibility_timeout}).get('job')
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        return self._post(f'/jobs/{job_id}/heartbeat', {'worker_id': worker_id, 'visibility_timeout': visibility_timeout})['ok']
+
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> bool:
+        # Sonuç numpy değerleri içerebilir; JSON'a kuyruk kodlayıcısıyla çevrilir
+        return self._post(f'/jobs/{job_id}/complete', {'worker_id': worker_id, 'result': json.loads(dumps(result))})['ok']
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True, retry_delay: float = 0.0) -> bool:
+        return self._post(f'/jobs/{job_id}/fail', {'worker_id': worker_id, 'error': error, 'retry': retry, 'retry_delay': retry_delay})['ok']
+
+    def release(self, job_id: str, worker_id: str) -> bool:
+        return self._post(f'/jobs/{job_id}/release', {'worker_id': worker_id})['ok']
+
+    def attach_report(self, job_id: str, worker_id: str, filename: str, data: bytes) -> bool:
+        response = self._client.put(f'/jobs/{job_id}/report', params={'worker_id': worker_id, 'filename': filename}, content=data)
+        response.raise_for_status()
+        return response.json()['ok']
+
+    def get_report(self, job_id: str) -> Optional[Tuple[str, bytes]]:
+        response = self._client.get(f'/jobs/{job_id}/report')
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        filename = unquote(response.headers.get('content-disposition', '').partition("filename*=UTF-8''")[2]) or f"{job_id}.xlsx"
+        return filename, response.content
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        response = self._client.get(f'/jobs/{job_id}')
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()['job']
+
+    def stats(self) -> Dict:
+        return {'backend': 'http', 'url': self.base_url}
+
+
+_default_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Süreç içinde paylaşılan kuyruk: JOB_QUEUE_URL tanımlıysa API üzerinden
+    (uzak işçiler), değilse yerel SQLite dosyası (API ve aynı makinedeki işçiler).
+    """
+    global _default_queue
+    if _default_queue is None:
+        _default_queue = HttpJobQueue() if os.getenv('JOB_QUEUE_URL') else SQLiteJobQueue()
+    return _default_queue
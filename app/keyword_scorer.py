@@ -0,0 +1,182 @@
+import os
+import json
+import numpy as np
+from collections import deque
+from typing import Dict, List
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'popularity_keywords.json')
+
+
+class AhoCorasick:
+    """Çoklu kalıp eşleştirici: tüm anahtar kelimeleri metin üzerinde tek geçişte bulur"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        # Her düğüm: geçişler, başarısızlık bağlantısı ve biten kalıp indeksleri
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(pattern_id)
+
+        # Başarısızlık bağlantılarını BFS ile kur
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[child] = candidate if candidate != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> set:
+        """Metinde geçen kalıpların indeks kümesini döndür"""
+        found = set()
+        node = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+class KeywordScorer:
+    """
+    Popülerlik sezgilerinin ortak anahtar kelime puanlayıcısı.
+
+    Ağırlıklı kelime tabloları `popularity_keywords.json` dosyasından okunur
+    (POPULARITY_KEYWORDS_PATH ile değiştirilebilir) ve tek bir Aho–Corasick
+    otomatına derlenir. Başlık tek geçişte taranır; grup modları:
+    `each` eşleşen her farklı kelime için ağırlık ekler, `once` en az bir
+    eşleşmede ağırlığı bir kez ekler.
+    """
+
+    def __init__(self, config: Dict = None):
+        if config is None:
+            config = self.load_config()
+        self.config = config
+        self.base_score = config.get('base_score', 0.5)
+        self.min_score = config.get('min_score', 0.1)
+        self.max_score = config.get('max_score', 1.0)
+        self.length_rules = config.get('length', {})
+
+        # Grup sütunları: önce popülerlik grupları, sonra tür çarpanları
+        self.group_names = []
+        weights, once_flags = [], []
+        for name, group in config.get('groups', {}).items():
+            self.group_names.append(name)
+            weights.append(group.get('weight', 0.0))
+            once_flags.append(group.get('mode', 'each') == 'once')
+
+        self.genre_multipliers = []
+        for i, genre in enumerate(config.get('genre_multipliers', [])):
+            self.group_names.append(f"genre_{i}")
+            weights.append(0.0)
+            once_flags.append(True)
+            self.genre_multipliers.append(genre.get('multiplier', 1.0))
+
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.once_mask = np.asarray(once_flags, dtype=bool)
+        self._genre_offset = len(self.group_names) - len(self.genre_multipliers)
+
+        # Aynı kelime birden fazla grupta olabilir: kalıp -> grup sütunları
+        groups = list(config.get('groups', {}).values()) + config.get('genre_multipliers', [])
+        pattern_groups = {}
+        for column, group in enumerate(groups):
+            for keyword in group.get('keywords', []):
+                pattern_groups.setdefault(self.normalize(keyword), []).append(column)
+
+        self._patterns = list(pattern_groups.keys())
+        self._pattern_columns = [pattern_groups[p] for p in self._patterns]
+        self._matcher = AhoCorasick(self._patterns)
+
+    @staticmethod
+    def load_config(path: str = None) -> Dict:
+        path = path or os.getenv('POPULARITY_KEYWORDS_PATH', DEFAULT_CONFIG_PATH)
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Küçük harfe çevir ('İ' -> 'i' dönüşümüyle Türkçe uyumlu)"""
+        return str(text).replace('İ', 'i').lower()
+
+    def match_counts(self, title: str) -> np.ndarray:
+        """Başlıkta her gruptan kaç farklı kelime geçtiğini döndür"""
+        counts = np.zeros(len(self.group_names), dtype=np.int32)
+        for pattern_id in self._matcher.find_all(self.normalize(title)):
+            for column in self._pattern_columns[pattern_id]:
+                counts[column] += 1
+        return counts
+
+    def match_counts_batch(self, titles: List[str]) -> np.ndarray:
+        """(başlık sayısı, grup sayısı) eşleşme matrisi"""
+        counts = np.zeros((len(titles), len(self.group_names)), dtype=np.int32)
+        for row, title in enumerate(titles):
+            for pattern_id in self._matcher.find_all(self.normalize(title)):
+                for column in self._pattern_columns[pattern_id]:
+                    counts[row, column] += 1
+        return counts
+
+    def matches(self, title: str) -> Dict[str, int]:
+        """Grup adı -> eşleşen kelime sayısı (hata ayıklama ve rapor için)"""
+        counts = self.match_counts(title)
+        return {name: int(count) for name, count in zip(self.group_names, counts) if count}
+
+    def popularity_scores(self, titles: List[str]) -> np.ndarray:
+        """Başlık listesi için popülerlik skorları (0.1 - 1.0)"""
+        titles = [str(t) for t in titles]
+        counts = self.match_counts_batch(titles)
+        effective = np.where(self.once_mask, counts > 0, counts)
+        scores = self.base_score + effective @ self.weights
+
+        # Başlık uzunluğu etkisi
+        lengths = np.fromiter((len(t) for t in titles), dtype=np.int32, count=len(titles))
+        scores += np.where(
+            lengths < self.length_rules.get('short_below', 20), self.length_rules.get('short_bonus', 0.0),
+            np.where(lengths > self.length_rules.get('long_above', 50), self.length_rules.get('long_penalty', 0.0), 0.0)
+        )
+        return np.clip(scores, self.min_score, self.max_score)
+
+    def popularity_score(self, title: str) -> float:
+        return float(self.popularity_scores([title])[0])
+
+    def genre_multipliers_batch(self, titles: List[str]) -> np.ndarray:
+        """Tür çarpanları: sıradaki ilk eşleşen tür grubu geçerlidir, yoksa 1.0"""
+        counts = self.match_counts_batch(titles)[:, self._genre_offset:] > 0
+        if not self.genre_multipliers:
+            return np.ones(len(titles))
+        first = np.argmax(counts, axis=1)
+        has_match = counts.any(axis=1)
+        return np.where(has_match, np.asarray(self.genre_multipliers)[first], 1.0)
+
+    def genre_multiplier(self, title: str) -> float:
+        return float(self.genre_multipliers_batch([title])[0])
+
+
+_default_scorer = None
+
+
+def get_keyword_scorer() -> KeywordScorer:
+    """Süreç içinde paylaşılan varsayılan puanlayıcı"""
+    global _default_scorer
+    if _default_scorer is None:
+        _default_scorer = KeywordScorer()
+    return _default_scorer
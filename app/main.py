@@ -1,15 +1,36 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 import uvicorn
-from app.schemas import BookRequest
+import os
+import uuid
+import asyncio
+from urllib.parse import quote
+from typing import Dict, Optional
+from app.schemas import BookRequest, BatchPredictionRequest, ContentRequest, BatchContentRequest, JobRequest, JobClaimRequest, JobLeaseRequest, AnalysisResponse
 from app.gemini_agent_v2 import GeminiAgentV2
 from app.serp_agent import SerpAgent
 from app.excel_generator import ExcelGenerator
 from app.advanced_excel_generator import AdvancedExcelGenerator
 from app.google_trends_scraper import GoogleTrendsScraper
 from app.amazon_comments_api import AmazonCommentsAPI
+from app.gemini_agent import stream_title_and_description
+from app.gemini_client import get_gemini_client
+from app.analysis_store import get_analysis_store
+from app.hedging import hedging_metrics
+from app.concurrency import concurrency_metrics
+from app.cache import get_negative_cache
+from app.shared_state import state_backend_info
+from app.deadline import Deadline
+from app.gemini_batch import GeminiBatchPacker, DEFAULT_TASKS
+from app.pipeline import PipelineCancelled, run_pipeline
+from app.analysis_graphs import BookNotFound, CacheOnlyMiss, UnknownProfile, analysis_targets, build_search_graph, build_advanced_graph, build_analysis_response
+from app.job_queue import DEFAULT_VISIBILITY_TIMEOUT, get_job_queue
+from app.admission import AdmissionController, AdmissionRejected, get_admission_controller
+from app.responses import FastJSONResponse, CompressionMiddleware
+from app.records import Offer
 
-app = FastAPI(title="Kitap Fiyat Karşılaştırma API", version="1.0.0")
+app = FastAPI(title="Kitap Fiyat Karşılaştırma API", version="1.0.0", default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware)
 
 # Agent instances
 serp_agent = SerpAgent()
@@ -18,6 +39,49 @@ excel_generator = ExcelGenerator()
 advanced_excel_generator = AdvancedExcelGenerator()
 google_trends_scraper = GoogleTrendsScraper()
 amazon_comments_api = AmazonCommentsAPI()
+gemini_batch_packer = GeminiBatchPacker(agent=gemini_agent)
+
+# Endpoint'lerin analiz grafları (aşama önbellekleri istekler arasında paylaşılır)
+search_graph = build_search_graph(serp_agent, amazon_comments_api, gemini_agent, excel_generator, review_limit=10)
+advanced_graph = build_advanced_graph(serp_agent, amazon_comments_api, gemini_agent, advanced_excel_generator, google_trends_scraper, review_limit=100)
+
+# Analiz endpoint'lerinin kabul denetimi (eşzamanlı graf sayısı, öncelik sınıfları)
+admission = get_admission_controller()
+
+# Kuyruk işi türü -> graf (işçiler `python -m app.worker` ile aynı grafları çalıştırır)
+job_graphs = {graph.name: graph for graph in (search_graph, advanced_graph)}
+
+def pipeline_inputs(request: BookRequest, degrade: Optional[str] = None) -> Dict:
+    """İstekten graf başlangıç girdileri (istek kapsamlı süre bütçesi dahil)"""
+    return {
+        'book_name': request.book_name,
+        'deadline': Deadline(request.deadline_seconds),
+        'review_mode': request.review_mode,
+        'latency_budget': request.latency_budget,
+        'degrade': degrade
+    }
+
+def pipeline_targets(graph, request: BookRequest):
+    """İstenen profile göre çalışacak hedef aşamalar (None = tam analiz)"""
+    return analysis_targets(graph, request.profile, request.include_reviews, request.include_gemini, request.include_report)
+
+def wants_compact(request: BookRequest) -> bool:
+    """İstekte belirtilmediyse RESPONSE_COMPACT varsayılanı"""
+    if request.compact is not None:
+        return request.compact
+    return os.getenv('RESPONSE_COMPACT', '0') == '1'
+
+def busy_error(status_code: int, retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail="Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Paylaşılan HTTP bağlantılarını kapat"""
+    await get_gemini_client().aclose()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -100,6 +164,13 @@ async def root():
                 <ul>
                     <li><strong>POST /search-book</strong> - Temel kitap analizi</li>
                     <li><strong>POST /search-book-advanced</strong> - Gelişmiş analiz (ML + Grafikler)</li>
+                    <li><strong>POST /predict/batch</strong> - Toplu ML satış tahmini</li>
+                    <li><strong>GET /metrics</strong> - Upstream gecikme, yedek istek ve eşzamanlılık sınırı metrikleri</li>
+                    <li><strong>GET /analysis/{analysis_id}</strong> - Geç tamamlanan Gemini bölümleri</li>
+                    <li><strong>POST /jobs</strong> - Analizi/raporu işçi kuyruğuna ekle</li>
+                    <li><strong>GET /jobs/{job_id}</strong> - Kuyruk işinin durumu ve sonucu</li>
+                    <li><strong>POST /content/batch</strong> - Çok kitap için paketlenmiş SEO/özet üretimi</li>
+                    <li><strong>POST /generate-content/stream</strong> - SEO başlık/açıklama (akışlı)</li>
                     <li><strong>GET /docs</strong> - API dokümantasyonu</li>
                 </ul>
             </div>
@@ -209,153 +280,227 @@ async def root():
     </html>
     """
 
-@app.post("/search-book")
-async def search_book(request: BookRequest):
-    """Kitap ara ve en iyi fiyatı bul"""
+async def run_analysis(graph, request: BookRequest, http_request: Request, x_priority: Optional[str], error_label: str) -> Dict:
+    """
+    Kabul denetimi altında analiz grafını çalıştır (kapasite doluysa bekletir,
+    hafif moda alır veya reddeder; istemci ayrılırsa görev ağacı iptal edilir)
+    """
     try:
-        print(f"🔍 Kitap aranıyor: {request.book_name}")
-        
-        # SerpAPI ile Google Shopping'de arama yap
-        print("🔍 Google Shopping'de arama yapılıyor...")
-        search_results = await serp_agent.search_book(request.book_name)
-        
-        best_offer = search_results['best_offer']
-        
-        if not best_offer:
-            raise HTTPException(status_code=404, detail="Kitap bulunamadı")
-        
-        print(f"✅ En iyi teklif bulundu: {best_offer['title']} - {best_offer['price']} TL")
-        
-        # Kitap adından Amazon ASIN'i oluştur ve yorumları çek
-        book_title = best_offer.get('title', '').split(' - ')[0]  # İlk kısmı al (yazar kısmını çıkar)
-        print(f"🔍 Kitap adı: {book_title}")
-        
-        # Amazon'da arama yapmak için kitap adını kullan
-        print("💬 Amazon'da yorum aranıyor...")
-        
-        # Manuel olarak bilinen ASIN'leri deneyelim
-        test_asins = [
-            "B07ZPKN6YR",  # Sizin verdiğiniz örnek
-            "B08N5WRWNW",  # Test için
-            "B08N5WRWNW"   # Test için
-        ]
-        
-        comments_data = None
-        for test_asin in test_asins:
-            print(f"🧪 ASIN {test_asin} deneniyor...")
-            test_comments = await amazon_comments_api.get_product_comments(test_asin, limit=10)
-            print(f"🧪 Sonuç: {test_comments.get('total_comments', 0)} yorum")
-            
-            if test_comments.get('total_comments', 0) > 0:
-                print(f"✅ Başarılı! ASIN {test_asin} ile {test_comments.get('total_comments', 0)} yorum bulundu")
-                comments_data = test_comments
-                break
-            else:
-                print(f"❌ ASIN {test_asin} için yorum yok")
-        
-        if not comments_data or comments_data.get('source') == 'sample_data':
-            print("❌ Hiçbir ASIN'de yorum bulunamadı")
-        
-        # Gelişmiş Gemini analizi ve içerik üretimi (yorum analizi dahil)
-        print("🧠 Gelişmiş analiz ve içerik üretimi yapılıyor...")
-        gemini_analysis = await gemini_agent.analyze_book_and_generate_content(
-            search_results['search_results'],
-            best_offer,
-            comments_data
-        )
-        
-        # Excel raporu oluştur
-        print("📊 Excel raporu oluşturuluyor...")
-        excel_file_path = excel_generator.create_book_analysis_report(
-            search_results['search_results'],
-            best_offer,
-            gemini_analysis
-        )
-        
-        return {
-            "success": True,
-            "search_results": search_results,
-            "best_offer": best_offer,
-            "gemini_analysis": gemini_analysis,
-            "excel_report": excel_file_path,
-            "message": f"✅ {best_offer['title']} için detaylı analiz ve Excel raporu tamamlandı!"
-        }
+        targets = pipeline_targets(graph, request)
+        async with admission.slot(AdmissionController.priority_class(x_priority)) as degrade:
+            result = await run_pipeline(graph, pipeline_inputs(request, degrade), targets=targets, should_cancel=http_request.is_disconnected)
+            return await build_analysis_response(graph, result, uuid.uuid4().hex, degrade, wants_compact(request))
         
+    except AdmissionRejected as e:
+        raise busy_error(e.status_code, e.retry_after)
+    except CacheOnlyMiss:
+        raise busy_error(503, admission.retry_after())
+    except UnknownProfile as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BookNotFound:
+        raise HTTPException(status_code=404, detail="Kitap bulunamadı")
+    except PipelineCancelled:
+        print(f"🔌 İstemci bağlantıyı kapattı, analiz iptal edildi: {request.book_name}")
+        raise HTTPException(status_code=499, detail="İstemci bağlantıyı kapattı")
     except Exception as e:
         print(f"❌ Hata: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Kitap arama hatası: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"{error_label}: {str(e)}")
+
+@app.post("/search-book", response_model=AnalysisResponse, response_model_exclude_unset=True)
+async def search_book(request: BookRequest, http_request: Request, x_priority: Optional[str] = Header(None)):
+    """Kitap ara ve en iyi fiyatı bul"""
+    print(f"🔍 Kitap aranıyor: {request.book_name}")
+    return await run_analysis(search_graph, request, http_request, x_priority, "Kitap arama hatası")
 
-@app.post("/search-book-advanced")
-async def search_book_advanced(request: BookRequest):
+@app.post("/search-book-advanced", response_model=AnalysisResponse, response_model_exclude_unset=True)
+async def search_book_advanced(request: BookRequest, http_request: Request, x_priority: Optional[str] = Header(None)):
     """Gelişmiş kitap analizi - ML tahminleri ve grafikler ile"""
+    print(f"🔍 Gelişmiş kitap analizi: {request.book_name}")
+    return await run_analysis(advanced_graph, request, http_request, x_priority, "Gelişmiş kitap arama hatası")
+
+@app.get("/metrics")
+async def metrics():
+    """Upstream gecikme yüzdelikleri, yedek istek (hedging) ve uyarlanabilir eşzamanlılık sınırları"""
+    return {
+        "shared_state": state_backend_info(),
+        "hedging": hedging_metrics(),
+        "concurrency": concurrency_metrics(),
+        "negative_cache": get_negative_cache().stats(),
+        "pipelines": {graph.name: graph.metrics() for graph in (search_graph, advanced_graph)},
+        "admission": admission.metrics(),
+        "jobs": await asyncio.to_thread(lambda: get_job_queue().stats())
+    }
+
+@app.get("/analysis/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    """Süre bütçesi nedeniyle şablonla yanıtlanan bölümlerin güncel hali"""
+    entry = await get_analysis_store().get(analysis_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Analiz bulunamadı veya süresi doldu")
+    
+    return {
+        "success": True,
+        "analysis_id": analysis_id,
+        "status": entry['status'],
+        "pending_sections": entry['pending_sections'],
+        "late_sections": entry['late_sections'],
+        "gemini_analysis": entry['sections']
+    }
+
+# Uzak işçinin yükleyebileceği en büyük Excel raporu (bayt)
+JOB_REPORT_MAX_BYTES = int(os.getenv('JOB_REPORT_MAX_BYTES', 20 * 1024 * 1024))
+
+def check_queue_token(x_job_queue_token: Optional[str]) -> None:
+    """İşçi uçları için paylaşılan anahtar (JOB_QUEUE_TOKEN); tanımlı değilse uçlar kapalıdır"""
+    token = os.getenv('JOB_QUEUE_TOKEN')
+    if not token:
+        raise HTTPException(status_code=403, detail="Uzak işçi uçları kapalı (JOB_QUEUE_TOKEN tanımlı değil)")
+    if x_job_queue_token != token:
+        raise HTTPException(status_code=403, detail="Geçersiz kuyruk anahtarı")
+
+async def read_report_body(http_request: Request) -> bytes:
+    """Rapor gövdesini JOB_REPORT_MAX_BYTES sınırıyla oku (aşılırsa 413)"""
+    too_large = HTTPException(status_code=413, detail=f"Rapor en fazla {JOB_REPORT_MAX_BYTES} bayt olabilir")
+    if int(http_request.headers.get('content-length') or 0) > JOB_REPORT_MAX_BYTES:
+        raise too_large
+    data = bytearray()
+    async for chunk in http_request.stream():
+        data.extend(chunk)
+        if len(data) > JOB_REPORT_MAX_BYTES:
+            raise too_large
+    return bytes(data)
+
+@app.post("/jobs", status_code=202)
+async def enqueue_job(request: JobRequest):
+    """Analizi işçi kuyruğuna ekle; sonuç GET /jobs/{job_id} ile alınır"""
+    if request.kind not in job_graphs:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen iş türü: {request.kind} (geçerli: {', '.join(job_graphs)})")
     try:
-        print(f"🔍 Gelişmiş kitap analizi: {request.book_name}")
-        
-        # SerpAPI ile Google Shopping'de arama yap
-        print("🔍 Google Shopping'de arama yapılıyor...")
-        search_results = await serp_agent.search_book(request.book_name)
-        
-        best_offer = search_results['best_offer']
-        
-        if not best_offer:
-            raise HTTPException(status_code=404, detail="Kitap bulunamadı")
-        
-        print(f"✅ En iyi teklif bulundu: {best_offer['title']} - {best_offer['price']} TL")
-        
-        # Kitap adından Amazon ASIN'i bul ve yorumları çek
-        book_title = best_offer.get('title', '').split(' - ')[0]  # İlk kısmı al (yazar kısmını çıkar)
-        print(f"🔍 Kitap adı: {book_title}")
-        
-        # Amazon'da kitap ara ve ASIN bul
-        print("💬 Amazon'da kitap aranıyor...")
-        book_asin = await amazon_comments_api.search_book_asin(book_title)
-        
-        comments_data = None
-        if book_asin:
-            print(f"✅ Kitap ASIN bulundu: {book_asin}")
-            comments_data = await amazon_comments_api.get_product_comments(book_asin, limit=100)
-            print(f"🧪 Sonuç: {comments_data.get('total_comments', 0)} yorum")
-            
-            if comments_data.get('total_comments', 0) > 0:
-                print(f"✅ Başarılı! {comments_data.get('total_comments', 0)} yorum bulundu")
-            else:
-                print("❌ Bu kitap için yorum bulunamadı")
-        else:
-            print("❌ Kitap ASIN bulunamadı")
-        
-        if not comments_data or comments_data.get('source') == 'sample_data':
-            print("❌ Hiçbir yorum bulunamadı")
-        
-        # Gelişmiş Gemini analizi ve içerik üretimi (yorum analizi dahil)
-        print("🧠 Gelişmiş analiz ve içerik üretimi yapılıyor...")
-        gemini_analysis = await gemini_agent.analyze_book_and_generate_content(
-            search_results['search_results'],
-            best_offer,
-            comments_data
-        )
-        
-        # Gelişmiş Excel raporu oluştur (ML tahminleri, grafikler ve yorum analizi ile)
-        print("📊 Gelişmiş Excel raporu oluşturuluyor...")
-        advanced_excel_file_path = advanced_excel_generator.create_advanced_book_analysis_report(
-            search_results['search_results'],
-            best_offer,
-            gemini_analysis,
-            None,
-            comments_data
+        pipeline_targets(job_graphs[request.kind], request)
+    except UnknownProfile as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    payload = request.model_dump(exclude={'kind', 'max_attempts'})
+    job_id = await asyncio.to_thread(get_job_queue().enqueue, request.kind, payload, max(1, request.max_attempts))
+    print(f"📥 İş kuyruğa eklendi: {request.kind} ({request.book_name}) -> {job_id}")
+    return {"success": True, "job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Kuyruk işinin durumu; tamamlandıysa analiz sonucu"""
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    return {"success": True, "job": job}
+
+@app.get("/jobs/{job_id}/report")
+async def get_job_report(job_id: str):
+    """İşçinin kuyruğa yüklediği Excel raporunu indir"""
+    report = await asyncio.to_thread(get_job_queue().get_report, job_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Rapor bulunamadı")
+    filename, data = report
+    return Response(
+        content=data,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+# Uzak işçilerin (JOB_QUEUE_URL) kullandığı kuyruk uçları
+@app.put("/jobs/{job_id}/report")
+async def upload_job_report(job_id: str, worker_id: str, filename: str, http_request: Request, x_job_queue_token: Optional[str] = Header(None)):
+    check_queue_token(x_job_queue_token)
+    data = await read_report_body(http_request)
+    ok = await asyncio.to_thread(get_job_queue().attach_report, job_id, worker_id, os.path.basename(filename), data)
+    return {"ok": ok}
+
+@app.post("/jobs/claim")
+async def claim_job(request: JobClaimRequest, x_job_queue_token: Optional[str] = Header(None)):
+    check_queue_token(x_job_queue_token)
+    job = await asyncio.to_thread(get_job_queue().claim, request.worker_id, request.visibility_timeout or DEFAULT_VISIBILITY_TIMEOUT)
+    return {"job": job}
+
+@app.post("/jobs/{job_id}/{action}")
+async def update_job(job_id: str, action: str, request: JobLeaseRequest, x_job_queue_token: Optional[str] = Header(None)):
+    check_queue_token(x_job_queue_token)
+    queue = get_job_queue()
+    if action == 'heartbeat':
+        ok = await asyncio.to_thread(queue.heartbeat, job_id, request.worker_id, request.visibility_timeout or DEFAULT_VISIBILITY_TIMEOUT)
+    elif action == 'complete':
+        ok = await asyncio.to_thread(queue.complete, job_id, request.worker_id, request.result or {})
+    elif action == 'fail':
+        ok = await asyncio.to_thread(queue.fail, job_id, request.worker_id, request.error or '', request.retry, request.retry_delay)
+    elif action == 'release':
+        ok = await asyncio.to_thread(queue.release, job_id, request.worker_id)
+    else:
+        raise HTTPException(status_code=404, detail=f"Bilinmeyen kuyruk işlemi: {action}")
+    return {"ok": ok}
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictionRequest):
+    """Çok sayıda kitap için toplu ML satış tahmini"""
+    if len(request.titles) != len(request.prices) or (
+        request.categories is not None and len(request.categories) != len(request.titles)
+    ):
+        raise HTTPException(status_code=400, detail="titles, prices ve categories aynı uzunlukta olmalı")
+    
+    try:
+        print(f"🤖 Toplu satış tahmini: {len(request.titles)} kitap")
+        # Önbellekteki (canlı modda eksikleri çekilen) Trends ilgisi popülerlik özelliğine girer
+        trends = await google_trends_scraper.get_trends_batch(request.titles)
+        popularity_scores = [
+            trends[title]['trend_data'].get('popularity_score') if trends[title]['source'].startswith('google_trends') else None
+            for title in request.titles
+        ]
+        # sklearn/NumPy hesabı olay döngüsünü bekletmesin
+        predictions = await asyncio.to_thread(
+            advanced_excel_generator.predict_sales_batch,
+            request.titles,
+            request.prices,
+            request.categories,
+            popularity_scores
         )
         
         return {
             "success": True,
-            "search_results": search_results,
-            "best_offer": best_offer,
-            "gemini_analysis": gemini_analysis,
-            "excel_report": advanced_excel_file_path,
-            "message": f"✅ {best_offer['title']} için gelişmiş analiz, ML tahminleri ve grafikli Excel raporu tamamlandı!"
+            "count": len(predictions),
+            "predictions": predictions
         }
         
     except Exception as e:
         print(f"❌ Hata: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Gelişmiş kitap arama hatası: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Toplu tahmin hatası: {str(e)}")
+
+@app.post("/content/batch")
+async def content_batch(request: BatchContentRequest):
+    """Çok sayıda kitabın SEO/özet görevlerini paketlenmiş Gemini çağrılarıyla üret"""
+    try:
+        # Büyük listelerde sözlük yerine slotlu Offer kayıtları (sözlük gibi okunur)
+        offers = [Offer(title=book.title, price=book.price or 0, platform=book.platform or '') for book in request.books]
+        packed = await gemini_batch_packer.run(offers, tuple(request.tasks or DEFAULT_TASKS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Hata: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Toplu içerik üretim hatası: {str(e)}")
+    
+    return {
+        "success": True,
+        "count": len(offers),
+        "gemini_calls": packed['calls'],
+        "fallback_items": packed['fallback_items'],
+        "results": [
+            {"title": offer['title'], **content} for offer, content in zip(offers, packed['results'])
+        ]
+    }
+
+@app.post("/generate-content/stream")
+async def generate_content_stream(request: ContentRequest):
+    """SEO başlık ve açıklamayı Gemini ürettikçe düz metin olarak akıt"""
+    book_info = {'title': request.title, 'author': request.author or '', 'price': request.price or ''}
+    return StreamingResponse(
+        stream_title_and_description(book_info, request.language),
+        media_type="text/plain; charset=utf-8"
+    )
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,295 @@
+import time
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set
+from app.cache import SharedCache
+
+# Yedek değeri olmayan aşamaları ayırt etmek için işaret nesnesi
+NO_FALLBACK = object()
+
+
+class PipelineError(Exception):
+    """Graf tanımı hatalı (eksik girdi, döngü, tekrarlı aşama)"""
+
+
+class PipelineCancelled(Exception):
+    """Çalışma dışarıdan iptal edildi (ör. HTTP istemcisi bağlantıyı kapattı)"""
+
+
+class Stage:
+    """
+    Analiz hattının tek düğümü.
+
+    Args:
+        name: Aşama adı (diğer aşamalar girdi olarak bu adı kullanır)
+        func: Girdileri anahtar kelime argümanı olarak alan sync/async fonksiyon
+        inputs: Değeri beklenip fonksiyona verilen aşama veya başlangıç girdileri
+        lazy_inputs: Beklenmeden görev (Future) olarak verilen aşamalar
+            (ör. spekülatif aramayı iptal edebilmek için)
+        after: Değeri kullanılmayan, yalnızca sıra için beklenen aşamalar
+        timeout: Saniye ya da girdilerden süre hesaplayan fonksiyon
+        fallback: Zaman aşımı/hata durumunda değer (fonksiyonsa girdilerle çağrılır)
+        keep_late: Zaman aşımında iş iptal edilmez; yedek değer kullanılır ve
+            gerçek sonuç `PipelineResult.late` altında tamamlanmaya devam eder
+        memo_key: Girdilerden önbellek anahtarı üreten fonksiyon (işçiler arası
+            paylaşılan aşama önbelleği; değer JSON'a çevrilebilir olmalı)
+        memo_if: Sonucun önbelleğe yazılıp yazılmayacağına karar veren fonksiyon
+        run_in_thread: Senkron ve CPU ağırlıklı fonksiyonları iş parçacığında çalıştır
+        shield: Çalışma iptal edilse de başlamış iş tamamlanır ve sonucu aşama
+            önbelleğine yazılır (kotası harcanmış upstream çağrıları için)
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Iterable[str] = (), lazy_inputs: Iterable[str] = (), after: Iterable[str] = (), timeout=None, fallback: Any = NO_FALLBACK, keep_late: bool = False, memo_key: Callable = None, memo_if: Callable = None, memo_ttl: float = 600, run_in_thread: bool = False, shield: bool = False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.lazy_inputs = list(lazy_inputs)
+        self.after = list(after)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.keep_late = keep_late
+        self.memo_key = memo_key
+        self.memo_if = memo_if
+        # Önbellek paylaşılan durumda tutulur (değerler JSON'a çevrilebilir olmalı)
+        self.memo_cache = SharedCache(f"memo:{name}", ttl_seconds=memo_ttl) if memo_key else None
+        self.run_in_thread = run_in_thread
+        self.shield = shield
+
+    async def remember(self, memo_key: Any, value: Any) -> None:
+        if memo_key is not None and (self.memo_if is None or self.memo_if(value)):
+            await self.memo_cache.aset(memo_key, value)
+
+    @property
+    def dependencies(self) -> List[str]:
+        return self.inputs + self.lazy_inputs + self.after
+
+
+class PipelineGraph:
+    """Aşamalardan oluşan yönlü çevrimsiz graf (tanımda doğrulanır)"""
+
+    def __init__(self, name: str, stages: List[Stage], initial_inputs: Iterable[str] = ()):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        self.initial_inputs = set(initial_inputs)
+        for stage in stages:
+            if stage.name in self.stages or stage.name in self.initial_inputs:
+                raise PipelineError(f"Tekrarlı aşama adı: {stage.name}")
+            self.stages[stage.name] = stage
+
+        for stage in stages:
+            for dependency in stage.dependencies:
+                if dependency not in self.stages and dependency not in self.initial_inputs:
+                    raise PipelineError(f"{stage.name}: bilinmeyen girdi '{dependency}'")
+        self.order = self._topological_order()
+        self.runs = 0
+        self.cancelled_runs = 0
+        self.failed_runs = 0
+
+    def _topological_order(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise PipelineError(f"Döngü: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dependency in self.stages[name].dependencies:
+                if dependency in self.stages:
+                    visit(dependency, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def required_stages(self, targets: Iterable[str] = None) -> Set[str]:
+        """Hedef aşamaları üretmek için çalışması gereken aşamalar"""
+        if targets is None:
+            return set(self.stages)
+        needed, stack = set(), [t for t in targets if t in self.stages]
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            stack.extend(d for d in self.stages[name].dependencies if d in self.stages)
+        return needed
+
+    def metrics(self) -> Dict:
+        return {'runs': self.runs, 'cancelled': self.cancelled_runs, 'failed': self.failed_runs}
+
+
+class PipelineResult:
+    """Çalışma çıktısı: aşama değerleri, süreler, hatalar ve geç tamamlanan işler"""
+
+    def __init__(self, values: Dict[str, Any], timings: Dict[str, Dict], errors: Dict[str, str], late: Dict[str, asyncio.Task], started_at: float):
+        self.values = values
+        self.timings = timings
+        self.errors = errors
+        self.late = late
+        self.total_seconds = round(time.perf_counter() - started_at, 4)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+    def timings_report(self) -> Dict:
+        return {'total_seconds': self.total_seconds, 'stages': self.timings}
+
+
+async def _call(stage: Stage, kwargs: Dict) -> Any:
+    if stage.run_in_thread:
+        return await asyncio.to_thread(stage.func, **kwargs)
+    result = stage.func(**kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _fallback_value(stage: Stage, kwargs: Dict) -> Any:
+    return stage.fallback(**kwargs) if callable(stage.fallback) else stage.fallback
+
+
+def _remember_when_done(stage: Stage, memo_key: Any) -> Callable[[asyncio.Future], None]:
+    def callback(work: asyncio.Future) -> None:
+        if not work.cancelled() and work.exception() is None:
+            asyncio.ensure_future(stage.remember(memo_key, work.result()))
+    return callback
+
+
+async def _wait_for_cancel(should_cancel: Callable[[], Awaitable[bool]], poll_interval: float) -> None:
+    while not await should_cancel():
+        await asyncio.sleep(poll_interval)
+
+
+async def run_pipeline(graph: PipelineGraph, inputs: Dict[str, Any], targets: Iterable[str] = None, should_cancel: Callable[[], Awaitable[bool]] = None, poll_interval: float = 0.5, keep_late: bool = True) -> PipelineResult:
+    """
+    Grafı mümkün olan en yüksek eşzamanlılıkla çalıştır.
+
+    Her aşama girdileri hazır olur olmaz başlar. Yedek değeri olmayan bir
+    aşama hata verirse diğer aşamalar iptal edilir ve hata yükseltilir.
+    `should_cancel` verilirse `poll_interval` aralıklarla sorulur; True
+    dönerse tüm görev ağacı iptal edilir (shield aşamaları hariç) ve
+    PipelineCancelled yükseltilir. `keep_late` False ise (kuyruk işçileri)
+    keep_late aşamalarının süre sınırı yok sayılır ve sonuçları beklenir;
+    çalışma sonunda arka planda süren iş kalmaz.
+    """
+    missing = graph.initial_inputs - set(inputs)
+    if missing:
+        raise PipelineError(f"Eksik başlangıç girdileri: {', '.join(sorted(missing))}")
+
+    started_at = time.perf_counter()
+    needed = graph.required_stages(targets)
+    tasks: Dict[str, asyncio.Task] = {}
+    values: Dict[str, Any] = {}
+    timings: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    late: Dict[str, asyncio.Task] = {}
+
+    async def value_of(name: str) -> Any:
+        return inputs[name] if name in graph.initial_inputs else await tasks[name]
+
+    async def execute(stage: Stage) -> Any:
+        kwargs = {name: await value_of(name) for name in stage.inputs}
+        for name in stage.after:
+            await value_of(name)
+        for name in stage.lazy_inputs:
+            kwargs[name] = tasks[name]
+
+        begin = time.perf_counter()
+        timing = timings[stage.name] = {'start': round(begin - started_at, 4)}
+
+        memo_key = stage.memo_key(**kwargs) if stage.memo_key else None
+        if memo_key is not None:
+            cached = await stage.memo_cache.aget(memo_key)
+            if cached is not None:
+                timing.update(duration=0.0, status='cached')
+                values[stage.name] = cached
+                return cached
+
+        timeout = stage.timeout(**kwargs) if callable(stage.timeout) else stage.timeout
+        if stage.keep_late and not keep_late:
+            timeout = None
+        work = asyncio.ensure_future(_call(stage, kwargs))
+        status = 'ok'
+        try:
+            if timeout is None:
+                # Doğrudan beklenen iş, bekleyen iptal edilince onunla birlikte iptal olur
+                value = await (asyncio.shield(work) if stage.shield else work)
+            else:
+                done, _ = await asyncio.wait({work}, timeout=max(0.0, timeout))
+                if not done:
+                    raise asyncio.TimeoutError()
+                value = work.result()
+        except asyncio.TimeoutError:
+            if stage.keep_late:
+                late[stage.name] = work
+            else:
+                work.cancel()
+            if stage.fallback is NO_FALLBACK:
+                timing.update(duration=round(time.perf_counter() - begin, 4), status='timeout')
+                raise
+            value, status = _fallback_value(stage, kwargs), 'timeout_fallback'
+            errors[stage.name] = f"{timeout:.2f} sn zaman aşımı"
+        except asyncio.CancelledError:
+            if stage.shield:
+                # İş sürer; tamamlanınca sonucu sonraki istekler için önbelleğe yazılır
+                if memo_key is not None:
+                    work.add_done_callback(_remember_when_done(stage, memo_key))
+            else:
+                work.cancel()
+            timing.update(duration=round(time.perf_counter() - begin, 4), status='cancelled')
+            raise
+        except Exception as e:
+            if stage.fallback is NO_FALLBACK:
+                timing.update(duration=round(time.perf_counter() - begin, 4), status='error')
+                raise
+            print(f"⚠️ Aşama başarısız, yedek değer kullanılıyor ({stage.name}): {str(e)}")
+            value, status = _fallback_value(stage, kwargs), 'fallback'
+            errors[stage.name] = str(e)
+
+        if status == 'ok':
+            await stage.remember(memo_key, value)
+
+        timing.update(duration=round(time.perf_counter() - begin, 4), status=status)
+        values[stage.name] = value
+        return value
+
+    for name in graph.order:
+        if name in needed:
+            tasks[name] = asyncio.ensure_future(execute(graph.stages[name]))
+
+    graph.runs += 1
+    pending = set(tasks.values())
+    watcher = asyncio.ensure_future(_wait_for_cancel(should_cancel, poll_interval)) if should_cancel else None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending | ({watcher} if watcher else set()), return_when=asyncio.FIRST_COMPLETED)
+            if watcher is not None and watcher in done:
+                graph.cancelled_runs += 1
+                raise PipelineCancelled(f"{graph.name} iptal edildi")
+            pending.discard(watcher)
+            for task in done:
+                # Tembel girdi olarak verilip tüketicisince iptal edilen aşamalar hata sayılmaz
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+    except BaseException as e:
+        if not isinstance(e, PipelineCancelled):
+            graph.failed_runs += 1
+        for task in tasks.values():
+            task.cancel()
+        # Şablonla yanıtlanıp arka planda süren işler de artık kimseye dönmeyecek
+        for work in late.values():
+            work.cancel()
+        # İptal edilen görevlerin bitmesini bekle (sahipsiz görev kalmasın)
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+    return PipelineResult(values, timings, errors, late, started_at)
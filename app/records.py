@@ -0,0 +1,193 @@
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class _Record:
+    """
+    Sabit alanlı, __slots__ kullanan kayıtların ortak tabanı.
+
+    Sözlük başına anahtar tablosu tutulmaz; eski kodla uyum için `get`,
+    `[]`, `keys` ve `to_dict` ile sözlük gibi okunabilir. JSON'a veya
+    önbelleğe yazılırken `to_dict` kullanılmalıdır.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Offer(_Record):
+    """Tek platform teklifi (SerpAPI sonucu)"""
+
+    __slots__ = ('title', 'price', 'url', 'image_url', 'platform', 'source', 'original_price', 'isbn')
+
+    def __init__(self, title: str, price: float, url: str = '', image_url: str = '', platform: str = '', source: str = '', original_price: str = '0', isbn: Optional[str] = None):
+        self.title = title
+        self.price = price
+        self.url = url
+        self.image_url = image_url
+        self.platform = platform
+        self.source = source
+        self.original_price = original_price
+        self.isbn = isbn
+
+
+class Review(_Record):
+    """İşlenmiş tek Amazon yorumu"""
+
+    __slots__ = ('date', 'rating', 'comment', 'user', 'title', 'year', 'verified', 'helpful_votes', 'review_link')
+
+    def __init__(self, date: str, rating: float, comment: str = '', user: str = 'Anonim', title: str = '', year: int = 0, verified: bool = False, helpful_votes: str = '0 kişi faydalı buldu', review_link: str = ''):
+        self.date = date
+        self.rating = rating
+        self.comment = comment
+        self.user = user
+        self.title = title
+        self.year = year
+        self.verified = verified
+        self.helpful_votes = helpful_votes
+        self.review_link = review_link
+
+
+class ReviewBatch:
+    """
+    Yorumların sütunlu (columnar) kabı.
+
+    Yıldız, yıl ve doğrulanmış alım bilgisi NumPy dizilerinde, metin
+    alanları sütun listelerinde tutulur; toplamlar Python döngüsü olmadan
+    dizilerden hesaplanır. Dizin/yineleme Review kaydı, `to_dicts` eski
+    sözlük listesini döndürür.
+    """
+
+    __slots__ = ('_size', '_ratings', '_years', '_verified', 'dates', 'comments', 'users', 'titles', 'helpful_votes', 'review_links')
+
+    TEXT_COLUMNS = ('dates', 'comments', 'users', 'titles', 'helpful_votes', 'review_links')
+
+    def __init__(self, capacity: int = 16):
+        self._size = 0
+        self._ratings = np.zeros(capacity, dtype=np.float32)
+        self._years = np.zeros(capacity, dtype=np.int16)
+        self._verified = np.zeros(capacity, dtype=np.bool_)
+        for column in self.TEXT_COLUMNS:
+            setattr(self, column, [])
+
+    @classmethod
+    def from_reviews(cls, reviews: Iterable) -> "ReviewBatch":
+        """Review kayıtlarından veya yorum sözlüklerinden"""
+        batch = cls()
+        batch.extend(reviews)
+        return batch
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def ratings(self) -> np.ndarray:
+        return self._ratings[:self._size]
+
+    @property
+    def years(self) -> np.ndarray:
+        return self._years[:self._size]
+
+    @property
+    def verified(self) -> np.ndarray:
+        return self._verified[:self._size]
+
+    def _grow(self) -> None:
+        capacity = max(16, len(self._ratings) * 2)
+        self._ratings = np.resize(self._ratings, capacity)
+        self._years = np.resize(self._years, capacity)
+        self._verified = np.resize(self._verified, capacity)
+
+    def append(self, review) -> None:
+        """Review kaydı veya aynı anahtarlara sahip sözlük ekle"""
+        if self._size == len(self._ratings):
+            self._grow()
+        i = self._size
+        self._ratings[i] = review.get('rating', 0) or 0
+        self._years[i] = review.get('year', 0) or 0
+        self._verified[i] = bool(review.get('verified', False))
+        self.dates.append(review.get('date', ''))
+        self.comments.append(review.get('comment', ''))
+        self.users.append(review.get('user', 'Anonim'))
+        self.titles.append(review.get('title', ''))
+        self.helpful_votes.append(review.get('helpful_votes', ''))
+        self.review_links.append(review.get('review_link', ''))
+        self._size += 1
+
+    def extend(self, reviews: Iterable) -> None:
+        for review in reviews:
+            self.append(review)
+
+    def __getitem__(self, index: int) -> Review:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return Review(
+            date=self.dates[index],
+            rating=float(self._ratings[index]),
+            comment=self.comments[index],
+            user=self.users[index],
+            title=self.titles[index],
+            year=int(self._years[index]),
+            verified=bool(self._verified[index]),
+            helpful_votes=self.helpful_votes[index],
+            review_link=self.review_links[index]
+        )
+
+    def __iter__(self) -> Iterator[Review]:
+        for index in range(self._size):
+            yield self[index]
+
+    def to_dicts(self) -> List[Dict]:
+        """JSON/eski kod için yorum sözlükleri listesi"""
+        ratings, years, verified = self.ratings.tolist(), self.years.tolist(), self.verified.tolist()
+        return [
+            {
+                'date': self.dates[i],
+                'rating': ratings[i],
+                'comment': self.comments[i],
+                'user': self.users[i],
+                'title': self.titles[i],
+                'year': years[i],
+                'verified': verified[i],
+                'helpful_votes': self.helpful_votes[i],
+                'review_link': self.review_links[i]
+            }
+            for i in range(self._size)
+        ]
+
+    def texts(self) -> List[str]:
+        """Duygu/tema analizi için 'başlık yorum' metinleri"""
+        return [f"{title} {comment}" for title, comment in zip(self.titles, self.comments)]
+
+    def yearly_ratings(self) -> Dict[int, Dict]:
+        """Yıl -> {'total', 'count', 'average'} (tek np.unique + bincount)"""
+        if not self._size:
+            return {}
+        years, inverse = np.unique(self.years, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.ratings.astype(np.float64))
+        counts = np.bincount(inverse)
+        return {
+            int(year): {'total': float(total), 'count': int(count), 'average': round(float(total) / int(count), 2)}
+            for year, total, count in zip(years, totals, counts)
+        }
@@ -0,0 +1,119 @@
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+
+class RespServer:
+    """
+    Yerel geliştirme ve denemeler için küçük Redis protokolü (RESP) sunucusu.
+
+    Yalnızca paylaşılan durum arka ucunun kullandığı komutları destekler:
+    PING, AUTH, SELECT, GET, SET (PX/EX/NX), DEL, INCRBY, INCRBYFLOAT,
+    PEXPIRE ve FLUSHDB. Veriler bellekte tutulur; üretimde gerçek Redis
+    kullanılmalıdır.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    @staticmethod
+    def _bulk(value: Optional[str]) -> bytes:
+        if value is None:
+            return b'$-1\r\n'
+        data = value.encode('utf-8')
+        return b'$%d\r\n%s\r\n' % (len(data), data)
+
+    def execute(self, args: List[str]) -> bytes:
+        name = args[0].upper()
+        if name == 'PING':
+            return b'+PONG\r\n'
+        if name in ('AUTH', 'SELECT'):
+            return b'+OK\r\n'
+        if name == 'FLUSHDB':
+            self._data.clear()
+            return b'+OK\r\n'
+        if name == 'GET':
+            item = self._live(args[1])
+            return self._bulk(item[0] if item else None)
+        if name == 'SET':
+            key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+            expires_at = None
+            if 'PX' in options:
+                expires_at = time.monotonic() + int(args[3 + options.index('PX') + 1]) / 1000
+            elif 'EX' in options:
+                expires_at = time.monotonic() + int(args[3 + options.index('EX') + 1])
+            if 'NX' in options and self._live(key):
+                return b'$-1\r\n'
+            self._data[key] = (value, expires_at)
+            return b'+OK\r\n'
+        if name == 'DEL':
+            removed = sum(1 for key in args[1:] if self._data.pop(key, None) is not None)
+            return b':%d\r\n' % removed
+        if name in ('INCRBY', 'INCRBYFLOAT'):
+            item = self._live(args[1])
+            current, expires_at = (item[0], item[1]) if item else ('0', None)
+            try:
+                value = (int(current) + int(args[2])) if name == 'INCRBY' else (float(current) + float(args[2]))
+            except ValueError:
+                return b'-ERR value is not a number\r\n'
+            self._data[args[1]] = (repr(value) if isinstance(value, float) else str(value), expires_at)
+            return b':%d\r\n' % value if name == 'INCRBY' else self._bulk(repr(value))
+        if name == 'PEXPIRE':
+            item = self._live(args[1])
+            if item is None:
+                return b':0\r\n'
+            self._data[args[1]] = (item[0], time.monotonic() + int(args[2]) / 1000)
+            return b':1\r\n'
+        return f"-ERR unknown command '{name}'\r\n".encode('utf-8')
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[str]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Satır içi komut (ör. telnet ile PING)
+            return line.decode('utf-8').split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2].decode('utf-8'))
+        return args
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if not args:
+                    break
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 6379) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _main(host: str, port: int) -> None:
+    server = await RespServer().serve(host, port)
+    print(f"🗄️ RESP sunucusu dinliyor: {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yerel Redis protokolü (RESP) sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    options = parser.parse_args()
+    asyncio.run(_main(options.host, options.port))
@@ -0,0 +1,94 @@
+import os
+import gzip
+from typing import Any, Optional
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bu boyutun altındaki gövdeler sıkıştırılmaz (bayt)
+COMPRESS_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESS_MIN_SIZE', 1024))
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    orjson kuruluysa onunla (numpy değerleri dahil) serileştiren JSON yanıtı;
+    değilse standart JSONResponse gibi davranır.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class CompressionMiddleware:
+    """
+    Tek parça yanıt gövdelerini istemcinin kabul ettiği kodlamayla sıkıştırır:
+    brotli kuruluysa ve `br` kabul ediliyorsa brotli, değilse gzip.
+
+    Akışlı yanıtlar (ör. /generate-content/stream) sıkıştırılmadan geçer ki
+    parçalar tamponlanmadan ulaşsın.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE, brotli_quality: int = 4, gzip_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+
+    def _encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send) -> None:
+        encoding = self._encoding(Headers(scope=scope).get('accept-encoding', '')) if scope['type'] == 'http' else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message) -> None:
+            nonlocal start_message, passthrough
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            passthrough = True
+            body = message.get('body', b'')
+            headers = MutableHeaders(raw=start_message['headers'])
+            if message.get('more_body', False) or len(body) < self.minimum_size or 'content-encoding' in headers:
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self._compress(body, encoding)
+            headers['content-encoding'] = encoding
+            headers['content-length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
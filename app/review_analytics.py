@@ -0,0 +1,216 @@
+import numpy as np
+from typing import Dict, List
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+# Duygu sözlüğü (Amazon yorumları çoğunlukla İngilizce, örnek veri Türkçe)
+POSITIVE_WORDS = {
+    'good': 1.0, 'great': 1.5, 'excellent': 2.0, 'amazing': 2.0, 'awesome': 1.5, 'love': 1.5, 'loved': 1.5,
+    'beautiful': 1.5, 'wonderful': 2.0, 'masterpiece': 2.0, 'brilliant': 2.0, 'favorite': 1.5, 'enjoyed': 1.0,
+    'recommend': 1.0, 'recommended': 1.0, 'perfect': 1.5, 'best': 1.5, 'fantastic': 2.0, 'engaging': 1.0,
+    'captivating': 1.5, 'gripping': 1.5, 'moving': 1.0, 'fun': 1.0, 'nice': 0.5, 'happy': 1.0, 'classic': 0.5,
+    'harika': 2.0, 'güzel': 1.0, 'mükemmel': 2.0, 'muhteşem': 2.0, 'beğendim': 1.5, 'tavsiye': 1.0,
+    'kaliteli': 1.0, 'başarılı': 1.0, 'sevdim': 1.5, 'akıcı': 1.0, 'etkileyici': 1.5, 'iyi': 0.5
+}
+
+NEGATIVE_WORDS = {
+    'bad': -1.0, 'terrible': -2.0, 'awful': -2.0, 'boring': -1.5, 'disappointing': -1.5, 'disappointed': -1.5,
+    'waste': -2.0, 'poor': -1.0, 'worst': -2.0, 'hate': -1.5, 'hated': -1.5, 'slow': -0.5, 'damaged': -1.5,
+    'broken': -1.5, 'missing': -1.0, 'confusing': -1.0, 'dull': -1.0, 'tedious': -1.0, 'overrated': -1.0,
+    'refund': -1.5, 'returned': -1.0, 'cheap': -0.5, 'flimsy': -1.0, 'typos': -1.0, 'unreadable': -1.5,
+    'kötü': -1.5, 'berbat': -2.0, 'sıkıcı': -1.5, 'hayal': -0.5, 'kırıklığı': -1.5, 'yırtık': -1.5,
+    'hasarlı': -1.5, 'pahalı': -0.5, 'eksik': -1.0, 'beğenmedim': -1.5, 'sevmedim': -1.5
+}
+
+# Olumsuzlanmış ikililer (tekil kelime puanını tersine çevirecek kadar ağırlık)
+NEGATED_BIGRAMS = {
+    'not good': -2.0, 'not great': -2.5, 'not worth': -1.5, 'not recommend': -2.0, "didn't like": -1.5,
+    'not bad': 1.5, 'never again': -1.5, 'did not': -0.5, 'pek iyi': -1.0, 'tavsiye etmem': -2.0
+}
+
+# Tema -> anahtar kelimeler (yorumlardaki geçiş oranı hesaplanır)
+THEMES = {
+    'hikaye': ['story', 'plot', 'ending', 'narrative', 'hikaye', 'konu', 'son'],
+    'karakterler': ['character', 'characters', 'protagonist', 'karakter', 'karakterler'],
+    'yazım': ['writing', 'written', 'prose', 'style', 'author', 'yazım', 'dil', 'üslup', 'yazar'],
+    'çeviri': ['translation', 'translated', 'translator', 'çeviri', 'tercüme'],
+    'baskı_kalite': ['print', 'paper', 'cover', 'binding', 'font', 'quality', 'baskı', 'kağıt', 'kapak', 'kalite', 'kaliteli'],
+    'fiyat': ['price', 'value', 'worth', 'cheap', 'expensive', 'fiyat', 'ucuz', 'pahalı'],
+    'kargo': ['shipping', 'delivery', 'arrived', 'package', 'damaged', 'kargo', 'teslimat', 'paket']
+}
+
+TOKEN_PATTERN = r"(?u)\b[\w']+\b"
+
+
+def normalize_text(text: str) -> str:
+    """Küçük harfe çevir ('İ' -> 'i' dönüşümüyle Türkçe uyumlu)"""
+    return text.replace('İ', 'i').lower()
+
+
+class ReviewAnalytics:
+    """
+    Yorumlar için yerel, vektörel duygu ve tema analizi.
+
+    Duygu: sözlük ağırlıkları seyrek kelime matrisiyle tek çarpımda puanlanır
+    ve yıldız puanıyla harmanlanır. Temalar: sabit tema sözlüğü + TF-IDF ile
+    öne çıkan terimler. Yıldız dağılımı NumPy histogramıdır.
+    """
+
+    POSITIVE_THRESHOLD = 0.15
+    NEGATIVE_THRESHOLD = -0.15
+
+    def __init__(self):
+        lexicon = {**POSITIVE_WORDS, **NEGATIVE_WORDS, **NEGATED_BIGRAMS}
+        self._lexicon_vectorizer = CountVectorizer(
+            vocabulary=list(lexicon.keys()), ngram_range=(1, 2), token_pattern=TOKEN_PATTERN, preprocessor=normalize_text
+        )
+        self._lexicon_weights = np.asarray(list(lexicon.values()), dtype=np.float64)
+
+        theme_words = sorted({word for words in THEMES.values() for word in words})
+        self._theme_vectorizer = CountVectorizer(vocabulary=theme_words, token_pattern=TOKEN_PATTERN, preprocessor=normalize_text)
+        # Kelime -> tema eşleme matrisi (kelime sayısı, tema sayısı)
+        self._theme_names = list(THEMES.keys())
+        self._theme_matrix = np.zeros((len(theme_words), len(self._theme_names)), dtype=np.float64)
+        for column, words in enumerate(THEMES.values()):
+            for word in words:
+                self._theme_matrix[theme_words.index(word), column] = 1.0
+
+    @staticmethod
+    def _texts(comments: List[Dict]) -> List[str]:
+        return [f"{c.get('title', '')} {c.get('comment', '')}" for c in comments]
+
+    def polarity(self, texts: List[str], ratings: np.ndarray) -> np.ndarray:
+        """Yorum başına -1..1 polarite (metin sözlük puanı + yıldız)"""
+        ratings = np.asarray(ratings, dtype=np.float64)
+        if not len(texts):
+            return np.zeros(0)
+        lexical = np.tanh((self._lexicon_vectorizer.transform(texts) @ self._lexicon_weights) / 2.0)
+        star = np.where(ratings > 0, (ratings - 3.0) / 2.0, np.nan)
+        return np.where(np.isnan(star), lexical, 0.6 * np.nan_to_num(star) + 0.4 * lexical)
+
+    def sentiment_counts(self, texts: List[str], ratings: np.ndarray) -> np.ndarray:
+        """[olumlu, olumsuz, nötr] adetleri"""
+        scores = self.polarity(texts, ratings)
+        positive = int(np.count_nonzero(scores > self.POSITIVE_THRESHOLD))
+        negative = int(np.count_nonzero(scores < self.NEGATIVE_THRESHOLD))
+        return np.asarray([positive, negative, len(scores) - positive - negative], dtype=np.int64)
+
+    def sentiment_by_star(self, texts: List[str], ratings: np.ndarray) -> np.ndarray:
+        """(6, 3) adet matrisi: satır yıldız (0 = puansız), sütun [olumlu, olumsuz, nötr]"""
+        ratings = np.asarray(ratings, dtype=np.float64)
+        matrix = np.zeros((6, 3), dtype=np.int64)
+        if not len(texts):
+            return matrix
+        scores = self.polarity(texts, ratings)
+        stars = np.rint(ratings).astype(np.int64)
+        stars[(stars < 1) | (stars > 5)] = 0
+        classes = np.where(scores > self.POSITIVE_THRESHOLD, 0, np.where(scores < self.NEGATIVE_THRESHOLD, 1, 2))
+        np.add.at(matrix, (stars, classes), 1)
+        return matrix
+
+    @staticmethod
+    def star_histogram(ratings: np.ndarray) -> np.ndarray:
+        """1-5 yıldız adetleri (0 = puansız yorumlar sayılmaz)"""
+        ratings = np.rint(np.asarray(ratings, dtype=np.float64)).astype(np.int64)
+        ratings = ratings[(ratings >= 1) & (ratings <= 5)]
+        return np.bincount(ratings, minlength=6)[1:6]
+
+    def themes(self, texts: List[str], top_n: int = 5) -> List[Dict]:
+        """Tema başına yorumların yüzde kaçında geçtiği"""
+        if not texts:
+            return []
+        mentions = (self._theme_vectorizer.transform(texts) @ self._theme_matrix) > 0
+        shares = np.asarray(mentions.mean(axis=0)).ravel()
+        order = np.argsort(-shares)[:top_n]
+        return [
+            {'theme': self._theme_names[i], 'share': round(float(shares[i]) * 100, 1)}
+            for i in order if shares[i] > 0
+        ]
+
+    @staticmethod
+    def top_terms(texts: List[str], top_n: int = 8) -> List[str]:
+        """TF-IDF ortalamasına göre öne çıkan terimler"""
+        if not texts:
+            return []
+        vectorizer = TfidfVectorizer(
+            stop_words='english', ngram_range=(1, 2), max_features=3000,
+            min_df=2 if len(texts) >= 20 else 1, token_pattern=r"(?u)\b[^\W\d_]{3,}\b",
+            preprocessor=normalize_text
+        )
+        try:
+            matrix = vectorizer.fit_transform(texts)
+        except ValueError:  # boş sözlük
+            return []
+        weights = np.asarray(matrix.mean(axis=0)).ravel()
+        terms = vectorizer.get_feature_names_out()
+        return [str(terms[i]) for i in np.argsort(-weights)[:top_n]]
+
+    def analyze(self, comments_data: Dict) -> Dict:
+        """
+        Yorum verisinden özet istatistikler (Gemini istemine veya hızlı moda girdi).
+
+        Akış işlemcisi çekilen tüm yorumlar üzerinden duygu adetlerini ve
+        yıldız histogramını hesapladıysa (katmanlı örnekte ürünün yıldız
+        dağılımına göre ağırlıklandırılmış) onlar kullanılır; metin temaları
+        saklanan örnek yorumlar üzerinden çıkarılır.
+        """
+        comments = comments_data.get('comments', []) or []
+        texts = self._texts(comments)
+        ratings = np.fromiter((float(c.get('rating', 0) or 0) for c in comments), dtype=np.float64, count=len(comments))
+
+        histogram = comments_data.get('rating_histogram')
+        histogram = np.asarray(histogram, dtype=np.int64) if histogram is not None else self.star_histogram(ratings)
+        counts = comments_data.get('sentiment_counts')
+        counts = np.asarray(counts, dtype=np.int64) if counts is not None else self.sentiment_counts(texts, ratings)
+
+        total = int(counts.sum())
+        shares = (counts / total * 100) if total else np.zeros(3)
+
+        scores = self.polarity(texts, ratings)
+        positive_texts = [t for t, s in zip(texts, scores) if s > self.POSITIVE_THRESHOLD]
+        negative_texts = [t for t, s in zip(texts, scores) if s < self.NEGATIVE_THRESHOLD]
+
+        return {
+            'review_count': int(comments_data.get('total_comments', len(comments))),
+            'population_weighted': bool(comments_data.get('population_weighted')),
+            'analyzed_texts': len(texts),
+            'average_rating': float(comments_data.get('average_rating', 0) or 0),
+            'sentiment': {
+                'positive': round(float(shares[0]), 1),
+                'negative': round(float(shares[1]), 1),
+                'neutral': round(float(shares[2]), 1)
+            },
+            'star_histogram': {str(star): int(count) for star, count in zip(range(1, 6), histogram)},
+            'themes': self.themes(texts),
+            'top_keywords': self.top_terms(texts),
+            'strengths': self.top_terms(positive_texts, top_n=5),
+            'weaknesses': self.top_terms(negative_texts, top_n=5)
+        }
+
+    @staticmethod
+    def format_report(insights: Dict) -> str:
+        """Gemini'siz hızlı mod için Türkçe özet metni"""
+        sentiment = insights.get('sentiment', {})
+        histogram = insights.get('star_histogram', {})
+        themes = ', '.join(f"{t['theme']} (%{t['share']})" for t in insights.get('themes', [])) or '-'
+
+        return (
+            f"- Genel Sentiment: %{sentiment.get('positive', 0)} olumlu, %{sentiment.get('negative', 0)} olumsuz, "
+            f"%{sentiment.get('neutral', 0)} nötr ({insights.get('review_count', 0)} yorum)\n"
+            f"- Yıldız Dağılımı: " + ', '.join(f"{star}★: {histogram.get(star, 0)}" for star in ['5', '4', '3', '2', '1']) + "\n"
+            f"- Ortalama Yıldız: {insights.get('average_rating', 0):.2f}\n"
+            f"- Ana Temalar: {themes}\n"
+            f"- Güçlü Yönler: {', '.join(insights.get('strengths', [])) or '-'}\n"
+            f"- Zayıf Yönler: {', '.join(insights.get('weaknesses', [])) or '-'}\n"
+            f"- Öne Çıkan Kelimeler: {', '.join(insights.get('top_keywords', [])) or '-'}"
+        )
+
+
+_default_analytics = None
+
+
+def get_review_analytics() -> ReviewAnalytics:
+    """Süreç içinde paylaşılan varsayılan analiz motoru"""
+    global _default_analytics
+    if _default_analytics is None:
+        _default_analytics = ReviewAnalytics()
+    return _default_analytics
@@ -0,0 +1,160 @@
+import re
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Kaba token tahmini (~4 karakter = 1 token)"""
+    return max(1, len(text) // 4)
+
+
+def _words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.replace('İ', 'i').lower())
+
+
+def word_hashes(text: str) -> frozenset:
+    """Kelimelerin 32 bitlik özet kümesi (Jaccard benzerliği için)"""
+    return frozenset(hash(word) & 0xFFFFFFFF for word in _words(text))
+
+
+def simhash(text: str, shingle_size: int = 2) -> int:
+    """Kelime kümelerinden 64 bitlik SimHash (yakın kopya tespiti için)"""
+    words = _words(text)
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)] if words else ['']
+    else:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    vector = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            vector[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(vector):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class ReviewSampler:
+    """
+    İstemler için temsilî yorum örnekleyici.
+
+    Yorumlar (yıldız, yıl) katmanlarına ayrılır ve yıldızlar arasında sırayla
+    seçilir; her yıldız kendi içinde yıllar arasında döner. SimHash ile yakın
+    kopyalar (ve kısa metinlerde kelime özetleri üzerinden Jaccard benzerliği
+    yüksek olanlar) elenir; seçim token bütçesine sığdırılır.
+    """
+
+    def __init__(self, token_budget: int = 600, max_items: int = 8, max_text_chars: int = 400, duplicate_distance: int = 10, duplicate_jaccard: float = 0.8):
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.max_text_chars = max_text_chars
+        self.duplicate_distance = duplicate_distance
+        self.duplicate_jaccard = duplicate_jaccard
+
+    def _fingerprint(self, text: str) -> Tuple[int, frozenset]:
+        return simhash(text), word_hashes(text)
+
+    def _is_near_duplicate(self, fingerprint: Tuple[int, frozenset], seen: List[Tuple[int, frozenset]]) -> bool:
+        signature, words = fingerprint
+        for other_signature, other_words in seen:
+            if bin(signature ^ other_signature).count('1') <= self.duplicate_distance:
+                return True
+            union = len(words | other_words)
+            if union and len(words & other_words) / union >= self.duplicate_jaccard:
+                return True
+        return False
+
+    def _strata(self, comments: List[Dict], min_rating: float, max_rating: float) -> "OrderedDict[int, List[List[Dict]]]":
+        """Yıldız -> [yıl katmanları (yeniden eskiye)]; yıldızlar yüksekten düşüğe"""
+        by_rating: Dict[int, Dict[int, List[Dict]]] = {}
+        for comment in comments:
+            rating = comment.get('rating', 0) or 0
+            text = str(comment.get('comment', '') or '').strip()
+            if not text:
+                continue
+            if min_rating is not None and rating < min_rating:
+                continue
+            if max_rating is not None and rating > max_rating:
+                continue
+            by_rating.setdefault(int(round(rating)), {}).setdefault(comment.get('year', 0), []).append(comment)
+
+        strata = OrderedDict()
+        for rating in sorted(by_rating, reverse=True):
+            strata[rating] = [by_rating[rating][year] for year in sorted(by_rating[rating], reverse=True)]
+        return strata
+
+    def sample(self, comments: List[Dict], token_budget: int = None, max_items: int = None, min_rating: float = None, max_rating: float = None) -> List[Dict]:
+        """
+        Token bütçesine sığan, yıldız ve yıla göre dengeli, tekrarsız yorumlar.
+
+        Dönen yorumların `comment` alanı `max_text_chars` ile kısaltılır;
+        orijinal sözlükler değiştirilmez.
+        """
+        budget = token_budget if token_budget is not None else self.token_budget
+        limit = max_items if max_items is not None else self.max_items
+
+        strata = self._strata(comments or [], min_rating, max_rating)
+        # Her yıldız için yıl katmanı ve katman içi konum imleçleri
+        year_cursor = {rating: 0 for rating in strata}
+        item_cursor = {rating: [0] * len(years) for rating, years in strata.items()}
+
+        selected, fingerprints = [], []
+        used_tokens = 0
+        active = list(strata.keys())
+
+        while active and len(selected) < limit:
+            for rating in list(active):
+                if len(selected) >= limit:
+                    break
+
+                years = strata[rating]
+                picked = None
+                # Bu yıldızın yıl katmanlarında sıradaki uygun yorumu ara
+                for _ in range(len(years)):
+                    y = year_cursor[rating]
+                    year_cursor[rating] = (y + 1) % len(years)
+                    while item_cursor[rating][y] < len(years[y]):
+                        candidate = years[y][item_cursor[rating][y]]
+                        item_cursor[rating][y] += 1
+                        text = str(candidate.get('comment', '')).strip()[:self.max_text_chars]
+                        fingerprint = self._fingerprint(text)
+                        if self._is_near_duplicate(fingerprint, fingerprints):
+                            continue
+                        picked = (candidate, text, fingerprint)
+                        break
+                    if picked:
+                        break
+
+                if picked is None:
+                    active.remove(rating)
+                    continue
+
+                candidate, text, fingerprint = picked
+                cost = estimate_tokens(text) + estimate_tokens(str(candidate.get('title', ''))) + 8
+                if used_tokens + cost > budget:
+                    # Bütçeye sığmayan yorum atlanır; daha kısa olanlar denenmeye devam eder
+                    continue
+
+                fingerprints.append(fingerprint)
+                used_tokens += cost
+                selected.append({**candidate, 'comment': text})
+
+        return selected
+
+
+_default_sampler = None
+
+
+def get_review_sampler() -> ReviewSampler:
+    """Süreç içinde paylaşılan varsayılan örnekleyici"""
+    global _default_sampler
+    if _default_sampler is None:
+        _default_sampler = ReviewSampler()
+    return _default_sampler
@@ -0,0 +1,231 @@
+import numpy as np
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.review_analytics import ReviewAnalytics, get_review_analytics
+from app.records import Review, ReviewBatch
+
+# Amazon tarih metinleri İngilizce gelir; locale'den bağımsız sabit tablo
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+
+DEFAULT_SAMPLE_SIZE = 100
+
+
+@lru_cache(maxsize=4096)
+def parse_review_date(date_str: str) -> Optional[Tuple[str, int]]:
+    """
+    "Reviewed in the United States on September 18, 2024" -> ('2024-09-18', 2024)
+
+    Aynı tarih metni çok sayıda yorumda tekrarlandığı için sonuç önbelleklenir.
+    Çözümlenemeyen metinlerde None döner.
+    """
+    if not date_str or 'on ' not in date_str:
+        return None
+    parts = date_str.split('on ')[-1].replace(',', ' ').split()
+    if len(parts) != 3:
+        return None
+    month = MONTHS.get(parts[0].lower())
+    if month is None or not parts[1].isdigit() or not parts[2].isdigit():
+        return None
+    day, year = int(parts[1]), int(parts[2])
+    if not 1 <= day <= 31:
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}", year
+
+
+def parse_rating(rating) -> float:
+    """Yıldız değerini sayıya çevir ('4,0' / '4.0' / 4)"""
+    if isinstance(rating, str):
+        try:
+            return float(rating.replace(',', '.'))
+        except ValueError:
+            return 0
+    return rating or 0
+
+
+class ReviewStreamProcessor:
+    """
+    Yorumları tek geçişte işleyen sınırlı bellekli akış işlemcisi.
+
+    Sayfalar geldikçe `feed` ile beslenir; adet, yıldız toplamı, yıllık
+    kovalar, yıldız histogramı ve duygu adetleri sayfa başına sütunlu
+    (ReviewBatch) dizilerden güncellenir. Duygu ve yıllık kovalar yıldız
+    başına da tutulur ki katmanlı örnek `result(population_shares=...)`
+    ile ürünün gerçek yıldız dağılımına göre yeniden ağırlıklandırılabilsin.
+    Tam yorum metni yalnızca ilk `sample_size` yorum için tutulur, böylece
+    10 bin yorumlu bir ASIN de sabit bellekle işlenir.
+    """
+
+    def __init__(self, limit: int = None, sample_size: int = DEFAULT_SAMPLE_SIZE, analytics: ReviewAnalytics = None):
+        self.limit = limit
+        self.sample_size = sample_size
+        self.analytics = analytics or get_review_analytics()
+
+        # Tarihi olmayan yorumlar için bugünün tarihi (yorum başına değil, bir kez)
+        today = datetime.now()
+        self._fallback_date = (today.strftime('%Y-%m-%d'), today.year)
+
+        self.count = 0
+        self.rating_total = 0.0
+        self.rating_count = 0
+        self.yearly_ratings: Dict[int, Dict] = {}
+        self.rating_histogram = np.zeros(5, dtype=np.int64)
+        self.sentiment_counts = np.zeros(3, dtype=np.int64)
+        # Satır yıldız (0 = puansız), sütun [olumlu, olumsuz, nötr]
+        self.star_sentiment = np.zeros((6, 3), dtype=np.int64)
+        self.samples = ReviewBatch()
+        self.product_info = {}
+
+    @property
+    def is_full(self) -> bool:
+        return bool(self.limit) and self.count >= self.limit
+
+    @property
+    def comments(self) -> List[Dict]:
+        """Saklanan örnek yorumlar (eski sözlük biçiminde)"""
+        return self.samples.to_dicts()
+
+    def iter_processed(self, reviews: Iterable[Dict]) -> Iterator[Review]:
+        """Ham yorumları işlenmiş Review kayıtlarına çeviren üreteç"""
+        for review in reviews:
+            try:
+                formatted_date, year = parse_review_date(review.get('review_date', '')) or self._fallback_date
+                helpful = review.get('helpful_vote_statement')
+
+                yield Review(
+                    date=formatted_date,
+                    rating=parse_rating(review.get('review_star_rating', '0')),
+                    comment=review.get('review_comment', ''),
+                    user=review.get('review_author', 'Anonim'),
+                    title=review.get('review_title', ''),
+                    year=year,
+                    verified=review.get('is_verified_purchase', False),
+                    helpful_votes=str(helpful) if helpful else '0 kişi faydalı buldu',
+                    review_link=review.get('review_link', '')
+                )
+            except Exception as e:
+                print(f"⚠️ Yorum işlenirken hata: {str(e)}")
+                continue
+
+    def feed(self, reviews: Iterable[Dict]) -> int:
+        """Bir yorum sayfasını işle ve toplamlara ekle, işlenen adedi döndür"""
+        remaining = self.limit - self.count if self.limit else None
+        page = ReviewBatch()
+        for review in self.iter_processed(reviews):
+            if remaining is not None and len(page) >= remaining:
+                break
+            page.append(review)
+        if not page:
+            return 0
+
+        # Sayfa düzeyinde vektörel toplamlar (metinler sayfa sonunda bırakılır)
+        ratings = page.ratings.astype(np.float64)
+        rated = ratings > 0
+        self.rating_total += float(ratings[rated].sum())
+        self.rating_count += int(rated.sum())
+
+        stars = np.rint(ratings).astype(np.int64)
+        stars[(stars < 1) | (stars > 5)] = 0
+        for year, stats in page.yearly_ratings().items():
+            bucket = self.yearly_ratings.get(year)
+            if bucket is None:
+                bucket = self.yearly_ratings[year] = {'total': 0, 'count': 0, 'stars': np.zeros(6, dtype=np.int64)}
+            bucket['total'] += stats['total']
+            bucket['count'] += stats['count']
+            bucket['stars'] += np.bincount(stars[page.years == year], minlength=6)
+
+        for index in range(min(len(page), self.sample_size - len(self.samples))):
+            self.samples.append(page[index])
+
+        by_star = self.analytics.sentiment_by_star(page.texts(), ratings)
+        self.star_sentiment += by_star
+        self.rating_histogram += by_star[1:].sum(axis=1)
+        self.sentiment_counts += by_star.sum(axis=0)
+        self.count += len(page)
+        return len(page)
+
+    def set_product_info(self, data: Dict) -> None:
+        """API yanıtındaki ürün üst bilgisini (ilk sayfadan) kaydet"""
+        if not self.product_info and data:
+            self.product_info = {
+                'asin': data.get('asin', ''),
+                'total_reviews': data.get('total_reviews', 0),
+                'country': data.get('country', 'US'),
+                'domain': data.get('domain', 'www.amazon.com')
+            }
+
+    def star_weights(self, population_shares) -> Optional[np.ndarray]:
+        """
+        Yıldız başına örnek ağırlıkları (indeks 0 = puansız, ağırlık 1).
+
+        Örnekte görülen yıldızların ağırlığı nüfus payı / örnek payıdır;
+        puanlı yorumların ağırlıklı toplamı örnek adediyle aynı kalır.
+        """
+        shares = np.asarray(population_shares, dtype=np.float64)
+        sampled = self.rating_histogram.astype(np.float64)
+        present = (sampled > 0) & (shares > 0)
+        if not present.any():
+            return None
+        weights = np.zeros(6)
+        weights[0] = 1.0
+        weights[1:][present] = shares[present] / sampled[present]
+        weights[1:] *= sampled.sum() / (weights[1:] * sampled).sum()
+        return weights
+
+    def result(self, product_details: Dict = None, population_shares=None) -> Dict:
+        """
+        Analiz ve Excel katmanlarının kullandığı `comments_data` sözlüğü.
+
+        `population_shares` (1-5 yıldız payları) verilirse histogram, duygu
+        adetleri ve yıllık ortalamalar bu paylara göre ağırlıklandırılır;
+        ham örnek değerleri `sample_*` anahtarlarında kalır.
+        """
+        average_rating = self.rating_total / self.rating_count if self.rating_count > 0 else 0
+        weights = self.star_weights(population_shares) if population_shares is not None else None
+
+        yearly_ratings = {}
+        for year, bucket in self.yearly_ratings.items():
+            total = bucket['total']
+            if weights is not None:
+                weighted = bucket['stars'][1:] * weights[1:]
+                if weighted.sum() > 0:
+                    total = float((weighted * np.arange(1, 6)).sum() / weighted.sum() * bucket['count'])
+            yearly_ratings[year] = {
+                'total': total,
+                'count': bucket['count'],
+                'average': round(total / bucket['count'], 2) if bucket['count'] > 0 else 0.0
+            }
+
+        print(f"🔍 Yıllık veriler: {yearly_ratings}")
+
+        histogram = self.rating_histogram.tolist()
+        sentiment = self.sentiment_counts.tolist()
+        if weights is not None:
+            histogram = np.rint(self.rating_histogram * weights[1:]).astype(np.int64).tolist()
+            sentiment = np.rint((self.star_sentiment * weights[:, None]).sum(axis=0)).astype(np.int64).tolist()
+
+        data = {
+            'total_comments': self.count,
+            'average_rating': round(average_rating, 2),
+            'source': 'amazon_api',
+            'timestamp': datetime.now().isoformat(),
+            'comments': self.comments,
+            'yearly_ratings': yearly_ratings,
+            'rating_histogram': histogram,
+            'sentiment_counts': sentiment,
+            'product_info': self.product_info or {
+                'asin': '',
+                'total_reviews': 0,
+                'country': 'US',
+                'domain': 'www.amazon.com'
+            },
+            'product_details': product_details
+        }
+        if weights is not None:
+            data['population_weighted'] = True
+            data['sample_rating_histogram'] = self.rating_histogram.tolist()
+            data['sample_sentiment_counts'] = self.sentiment_counts.tolist()
+        return data
@@ -1,8 +1,17 @@
-from pydantic import BaseModel
-from typing import Optional
+import os
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, List, Optional, Union
 
 class BookRequest(BaseModel):
     book_name: str
+    review_mode: Optional[str] = None  # 'llm' veya 'fast' (Gemini'siz yorum analizi)
+    latency_budget: Optional[float] = None  # Gemini bölümleri için süre bütçesi (saniye)
+    deadline_seconds: Optional[float] = None  # Uçtan uca istek süresi (varsayılan: REQUEST_DEADLINE)
+    profile: Optional[str] = None  # 'prices', 'prices+reviews' veya 'full' (varsayılan)
+    include_reviews: Optional[bool] = None  # Profili tek tek geçersiz kılar
+    include_gemini: Optional[bool] = None
+    include_report: Optional[bool] = None
+    compact: Optional[bool] = None  # Tekrarlanan/ham alanları çıkar (varsayılan: RESPONSE_COMPACT)
 
 class BookInfo(BaseModel):
     title: str
@@ -17,4 +26,111 @@ class ProductInfo(BaseModel):
     price: float
     image_url: Optional[str]
     url: Optional[str]
-    author: Optional[str] 
\ No newline at end of file
+    author: Optional[str] 
+# Tek toplu tahmin isteğindeki en fazla kitap sayısı
+MAX_BATCH_PREDICTIONS = int(os.getenv('MAX_BATCH_PREDICTIONS', 5000))
+
+class BatchPredictionRequest(BaseModel):
+    titles: List[str] = Field(max_length=MAX_BATCH_PREDICTIONS)
+    prices: List[float]
+    categories: Optional[List[Optional[str]]] = None
+
+class ContentRequest(BaseModel):
+    title: str
+    author: Optional[str] = None
+    price: Optional[float] = None
+    language: str = 'tr'
+
+class BatchBook(BaseModel):
+    title: str
+    price: Optional[float] = 0
+    platform: Optional[str] = ''
+
+class BatchContentRequest(BaseModel):
+    books: List[BatchBook]
+    tasks: Optional[List[str]] = None  # varsayılan: seo_content, best_offer_summary
+
+class JobRequest(BookRequest):
+    kind: str = 'search_book_advanced'  # 'search_book' veya 'search_book_advanced' (Excel raporlu)
+    max_attempts: int = 3
+
+class JobClaimRequest(BaseModel):
+    worker_id: str
+    visibility_timeout: Optional[float] = None
+
+class JobLeaseRequest(BaseModel):
+    worker_id: str
+    visibility_timeout: Optional[float] = None  # heartbeat
+    result: Optional[dict] = None  # complete
+    error: Optional[str] = None  # fail
+    retry: bool = True
+    retry_delay: float = 0.0
+
+# Analiz yanıt modelleri (bilinmeyen ek alanlar korunur)
+
+class OfferModel(BaseModel):
+    model_config = ConfigDict(extra='allow')
+    title: str
+    price: float
+    url: Optional[str] = None
+    image_url: Optional[str] = None
+    platform: Optional[str] = None
+    source: Optional[str] = None
+
+class PricingModel(BaseModel):
+    buy_price: float
+    shipping_cost: float
+    commission: float
+    profit_margin: float
+    suggested_selling_price: float
+    profit_percentage: float
+    min_price: float
+    max_price: float
+    avg_price: float
+    can_compete: bool
+
+class CommentsDataModel(BaseModel):
+    model_config = ConfigDict(extra='allow')
+    total_comments: int = 0
+    average_rating: float = 0
+    source: Optional[str] = None
+    comments: List[Dict[str, Any]] = []
+
+class GeminiAnalysisModel(BaseModel):
+    model_config = ConfigDict(extra='allow')
+    analysis: Optional[str] = None
+    seo_content: Optional[str] = None
+    sales_recommendation: Optional[str] = None
+    best_offer_summary: Optional[str] = None
+    profit_analysis: Optional[str] = None
+    sentiment_analysis: Optional[str] = None
+    user_based_description: Optional[str] = None
+    trend_analysis: Optional[str] = None
+    review_insights: Optional[Dict[str, Any]] = None
+    analysis_id: Optional[str] = None
+    pending_sections: List[str] = []
+
+class StageTimingModel(BaseModel):
+    start: float
+    duration: Optional[float] = None
+    status: Optional[str] = None
+
+class TimingsModel(BaseModel):
+    total_seconds: float
+    # Kompakt yanıtta yalnızca aşama süreleri (sn)
+    stages: Dict[str, Union[StageTimingModel, float]] = {}
+
+class AnalysisResponse(BaseModel):
+    success: bool
+    # Tam yanıtta arama ajanının çıktısı, kompakt yanıtta platform -> teklifler
+    search_results: Dict[str, Any]
+    best_offer: OfferModel
+    pricing: PricingModel
+    comments_data: Optional[CommentsDataModel] = None
+    gemini_analysis: Optional[GeminiAnalysisModel] = None
+    analysis_id: Optional[str] = None
+    excel_report: Optional[str] = None
+    trends_data: Optional[Dict[str, Any]] = None
+    degraded: Optional[str] = None
+    timings: TimingsModel
+    message: str
@@ -2,6 +2,12 @@ import os
 import httpx
 from typing import Dict, Optional
 from dotenv import load_dotenv
+from app.hedging import get_hedge_policy
+from app.concurrency import get_limiter
+from app.deadline import Deadline, timeout_for
+from app.isbn import extract_isbns
+from app.records import Offer
+from app.cache import NO_SHOPPING_RESULTS, UPSTREAM_4XX, get_negative_cache, is_cacheable_failure
 
 load_dotenv()
 
@@ -9,11 +15,24 @@ class SerpAgent:
     def __init__(self):
         self.api_key = os.getenv('SERP_API_KEY')
         self.base_url = "https://serpapi.com/search"
+        self.hedge = get_hedge_policy('serpapi')
+        self.limiter = get_limiter('serpapi')
+        self.negative_cache = get_negative_cache()
         
-    async def search_book(self, book_name: str) -> Dict:
+    async def search_book(self, book_name: str, deadline: Deadline = None) -> Dict:
         """
         Google Shopping'de kitap ara
+        
+        Sonuçsuz aramalar (alışveriş sonucu yok, 4xx) kısa süre negatif
+        önbellekte tutulur; bu sürede aynı arama SerpAPI'ye gitmeden şablon
+        sonuçlarla yanıtlanır.
         """
+        key = ' '.join(book_name.replace('İ', 'i').lower().split())
+        reason = await self.negative_cache.aget('serp', key)
+        if reason:
+            print(f"⏭️ SerpAPI araması atlandı ({reason}): {book_name}")
+            return self.get_fallback_results(book_name)
+        
         try:
             # Google Shopping arama parametreleri
             params = {
@@ -25,14 +44,23 @@ class SerpAgent:
                 'num': 10    # 10 sonuç
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(self.base_url, params=params)
+            async with httpx.AsyncClient(timeout=timeout_for(deadline, 30.0)) as client:
+                # Yavaş kalan istek için (açıksa) yedek istek gönderilir; her biri eşzamanlılık sınırına tabidir
+                response = await self.hedge.run(
+                    lambda: self.limiter.call(lambda: client.get(self.base_url, params=params)),
+                    accept=lambda r: r.status_code < 500
+                )
                 
                 if response.status_code == 200:
                     data = response.json()
-                    return self.parse_serp_results(data, book_name)
+                    results = self.parse_serp_results(data, book_name)
+                    if results['best_offer'].get('source') == 'fallback':
+                        await self.negative_cache.arecord('serp', key, NO_SHOPPING_RESULTS)
+                    return results
                 else:
                     print(f"❌ SerpAPI hatası: {response.status_code}")
+                    if is_cacheable_failure(response.status_code):
+                        await self.negative_cache.arecord('serp', key, UPSTREAM_4XX)
                     return self.get_fallback_results(book_name)
                     
         except Exception as e:
@@ -66,23 +94,24 @@ class SerpAgent:
                         price_text = result.get('price', '0')
                         price = self.extract_price_from_text(price_text)
                     
-                    best_results.append({
-                        'title': result.get('title', ''),
-                        'price': price,
-                        'url': url,
-                        'image_url': result.get('thumbnail', ''),
-                        'platform': self.extract_platform(result.get('source', '')),
-                        'source': 'serpapi',
-                        'original_price': result.get('price', '0')
-                    })
+                    best_results.append(Offer(
+                        title=result.get('title', ''),
+                        price=price,
+                        url=url,
+                        image_url=result.get('thumbnail', ''),
+                        platform=self.extract_platform(result.get('source', '')),
+                        source='serpapi',
+                        original_price=result.get('price', '0'),
+                        isbn=self.extract_isbn(result, book_name)
+                    ))
             
-            # En iyi teklifi bul
+            # En iyi teklifi bul (yanıt ve önbellek için sözlüğe çevrilir)
             if best_results:
-                best_offer = min(best_results, key=lambda x: x.get('price', float('inf')))
+                best_offer = min(best_results, key=lambda offer: offer.price).to_dict()
                 
                 return {
                     'search_results': {
-                        'serpapi': best_results,
+                        'serpapi': [offer.to_dict() for offer in best_results],
                         'best_offer': best_offer
                     },
                     'best_offer': best_offer
@@ -94,6 +123,22 @@ class SerpAgent:
             print(f"❌ Parse hatası: {str(e)}")
             return self.get_fallback_results(book_name)
     
+    def extract_isbn(self, result: Dict, book_name: str = '') -> Optional[str]:
+        """Sonucun başlık, bağlantı ve eklerinden (yoksa sorgudan) geçerli ISBN çıkar"""
+        texts = [
+            result.get('title', ''),
+            result.get('link', ''),
+            result.get('product_link', ''),
+            result.get('snippet', ''),
+            ' '.join(str(e) for e in result.get('extensions', []) or []),
+            book_name
+        ]
+        for text in texts:
+            isbns = extract_isbns(text)
+            if isbns:
+                return isbns[0]
+        return None
+    
     def extract_price(self, price_text: str) -> float:
         """Fiyat metninden sayısal değeri çıkar"""
         try:
@@ -0,0 +1,354 @@
+import os
+import time
+import socket
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class StateBackend:
+    """
+    Süreçler arası paylaşılan anahtar-değer durumu (değerler metindir).
+
+    Önbellekler ve eşzamanlılık sınırlayıcıları bu arayüzü kullanır; arka uç
+    SHARED_STATE_BACKEND ile seçilir (`get_state_backend`). Arka uç
+    erişilemezse işlemler "kayıt yok" gibi davranır, istek akışı durmaz.
+    Metotlar senkrondur; olay döngüsünden `acall` ile çağrılmalıdır.
+    """
+
+    name = 'base'
+    shared = True
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        """Anahtar yoksa yaz (True), varsa dokunma (False)"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: float, ttl_seconds: float) -> float:
+        """Sayacı atomik olarak artır ve yeni değeri döndür (yeni anahtarda TTL başlar)"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    async def acall(self, method: str, *args):
+        """
+        Metodu olay döngüsünü bekletmeden çağır: paylaşılan arka uçlarda
+        (soket/SQLite G/Ç) iş parçacığında, bellek arka ucunda doğrudan.
+        """
+        func = getattr(self, method)
+        if not self.shared:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+
+class MemoryBackend(StateBackend):
+    """Süreç içi arka uç (tek işçi / geliştirme; varsayılan)"""
+
+    name = 'memory'
+    shared = False
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is not None and item[1] < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._live(key)
+            return item[0] if item else None
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._store(key, value, time.monotonic() + ttl_seconds)
+
+    def add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        with self._lock:
+            if self._live(key):
+                return False
+            self._store(key, value, time.monotonic() + ttl_seconds)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: float, ttl_seconds: float) -> float:
+        with self._lock:
+            item = self._live(key)
+            if item is None:
+                value, expires_at = float(amount), time.monotonic() + ttl_seconds
+            else:
+                value, expires_at = float(item[0]) + amount, item[1]
+            self._store(key, str(value), expires_at)
+            return value
+
+
+class SQLiteBackend(StateBackend):
+    """
+    Tek makinedeki işçiler için SQLite (WAL) arka ucu.
+
+    WAL kipinde okuyucular yazıcıyı beklemez; yazmalar kısa işlemlerdir.
+    Süresi dolan kayıtlar okumada yok sayılır, belirli aralıklarla silinir.
+    """
+
+    name = 'sqlite'
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('SHARED_STATE_PATH', os.path.join('data', 'shared_state.db'))
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _maybe_purge(self) -> None:
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM kv WHERE expires_at < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE key = ? AND expires_at >= ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, value, time.time() + ttl_seconds)
+            )
+            self._maybe_purge()
+
+    def add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            # Süresi dolmuş kayıt varmış gibi davranılmaz: üzerine yazılır
+            cursor = self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at WHERE kv.expires_at < ?",
+                (key, value, now + ttl_seconds, now)
+            )
+            self._maybe_purge()
+            return cursor.rowcount > 0
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: float, ttl_seconds: float) -> float:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "value = CASE WHEN kv.expires_at < ? THEN excluded.value ELSE CAST(kv.value AS REAL) + ? END, "
+                "expires_at = CASE WHEN kv.expires_at < ? THEN excluded.expires_at ELSE kv.expires_at END "
+                "RETURNING value",
+                (key, str(float(amount)), now + ttl_seconds, now, amount, now)
+            ).fetchone()
+            self._maybe_purge()
+        return float(row[0])
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RespError(Exception):
+    """Redis protokolü hata yanıtı"""
+
+
+class RedisBackend(StateBackend):
+    """
+    Birden çok makine için Redis protokolü (RESP) arka ucu.
+
+    Bağımlılıksız, senkron ve tek bağlantılı küçük bir istemcidir; olay
+    döngüsünden `acall` ile iş parçacığında çağrılır. Bağlantı koparsa bir
+    sonraki komutta yeniden kurulur; o ana kadar işlemler "kayıt yok" döner.
+    Yerel denemeler için `python -m app.resp_server`.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url: str = None, timeout: float = 0.5):
+        parsed = urlparse(url or os.getenv('SHARED_STATE_URL', 'redis://localhost:6379/0'))
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._failed_at = 0.0
+        self.errors = 0
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        if self.password:
+            self._roundtrip('AUTH', self.password)
+        if self.db:
+            self._roundtrip('SELECT', self.db)
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis bağlantısı kapandı")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise RespError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode('utf-8')
+        if kind == b'*':
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Beklenmeyen RESP yanıtı: {line[:20]!r}")
+
+    def _roundtrip(self, *args):
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def _pipeline(self, commands):
+        self._sock.sendall(b''.join(self._encode(args) for args in commands))
+        return [self._read_reply() for _ in commands]
+
+    def command(self, *args, default=None):
+        """Komutu çalıştır; bağlantı hatasında `default` döndür (1 sn sonra yeniden bağlanılır)"""
+        return self._run(lambda: self._roundtrip(*args), default)
+
+    def pipeline(self, *commands, default=None):
+        """Komutları tek gidiş-dönüşte gönder, yanıt listesini döndür"""
+        return self._run(lambda: self._pipeline(commands), default)
+
+    def _run(self, send, default):
+        with self._lock:
+            try:
+                if self._sock is None:
+                    if time.monotonic() - self._failed_at < 1.0:
+                        return default
+                    self._connect()
+                return send()
+            except (OSError, ConnectionError) as e:
+                self.errors += 1
+                if self._sock is not None or self.errors == 1:
+                    print(f"❌ Paylaşılan durum (redis) erişilemedi: {str(e)}")
+                self._reset()
+                self._failed_at = time.monotonic()
+                return default
+
+    def _reset(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _ms(ttl_seconds: float) -> int:
+        return max(1, int(ttl_seconds * 1000))
+
+    def get(self, key: str) -> Optional[str]:
+        return self.command('GET', key)
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self.command('SET', key, value, 'PX', self._ms(ttl_seconds))
+
+    def add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        return self.command('SET', key, value, 'PX', self._ms(ttl_seconds), 'NX') == 'OK'
+
+    def delete(self, key: str) -> None:
+        self.command('DEL', key)
+
+    def incr(self, key: str, amount: float, ttl_seconds: float) -> float:
+        # Yeni sayaç süresiyle birlikte oluşturulur (SET NX PX), INCRBYFLOAT
+        # süreyi korur; süreç arada ölse de süresiz anahtar kalmaz
+        replies = self.pipeline(
+            ('SET', key, '0', 'PX', self._ms(ttl_seconds), 'NX'),
+            ('INCRBYFLOAT', key, amount)
+        )
+        if replies is None or replies[1] is None:
+            return float(amount)
+        return float(replies[1])
+
+    def close(self) -> None:
+        with self._lock:
+            self._reset()
+
+
+_default_backend = None
+
+
+def get_state_backend() -> StateBackend:
+    """
+    Süreç içinde paylaşılan durum arka ucu.
+
+    SHARED_STATE_BACKEND: 'memory' (varsayılan), 'sqlite' (SHARED_STATE_PATH)
+    veya 'redis' (SHARED_STATE_URL).
+    """
+    global _default_backend
+    if _default_backend is None:
+        kind = os.getenv('SHARED_STATE_BACKEND', 'memory').lower()
+        if kind == 'sqlite':
+            _default_backend = SQLiteBackend()
+        elif kind == 'redis':
+            _default_backend = RedisBackend()
+        else:
+            _default_backend = MemoryBackend()
+        print(f"🗄️ Paylaşılan durum arka ucu: {_default_backend.name}")
+    return _default_backend
+
+
+def state_backend_info() -> Dict:
+    backend = get_state_backend()
+    info = {'backend': backend.name, 'shared': backend.shared}
+    if isinstance(backend, RedisBackend):
+        info['errors'] = backend.errors
+    return info
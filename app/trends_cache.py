@@ -0,0 +1,251 @@
+import os
+import csv
+import io
+import json
+import time
+import hashlib
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class TrendSeries:
+    """Tek anahtar kelimenin ilgi-zaman serisi (gün indeksi + 0-100 değer)"""
+
+    __slots__ = ('keyword', 'days', 'values', 'fetched_at', 'source')
+
+    def __init__(self, keyword: str, days: np.ndarray, values: np.ndarray, fetched_at: float = None, source: str = 'unknown'):
+        self.keyword = keyword
+        self.days = np.asarray(days, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.uint8)
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def dates(self) -> List[str]:
+        return [datetime.fromtimestamp(int(d) * 86400, tz=timezone.utc).strftime('%Y-%m-%d') for d in self.days]
+
+    def signals(self, recent_points: int = 4) -> Dict:
+        """Seriden özet sinyaller: son dönem ilgisi, eğim ve zirve"""
+        if len(self) == 0:
+            return {}
+        values = self.values.astype(np.float64)
+        recent = values[-recent_points:]
+        window = values[-12:]
+        slope = float(np.polyfit(np.arange(len(window)), window, 1)[0]) if len(window) >= 3 else 0.0
+        return {
+            'recent_interest': float(recent.mean()),
+            'average_interest': float(values.mean()),
+            'peak_interest': int(values.max()),
+            'peak_date': self.dates()[int(values.argmax())],
+            'slope': slope,
+            'points': len(self)
+        }
+
+
+def _to_day(value) -> int:
+    """Tarih metni veya unix zaman damgasını epoch gününe çevir"""
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        timestamp = float(value)
+        if timestamp > 1e11:  # milisaniye (pytrends to_json)
+            timestamp /= 1000
+        return int(timestamp // 86400)
+    text = str(value).strip()[:10]
+    if len(text) == 7:  # aylık dışa aktarım: 2023-05
+        text += '-01'
+    parsed = datetime.strptime(text, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    return (parsed - EPOCH).days
+
+
+def _to_value(value) -> int:
+    """Trends değerini 0-100 tam sayıya çevir ('<1' -> 0)"""
+    if isinstance(value, list):
+        value = value[0] if value else 0
+    text = str(value).strip()
+    if text.startswith('<'):
+        return 0
+    try:
+        return max(0, min(100, int(float(text))))
+    except ValueError:
+        return 0
+
+
+def _clean_keyword(header: str) -> str:
+    """'harry potter: (Türkiye)' -> 'harry potter'"""
+    return header.split(':')[0].strip() if ':' in header else header.strip()
+
+
+def parse_trends_csv(text: str) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Google Trends 'Zaman içindeki ilgi' CSV dışa aktarımını oku.
+
+    Başlık üstündeki 'Kategori: ...' satırları atlanır; her anahtar kelime
+    sütunu ayrı seri olarak döner.
+    """
+    rows = list(csv.reader(io.StringIO(text)))
+    header_index = None
+    for i, row in enumerate(rows):
+        if len(row) >= 2 and row[0].strip().lower() in ('week', 'day', 'month', 'time', 'date', 'hafta', 'gün', 'ay', 'zaman', 'tarih'):
+            header_index = i
+            break
+    if header_index is None:
+        raise ValueError("Trends CSV başlık satırı bulunamadı")
+
+    keywords = [_clean_keyword(h) for h in rows[header_index][1:]]
+    days, columns = [], [[] for _ in keywords]
+    for row in rows[header_index + 1:]:
+        if len(row) < 2 or not row[0].strip():
+            continue
+        days.append(_to_day(row[0]))
+        for column, cell in zip(columns, row[1:]):
+            column.append(_to_value(cell))
+
+    day_array = np.asarray(days, dtype=np.int32)
+    return {kw: (day_array, np.asarray(col, dtype=np.uint8)) for kw, col in zip(keywords, columns) if kw}
+
+
+def parse_trends_json(data, keywords: List[str] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Trends JSON verisini oku. Desteklenen biçimler:
+    - widgetdata/multiline yanıtı: {"default": {"timelineData": [...]}}
+    - pytrends `interest_over_time().to_json()`: {"kw": {"<ms>": 45}, "isPartial": {...}}
+    - kayıt listesi: [{"date": "2024-01-07", "kw": 45}, ...]
+    """
+    if isinstance(data, str):
+        data = json.loads(data)
+
+    if isinstance(data, dict) and 'default' in data:
+        timeline = data['default'].get('timelineData', [])
+        days = np.asarray([_to_day(point['time']) for point in timeline], dtype=np.int32)
+        width = max((len(point.get('value', [])) for point in timeline), default=0)
+        keywords = keywords or [f"keyword_{i}" for i in range(width)]
+        return {
+            kw: (days, np.asarray([_to_value(point['value'][i]) if i < len(point.get('value', [])) else 0 for point in timeline], dtype=np.uint8))
+            for i, kw in enumerate(keywords[:width])
+        }
+
+    if isinstance(data, dict):
+        series = {}
+        for kw, points in data.items():
+            if kw == 'isPartial' or not isinstance(points, dict):
+                continue
+            items = sorted((_to_day(ts), _to_value(v)) for ts, v in points.items())
+            series[kw] = (
+                np.asarray([d for d, _ in items], dtype=np.int32),
+                np.asarray([v for _, v in items], dtype=np.uint8)
+            )
+        return series
+
+    if isinstance(data, list):
+        date_key = next((k for k in ('date', 'time', 'Week', 'Day') if data and k in data[0]), None)
+        if date_key is None:
+            raise ValueError("Trends JSON kayıtlarında tarih alanı yok")
+        days = np.asarray([_to_day(record[date_key]) for record in data], dtype=np.int32)
+        names = [k for k in data[0].keys() if k not in (date_key, 'isPartial')] if data else []
+        return {kw: (days, np.asarray([_to_value(r.get(kw, 0)) for r in data], dtype=np.uint8)) for kw in names}
+
+    raise ValueError("Desteklenmeyen Trends JSON biçimi")
+
+
+class TrendsCache:
+    """
+    Anahtar kelime başına ilgi serilerini diskte tutan TTL'li önbellek.
+
+    Her seri küçük bir `.npz` dosyasıdır (int32 gün + uint8 değer); okunan
+    seriler süreç içinde de tutulur. Dizin yazılamıyorsa seriler yalnızca
+    süreç içinde kalır. TTL dolmuş seriler `get` ile dönmez.
+    """
+
+    def __init__(self, cache_dir: str = None, ttl_seconds: float = None):
+        self.cache_dir = cache_dir or os.getenv('TRENDS_CACHE_DIR', os.path.join('data', 'trends_cache'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('TRENDS_CACHE_TTL', 24 * 3600))
+        self._memory: Dict[str, TrendSeries] = {}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"⚠️ Trends önbellek dizini oluşturulamadı: {str(e)}")
+
+    @staticmethod
+    def normalize_keyword(keyword: str) -> str:
+        return ' '.join(str(keyword).replace('İ', 'i').lower().split())
+
+    def _path(self, keyword: str) -> str:
+        digest = hashlib.sha1(self.normalize_keyword(keyword).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+
+    def _is_fresh(self, series: TrendSeries) -> bool:
+        return (time.time() - series.fetched_at) <= self.ttl_seconds
+
+    def put(self, series: TrendSeries) -> None:
+        key = self.normalize_keyword(series.keyword)
+        self._memory[key] = series
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    days=series.days,
+                    values=series.values,
+                    fetched_at=np.float64(series.fetched_at),
+                    keyword=np.str_(series.keyword),
+                    source=np.str_(series.source)
+                )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Trends serisi diske yazılamadı, bellekte tutuluyor ({series.keyword}): {str(e)}")
+
+    def get(self, keyword: str) -> Optional[TrendSeries]:
+        key = self.normalize_keyword(keyword)
+        series = self._memory.get(key)
+        if series is None:
+            path = self._path(key)
+            if not os.path.exists(path):
+                return None
+            try:
+                with np.load(path) as data:
+                    series = TrendSeries(
+                        str(data['keyword']),
+                        data['days'],
+                        data['values'],
+                        float(data['fetched_at']),
+                        str(data['source'])
+                    )
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Trends önbellek dosyası okunamadı ({keyword}): {str(e)}")
+                return None
+            self._memory[key] = series
+
+        return series if self._is_fresh(series) else None
+
+    def get_many(self, keywords: List[str]) -> Dict[str, Optional[TrendSeries]]:
+        return {keyword: self.get(keyword) for keyword in keywords}
+
+    def ingest(self, series_map: Dict[str, Tuple[np.ndarray, np.ndarray]], source: str) -> List[str]:
+        """Ayrıştırılmış serileri önbelleğe yaz, yazılan anahtar kelimeleri döndür"""
+        fetched_at = time.time()
+        for keyword, (days, values) in series_map.items():
+            self.put(TrendSeries(keyword, days, values, fetched_at, source))
+        return list(series_map.keys())
+
+    def ingest_file(self, path: str) -> List[str]:
+        """Dışa aktarılmış CSV/JSON dosyasını önbelleğe al"""
+        with open(path, encoding='utf-8-sig') as f:
+            text = f.read()
+        if path.lower().endswith('.json'):
+            return self.ingest(parse_trends_json(text), 'json_export')
+        return self.ingest(parse_trends_csv(text), 'csv_export')
+
+    def ingest_directory(self, directory: str) -> List[str]:
+        keywords = []
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(('.csv', '.json')):
+                try:
+                    keywords.extend(self.ingest_file(os.path.join(directory, name)))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️ Trends dosyası içe aktarılamadı ({name}): {str(e)}")
+        return keywords
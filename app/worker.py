@@ -0,0 +1,192 @@
+import os
+import uuid
+import signal
+import socket
+import asyncio
+import argparse
+from typing import Dict
+from app.job_queue import JobQueue, DEFAULT_VISIBILITY_TIMEOUT, get_job_queue
+from app.schemas import BookRequest
+from app.pipeline import run_pipeline
+from app.analysis_graphs import BookNotFound, UnknownProfile, build_analysis_response
+from app.main import job_graphs, pipeline_inputs, pipeline_targets, wants_compact
+
+# İşte deadline_seconds verilmemişse uçtan uca süre bütçesi (saniye); etkileşimli
+# REQUEST_DEADLINE'dan uzundur ki Gemini bölümleri iş içinde tamamlanabilsin
+JOB_DEADLINE = float(os.getenv('JOB_DEADLINE', 600))
+
+
+class Worker:
+    """
+    Kuyruktan analiz işlerini alıp çalıştıran işçi.
+
+    En fazla `concurrency` iş aynı anda çalışır; her işin kirası
+    `visibility_timeout`/3 aralıkla yenilenir. Kira kaybedilirse (ör. uzun
+    duraklama sonrası iş başka işçiye geçtiyse) iş iptal edilir. SIGTERM/SIGINT
+    gelince yeni iş alınmaz, çalışanlar `drain_timeout` kadar beklenir ve
+    bitmeyenler deneme sayılmadan kuyruğa geri bırakılır.
+    """
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT, poll_interval: float = 1.0, drain_timeout: float = 30.0, retry_delay: float = 5.0):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.retry_delay = retry_delay
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def stop(self) -> None:
+        if not self._stopping.is_set():
+            print(f"🛑 İşçi kapanıyor, yeni iş alınmayacak ({len(self._tasks)} iş sürüyor)")
+            self._stopping.set()
+
+    async def execute(self, job: Dict) -> Dict:
+        """
+        İş türünün grafını çalıştır. Gemini bölümleri şablonla yanıtlanmaz,
+        tamamlanmaları beklenir (sonuç işçiye özgü duruma bağlı kalmasın);
+        Excel raporu kuyruğa yüklenir ve API'den indirilir.
+        """
+        graph = job_graphs[job['kind']]
+        request = BookRequest(**job['payload'])
+        if request.latency_budget is None:
+            request.latency_budget = 0
+        if request.deadline_seconds is None:
+            request.deadline_seconds = JOB_DEADLINE
+        result = await run_pipeline(graph, pipeline_inputs(request), targets=pipeline_targets(graph, request), keep_late=False)
+        response = await build_analysis_response(graph, result, job['id'], compact=wants_compact(request))
+        if response.get('excel_report'):
+            response['excel_report'] = await self.upload_report(job['id'], response['excel_report'])
+        return response
+
+    async def upload_report(self, job_id: str, path: str) -> str:
+        """Raporu kuyruğa yükle ve yerel kopyayı sil; API'deki indirme yolunu döndür"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not await asyncio.to_thread(self.queue.attach_report, job_id, self.worker_id, os.path.basename(path), data):
+            print(f"⚠️ Rapor yüklenemedi, iş kirası kaybedilmiş: {job_id}")
+        os.remove(path)
+        return f"/jobs/{job_id}/report"
+
+    async def _heartbeat(self, job_id: str, work: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                alive = await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id, self.visibility_timeout)
+            except Exception as e:
+                print(f"❌ Kira yenilenemedi ({job_id}): {str(e)}")
+                continue
+            if not alive:
+                print(f"⚠️ İşin kirası kaybedildi, iş iptal ediliyor: {job_id}")
+                work.cancel()
+                return
+
+    async def _process(self, job: Dict) -> None:
+        job_id = job['id']
+        print(f"⚙️ İş başladı: {job['kind']} ({job['payload'].get('book_name')}) deneme {job['attempts']}/{job['max_attempts']}")
+        work = asyncio.ensure_future(self.execute(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, work))
+        try:
+            result = await work
+            if await asyncio.to_thread(self.queue.complete, job_id, self.worker_id, result):
+                print(f"✅ İş tamamlandı: {job_id}")
+            else:
+                print(f"⚠️ İş tamamlandı ama kira başka işçide, sonuç yok sayıldı: {job_id}")
+        except asyncio.CancelledError:
+            work.cancel()
+            if await asyncio.to_thread(self.queue.release, job_id, self.worker_id):
+                print(f"↩️ İş kuyruğa geri bırakıldı: {job_id}")
+        except (BookNotFound, UnknownProfile) as e:
+            await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, str(e), False)
+            print(f"❌ İş başarısız (tekrar yok): {job_id} - {str(e)}")
+        except Exception as e:
+            # Üstel geri çekilme: 5 sn, 10 sn, 20 sn...
+            delay = self.retry_delay * 2 ** (job['attempts'] - 1)
+            await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, str(e), True, delay)
+            print(f"❌ İş başarısız: {job_id} - {str(e)}")
+        finally:
+            heartbeat.cancel()
+
+    async def _wait_stopping(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _acquire_slot(self, slots: asyncio.Semaphore) -> bool:
+        """Boş yuva ayır; önce kapanış istenirse False"""
+        acquire = asyncio.ensure_future(slots.acquire())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        await asyncio.wait({acquire, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if acquire.done() and not acquire.cancelled():
+            if not self._stopping.is_set():
+                return True
+            slots.release()
+            return False
+        acquire.cancel()
+        return False
+
+    async def run(self, once: bool = False) -> None:
+        """Durdurulana kadar iş al (`once`: kuyruk boşalınca çık)"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        print(f"👷 İşçi başladı: {self.worker_id} (eşzamanlılık {self.concurrency})")
+
+        slots = asyncio.Semaphore(self.concurrency)
+        while not self._stopping.is_set():
+            # Tüm yuvalar doluyken de kapanış sinyali beklenmeden fark edilsin
+            if not await self._acquire_slot(slots):
+                break
+            job = None
+            if not self._stopping.is_set():
+                try:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.visibility_timeout)
+                except Exception as e:
+                    print(f"❌ Kuyruktan iş alınamadı: {str(e)}")
+            if job is None:
+                slots.release()
+                if once and not self._tasks:
+                    break
+                await self._wait_stopping(self.poll_interval)
+                continue
+            task = asyncio.create_task(self._process(job))
+            self._tasks[job['id']] = task
+            task.add_done_callback(lambda _, job_id=job['id']: (self._tasks.pop(job_id, None), slots.release()))
+
+        await self.drain()
+
+    async def drain(self) -> None:
+        """Süren işleri bekle; süre dolarsa iptal edip kuyruğa geri bırak"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        print(f"⏳ {len(tasks)} işin bitmesi bekleniyor (en fazla {self.drain_timeout:g} sn)")
+        _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analiz kuyruğu işçisi")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('WORKER_CONCURRENCY', 2)))
+    parser.add_argument('--visibility-timeout', type=float, default=DEFAULT_VISIBILITY_TIMEOUT)
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('WORKER_POLL_INTERVAL', 1.0)))
+    parser.add_argument('--drain-timeout', type=float, default=float(os.getenv('WORKER_DRAIN_TIMEOUT', 30)))
+    parser.add_argument('--once', action='store_true', help="Kuyruk boşalınca çık")
+    options = parser.parse_args()
+    worker = Worker(
+        get_job_queue(),
+        concurrency=options.concurrency,
+        visibility_timeout=options.visibility_timeout,
+        poll_interval=options.poll_interval,
+        drain_timeout=options.drain_timeout
+    )
+    asyncio.run(worker.run(once=options.once))